@@ -1,3 +1,5 @@
+import time
+from collections import OrderedDict
 import mysql.connector
 
 
@@ -5,9 +7,10 @@ class DB:
     """
     Класс для подключения к базе данных MySQL.
     """
-    __slots__ = {"host", "user", "password", "database", "link", "cursor"}
+    __slots__ = {"host", "user", "password", "database", "link", "cursor", "created_at", "last_used",
+                 "statements", "max_statements"}
 
-    def __init__(self, host: str, user: str, password: str, database: str):
+    def __init__(self, host: str, user: str, password: str, database: str, max_statements: int = 64):
         """
         Конструктор класса DB, инициализирует параметры подключения.
 
@@ -15,6 +18,7 @@ class DB:
         :param user: Пользователь базы данных.
         :param password: Пароль пользователя базы данных.
         :param database: Название базы данных.
+        :param max_statements: Число подготовленных запросов, которые держатся открытыми на соединении.
         """
 
         self.host = host
@@ -23,6 +27,10 @@ class DB:
         self.database = database
         self.link = None
         self.cursor = None
+        self.created_at = None
+        self.last_used = None
+        self.statements = OrderedDict()
+        self.max_statements = max_statements
 
     def connect(self):
         """
@@ -40,6 +48,7 @@ class DB:
             )
             self.link.autocommit = True
             self.cursor = self.link.cursor(dictionary=True)
+            self.created_at = self.last_used = time.monotonic()
             return self.cursor
         except mysql.connector.Error as err:
             print(f"Ошибка при подключении к базе данных: {err}")
@@ -49,7 +58,75 @@ class DB:
         Метод для разрыва соединения с базой данных.
         """
 
+        # Подготовленные запросы освобождаются сервером при закрытии соединения
+        self.statements.clear()
         if self.cursor:
             self.cursor.close()
         if self.link:
             self.link.close()
+        self.link = None
+        self.cursor = None
+
+    def new_cursor(self):
+        """
+        Метод создает новый курсор на уже установленном соединении.
+        Используется пулом соединений: курсор закрывается после каждого запроса, а соединение остается открытым.
+
+        :return: Курсор для выполнения SQL-запросов.
+        """
+
+        self.last_used = time.monotonic()
+        return self.link.cursor(dictionary=True)
+
+    def prepared_cursor(self, query: str):
+        """
+        Метод возвращает подготовленный (prepared) курсор для запроса. Курсоры кэшируются на соединении
+        по тексту запроса: повторный запрос выполняется без разбора на сервере, передаются только параметры.
+        Если открыто больше max_statements запросов, давно неиспользуемый закрывается.
+
+        :param query: Строка SQL-запроса с плейсхолдерами %s.
+        :return: Кортеж (курсор, строка запроса). Курсору нужно передавать именно возвращенную строку:
+            подготовленный курсор сравнивает запрос по идентичности объекта.
+        """
+
+        self.last_used = time.monotonic()
+        entry = self.statements.get(query)
+        if entry is not None:
+            self.statements.move_to_end(query)
+            return entry
+
+        entry = self.statements[query] = (self.link.cursor(prepared=True, dictionary=True), query)
+        if len(self.statements) > self.max_statements:
+            _, (cursor, _) = self.statements.popitem(last=False)
+            try:
+                cursor.close()
+            except mysql.connector.Error:
+                pass
+        return entry
+
+    def finish_prepared(self, cursor):
+        """
+        Метод дочитывает строки, которые остались после fetchone, чтобы соединение можно было
+        использовать для следующего запроса, не закрывая подготовленный курсор.
+
+        :param cursor: Подготовленный курсор.
+        :return: Ничего не возвращает.
+        """
+
+        if self.link is not None and self.link.unread_result:
+            cursor.fetchall()
+
+    def is_alive(self) -> bool:
+        """
+        Метод проверяет, что соединение с базой данных все еще активно.
+
+        :return: True, если сервер отвечает на ping, иначе False.
+        """
+
+        if self.link is None:
+            return False
+        try:
+            self.link.ping(reconnect=False)
+            return True
+        except mysql.connector.Error:
+            return False
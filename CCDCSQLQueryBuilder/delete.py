@@ -1,3 +1,7 @@
+from typing import Iterable, Iterator, List, Tuple
+from CCDCSQLQueryBuilder.statements import render_statement
+
+
 class DeleteQuery:
     """
     Класс для создания SQL-запросов DELETE.
@@ -9,7 +13,8 @@ class DeleteQuery:
 
         :param table_name: Имя таблицы, из которой будет выполняться удаление.
         :param kwargs: Дополнительные аргументы.
-          - conditions: Список условий для фильтрации строк перед удалением.
+          - conditions: Список условий для фильтрации строк перед удалением с плейсхолдерами %s.
+          - params: Список значений для плейсхолдеров в conditions.
         """
 
         if not table_name:
@@ -17,18 +22,89 @@ class DeleteQuery:
 
         self.table_name = table_name
         self.conditions = kwargs.get("conditions", [])
+        self.params = list(kwargs.get("params", []))
 
     def build_query(self):
         """
-        Создает SQL-запрос DELETE на основе заданных параметров.
+        Создает SQL-запрос DELETE на основе заданных параметров. Текст запроса берется из кэша по форме запроса.
+
+        :return: Кортеж, содержащий строку SQL-запроса и список параметров для безопасной вставки значений.
+        """
 
-        :return: Строка SQL-запроса DELETE.
+        return render_statement(self.shape()), list(self.params)
+
+    def shape(self) -> tuple:
+        """
+        Возвращает форму запроса - хэшируемый кортеж без значений параметров.
+
+        :return: Кортеж (DeleteQuery, таблица, условия).
         """
 
-        conditions_str = " AND ".join(self.conditions) if self.conditions else ""
+        return DeleteQuery, self.table_name, tuple(self.conditions)
 
-        query = f"DELETE FROM {self.table_name}"
-        if conditions_str:
-            query += f" WHERE {conditions_str}"
+    @staticmethod
+    def render(table_name, conditions) -> str:
+        """
+        Собирает текст запроса DELETE по форме. Вызывается через кэш render_statement.
 
+        :return: Строка SQL-запроса.
+        """
+
+        query = f"DELETE FROM {table_name}"
+        if conditions:
+            query += f" WHERE {' AND '.join(conditions)}"
         return query
+
+
+class BatchDeleteQuery:
+    """
+    Класс для удаления многих строк по списку значений колонки. Значения разбиваются на пакеты
+    DELETE ... WHERE column IN (%s, ...), поэтому тысячи строк удаляются несколькими запросами.
+    Пакеты выполняются в одной транзакции через execute_batch.
+    """
+
+    def __init__(self, table_name: str, column: str, values: Iterable, **kwargs):
+        """
+        Инициализирует объект BatchDeleteQuery.
+
+        :param table_name: Имя таблицы, из которой будет выполняться удаление.
+        :param column: Колонка, по значениям которой удаляются строки (например, idblocks).
+        :param values: Итератор значений колонки.
+        :param kwargs: Дополнительные аргументы:
+            - chunk_size: Максимальное число значений в одном запросе (по умолчанию 1000).
+            - conditions: Дополнительные условия с плейсхолдерами %s (например, "users_iduser = %s").
+            - params: Список значений для плейсхолдеров в conditions.
+        """
+
+        if not table_name:
+            raise ValueError("Имя таблицы обязательно")
+        if not column:
+            raise ValueError("Не указана колонка")
+
+        self.table_name = table_name
+        self.column = column
+        self.values = values
+        self.chunk_size = kwargs.get("chunk_size", 1000)
+        self.conditions = tuple(kwargs.get("conditions", ()))
+        self.params = list(kwargs.get("params", []))
+
+    def batches(self) -> Iterator[Tuple[str, List]]:
+        """
+        Формирует пакеты запросов DELETE ... WHERE column IN (...).
+
+        :return: Генератор кортежей (строка SQL-запроса, список параметров).
+        """
+
+        chunk = []
+        for value in self.values:
+            chunk.append(value)
+            if len(chunk) >= self.chunk_size:
+                yield self._build_chunk(chunk)
+                chunk = []
+        if chunk:
+            yield self._build_chunk(chunk)
+
+    def _build_chunk(self, chunk: list) -> Tuple[str, List]:
+        in_condition = f"{self.column} IN ({', '.join(['%s'] * len(chunk))})"
+        query = render_statement((DeleteQuery, self.table_name, (in_condition,) + self.conditions))
+        return query, chunk + self.params
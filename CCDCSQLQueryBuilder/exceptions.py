@@ -0,0 +1,10 @@
+class PoolError(Exception):
+    """
+    Исключение, которое представляет ошибку пула соединений (не удалось открыть соединение, пул закрыт).
+    """
+
+
+class PoolTimeout(PoolError):
+    """
+    Исключение, которое представляет превышение времени ожидания свободного соединения в пуле.
+    """
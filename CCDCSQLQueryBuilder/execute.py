@@ -1,44 +1,503 @@
-from CCDCSQLQueryBuilder.connect import DB
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from contextlib import contextmanager
+from functools import partial
+from CCDCSQLQueryBuilder.pool import get_pool
+from CCDCSQLQueryBuilder.exceptions import PoolError
 import mysql.connector
 
+_executor = None
+_query_timeout = None
+_prepared_statements = True
 
-async def execute_query(query: str, params=None, *args):
+
+def configure_executor(config: dict) -> ThreadPoolExecutor:
     """
-    Выполняет SQL-запрос с использованием заданного курсора и выполняет дополнительные действия,
-    определенные в *args и **kwargs.
+    Создает пул потоков, в котором выполняются запросы execute_query, по настройкам settings['DATABASE'].
+    Число потоков по умолчанию равно POOL_MAX_SIZE, поэтому каждому потоку достается свое соединение из пула.
 
-    :param query: Строка SQL-запроса для выполнения.
-    :param params: Параметры, передаваемые в SQL-запрос (опционально).
-    :param args: Дополнительные позиционные аргументы.
+    :param config: Словарь с необязательными ключами EXECUTOR_MAX_WORKERS, POOL_MAX_SIZE, QUERY_TIMEOUT
+        и PREPARED_STATEMENTS (выполнять запросы подготовленными курсорами, по умолчанию True).
+    :return: Созданный пул потоков.
     """
 
-    db = DB(
-        host="localhost",
-        user="root",
-        password="1234",
-        database="builder"
-    )
+    global _executor, _query_timeout, _prepared_statements
 
-    cursor = db.connect()
+    max_workers = config.get("EXECUTOR_MAX_WORKERS", config.get("POOL_MAX_SIZE", 10))
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+    _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ccdc-db")
+    _query_timeout = config.get("QUERY_TIMEOUT")
+    _prepared_statements = config.get("PREPARED_STATEMENTS", True)
+    return _executor
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """
+    Возвращает пул потоков для запросов, создавая его с размером пула соединений, если он не настроен.
+
+    :return: Пул потоков.
+    """
+
+    if _executor is None:
+        configure_executor({"POOL_MAX_SIZE": get_pool().max_size})
+    return _executor
+
+
+class _QueryState:
+    """
+    Соединение, на котором выполняется запрос, для отмены через KILL QUERY.
+
+    Соединение отвязывается (detach) под блокировкой до возврата в пул, а kill проверяет его под той же
+    блокировкой, поэтому KILL не может быть отправлен соединению, которое уже выдано другому запросу.
+    Соединение, для которого был отправлен KILL, закрывается, а не возвращается в пул: команда выполняется
+    в отдельном потоке и может дойти до сервера уже после завершения запроса.
+    """
+    __slots__ = ("_lock", "connection_id", "killed")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connection_id = None
+        self.killed = False
+
+    def attach(self, db):
+        """
+        Запоминает соединение, на котором начинается запрос.
+
+        :param db: Объект DB из пула.
+        :return: Ничего не возвращает.
+        """
+
+        with self._lock:
+            self.connection_id = db.link.connection_id
+
+    def detach(self) -> bool:
+        """
+        Отвязывает соединение перед возвратом в пул.
+
+        :return: True, если для соединения был отправлен KILL и его нужно закрыть.
+        """
+
+        with self._lock:
+            self.connection_id = None
+            return self.killed
+
+    def kill(self):
+        """
+        Прерывает запрос, если он еще выполняется (соединение не отвязано).
+
+        :return: Ничего не возвращает.
+        """
+
+        with self._lock:
+            connection_id = self.connection_id
+            if connection_id is None:
+                return
+            self.killed = True
+        threading.Thread(target=_kill_query, args=(connection_id,), daemon=True).start()
+
+
+@contextmanager
+def _connection(state: _QueryState):
+    """
+    Выдает соединение из пула и привязывает к нему state. По выходе соединение отвязывается и возвращается
+    в пул; если внутри блока произошла ошибка или запрос был прерван KILL, соединение закрывается.
+
+    :param state: Состояние запроса.
+    :return: Подключенный объект DB.
+    """
+
+    pool = get_pool()
+    db = pool.acquire()
+    state.attach(db)
+    try:
+        yield db
+    except BaseException:
+        state.detach()
+        pool.release(db, discard=True)
+        raise
+    else:
+        pool.release(db, discard=state.detach())
+
+
+def _execute(query: str, params, args, state: _QueryState):
+    """
+    Выполняет SQL-запрос на соединении из пула. Блокирующая функция, вызывается в пуле потоков.
+    Если включены подготовленные запросы, используется подготовленный курсор соединения (DB.prepared_cursor).
+
+    :param query: Строка SQL-запроса для выполнения.
+    :param params: Параметры, передаваемые в SQL-запрос.
+    :param args: Кортеж действий 'fetchone' / 'fetchall'.
+    :param state: Состояние запроса для его отмены.
+    :return: Результат запроса или None.
+    """
 
     result = None
 
     try:
-        with cursor as cur:
-            if params:
-                cur.execute(query, params)
+        with _connection(state) as db:
+            if _prepared_statements:
+                cur, query = db.prepared_cursor(query)
+                try:
+                    result = _run(cur, query, params, args)
+                finally:
+                    db.finish_prepared(cur)
             else:
-                cur.execute(query)
-
-            for arg in args:
-                if arg == 'fetchone':
-                    result = cur.fetchone()
-                elif arg == 'fetchall':
-                    result = cur.fetchall()
+                with db.new_cursor() as cur:
+                    result = _run(cur, query, params, args)
 
     except mysql.connector.Error as err:
         print(f"Ошибка при выполнении запроса: {err}")
+    except PoolError as err:
+        print(f"Ошибка пула соединений: {err}")
+
+    return result
+
 
-    db.disconnect()
+def _run(cur, query: str, params, args):
+    """
+    Выполняет запрос на курсоре и действия fetchone / fetchall.
+
+    :param cur: Курсор.
+    :param query: Строка SQL-запроса.
+    :param params: Параметры запроса.
+    :param args: Кортеж действий 'fetchone' / 'fetchall'.
+    :return: Результат последнего действия или None.
+    """
+
+    result = None
+    if params:
+        cur.execute(query, params)
+    else:
+        cur.execute(query)
 
+    for arg in args:
+        if arg == 'fetchone':
+            result = cur.fetchone()
+        elif arg == 'fetchall':
+            result = cur.fetchall()
     return result
+
+
+def _execute_batch(statements, many: bool, state: _QueryState):
+    """
+    Выполняет несколько запросов (или один запрос с набором параметров через executemany)
+    в одной транзакции на соединении из пула. При ошибке транзакция откатывается.
+    Блокирующая функция, вызывается в пуле потоков.
+
+    :param statements: Итератор кортежей (строка SQL-запроса, параметры); при many=True параметры -
+        итератор кортежей значений для cursor.executemany.
+    :param many: Выполнять ли запросы через executemany.
+    :param state: Состояние запроса для его отмены.
+    :return: Суммарное число затронутых строк или None при ошибке.
+    """
+
+    rowcount = 0
+
+    try:
+        with _connection(state) as db:
+            db.link.start_transaction()
+            try:
+                with db.new_cursor() as cur:
+                    for query, params in statements:
+                        if many:
+                            cur.executemany(query, list(params))
+                        else:
+                            cur.execute(query, params)
+                        rowcount += max(cur.rowcount, 0)
+                db.link.commit()
+            except BaseException:
+                db.link.rollback()
+                raise
+
+    except mysql.connector.Error as err:
+        print(f"Ошибка при выполнении пакета запросов: {err}")
+        return None
+    except PoolError as err:
+        print(f"Ошибка пула соединений: {err}")
+        return None
+
+    return rowcount
+
+
+def _kill_query(connection_id: int):
+    """
+    Прерывает выполняющийся на сервере запрос командой KILL QUERY через отдельное соединение.
+
+    :param connection_id: Идентификатор соединения MySQL, на котором выполняется запрос.
+    :return: Ничего не возвращает.
+    """
+
+    db = get_pool().connection_factory()
+    cursor = db.connect()
+    if cursor is None:
+        return
+    try:
+        cursor.execute("KILL QUERY %s", (connection_id,))
+    except mysql.connector.Error as err:
+        print(f"Ошибка при отмене запроса: {err}")
+    finally:
+        db.disconnect()
+
+
+def execute_query_sync(query: str, params=None, *args):
+    """
+    Синхронный вариант execute_query для кода, который выполняется вне цикла событий
+    (например, в middleware WSGI-сервера).
+
+    :param query: Строка SQL-запроса для выполнения.
+    :param params: Параметры, передаваемые в SQL-запрос (опционально).
+    :param args: Дополнительные позиционные аргументы.
+    """
+
+    return _execute(query, params, args, _QueryState())
+
+
+async def execute_query(query: str, params=None, *args, timeout: float = None):
+    """
+    Выполняет SQL-запрос с использованием соединения из пула и выполняет дополнительные действия,
+    определенные в *args. Сам запрос выполняется в пуле потоков, поэтому цикл событий не блокируется.
+    При превышении времени ожидания или отмене задачи запрос прерывается на сервере.
+
+    :param query: Строка SQL-запроса для выполнения.
+    :param params: Параметры, передаваемые в SQL-запрос (опционально).
+    :param args: Дополнительные позиционные аргументы.
+    :param timeout: Время ожидания результата в секундах (по умолчанию settings['DATABASE']['QUERY_TIMEOUT']).
+    """
+
+    state = _QueryState()
+    return await _run_in_executor(partial(_execute, query, params, args, state), state, timeout, query)
+
+
+def execute_batch_sync(statements):
+    """
+    Синхронный вариант execute_batch.
+
+    :param statements: Итератор кортежей (строка SQL-запроса, параметры).
+    :return: Суммарное число затронутых строк или None при ошибке.
+    """
+
+    return _execute_batch(statements, False, _QueryState())
+
+
+async def execute_batch(statements, timeout: float = None):
+    """
+    Выполняет несколько запросов в одной транзакции на одном соединении из пула, например
+    пакеты BulkInsertQuery.batches(). Итератор запросов читается в пуле потоков по мере выполнения.
+
+    :param statements: Итератор кортежей (строка SQL-запроса, параметры).
+    :param timeout: Время ожидания результата в секундах (по умолчанию settings['DATABASE']['QUERY_TIMEOUT']).
+    :return: Суммарное число затронутых строк или None при ошибке (транзакция откатывается).
+    """
+
+    state = _QueryState()
+    return await _run_in_executor(partial(_execute_batch, statements, False, state), state, timeout, "пакет запросов")
+
+
+async def execute_many(query: str, seq_params, timeout: float = None):
+    """
+    Выполняет один запрос для набора параметров через cursor.executemany в одной транзакции.
+    Для INSERT драйвер сам объединяет строки в многострочный запрос.
+
+    :param query: Строка SQL-запроса для выполнения.
+    :param seq_params: Итератор кортежей параметров (например, из BulkInsertQuery.executemany_args()).
+    :param timeout: Время ожидания результата в секундах (по умолчанию settings['DATABASE']['QUERY_TIMEOUT']).
+    :return: Число затронутых строк или None при ошибке (транзакция откатывается).
+    """
+
+    state = _QueryState()
+    return await _run_in_executor(
+        partial(_execute_batch, [(query, seq_params)], True, state), state, timeout, query
+    )
+
+
+async def _run_in_executor(func, state: _QueryState, timeout: float, description: str):
+    """
+    Выполняет блокирующую функцию в пуле потоков запросов. При превышении времени ожидания
+    или отмене задачи выполняющийся запрос прерывается на сервере (KILL QUERY).
+
+    :param func: Функция без аргументов.
+    :param state: Состояние запроса, которое функция привязывает к соединению.
+    :param timeout: Время ожидания результата в секундах (None - QUERY_TIMEOUT).
+    :param description: Текст запроса для сообщения о превышении времени.
+    :return: Результат функции или None при превышении времени ожидания.
+    """
+
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_get_executor(), func)
+
+    try:
+        return await asyncio.wait_for(future, timeout if timeout is not None else _query_timeout)
+    except asyncio.TimeoutError:
+        print(f"Превышено время выполнения запроса: {description}")
+        return None
+    finally:
+        # Если запрос уже завершился, соединение отвязано и kill ничего не делает
+        state.kill()
+
+
+def _open_stream(query: str, params, row_format: str, state: _QueryState):
+    """
+    Берет соединение из пула и выполняет запрос на небуферизованном курсоре: строки остаются
+    на сервере и читаются по мере вызова fetchmany. Блокирующая функция, вызывается в пуле потоков.
+
+    :param query: Строка SQL-запроса для выполнения.
+    :param params: Параметры, передаваемые в SQL-запрос.
+    :param row_format: Формат строк: 'dict' или 'tuple'/'columns'.
+    :param state: Состояние запроса для его отмены.
+    :return: Кортеж (DB, курсор).
+    """
+
+    pool = get_pool()
+    db = pool.acquire()
+    state.attach(db)
+    try:
+        cur = db.link.cursor(dictionary=row_format == "dict", buffered=False)
+        if params:
+            cur.execute(query, params)
+        else:
+            cur.execute(query)
+        return db, cur
+    except BaseException:
+        state.detach()
+        pool.release(db, discard=True)
+        raise
+
+
+def _fetch_batch(db, cur, batch_size: int, row_format: str):
+    """
+    Читает очередную порцию строк небуферизованного курсора. Блокирующая функция, вызывается в пуле потоков.
+
+    :param db: Объект DB, на котором выполняется запрос.
+    :param cur: Курсор.
+    :param batch_size: Размер порции.
+    :param row_format: 'dict', 'tuple' или 'columns'.
+    :return: Кортеж (порция или None, если строк не осталось; прочитаны ли все строки).
+    """
+
+    rows = cur.fetchmany(batch_size)
+    exhausted = not rows or not db.link.unread_result
+    if not rows:
+        return None, exhausted
+    if row_format == "columns":
+        return dict(zip(cur.column_names, map(list, zip(*rows)))), exhausted
+    return rows, exhausted
+
+
+def _discard_opened(state: _QueryState, opening: Future):
+    """
+    Закрывает соединение запроса, открытие которого не дождались (превышено время или задача отменена).
+
+    :param state: Состояние запроса.
+    :param opening: Future функции _open_stream.
+    :return: Ничего не возвращает.
+    """
+
+    if not opening.cancelled() and opening.exception() is None:
+        db, _ = opening.result()
+        state.detach()
+        get_pool().release(db, discard=True)
+
+
+def _close_stream(db, cur, pending: Future, exhausted: bool, state: _QueryState):
+    """
+    Закрывает курсор и возвращает соединение в пул. Если строки прочитаны не до конца
+    (итерация прервана или отменена) или запрос был прерван KILL, соединение закрывается:
+    на нем остались непрочитанные строки. Блокирующая функция, вызывается в пуле потоков.
+
+    :param db: Объект DB.
+    :param cur: Курсор.
+    :param pending: Незавершенное чтение порции или None.
+    :param exhausted: Прочитаны ли все строки.
+    :param state: Состояние запроса.
+    :return: Ничего не возвращает.
+    """
+
+    if pending is not None:
+        wait([pending])
+    if state.detach():
+        exhausted = False
+    if exhausted:
+        try:
+            cur.close()
+        except mysql.connector.Error:
+            exhausted = False
+    get_pool().release(db, discard=not exhausted)
+
+
+async def stream_query(query: str, params=None, batch_size: int = 500, row_format: str = "dict",
+                       timeout: float = None):
+    """
+    Выполняет SELECT и отдает строки порциями, не загружая весь результат в память
+    (небуферизованный курсор). Соединение из пула занято, пока итерация не закончится,
+    не будет прервана (break, aclose) или отменена; порции читаются в пуле потоков.
+
+        async for batch in stream_query("SELECT idblocks, block_html FROM blocks WHERE users_iduser = %s",
+                                        [user_id], batch_size=200, row_format="tuple"):
+            ...
+
+    :param query: Строка SQL-запроса для выполнения.
+    :param params: Параметры, передаваемые в SQL-запрос (опционально).
+    :param batch_size: Число строк в порции.
+    :param row_format: Формат порции:
+        - 'dict': список словарей {колонка: значение} (по умолчанию);
+        - 'tuple': список кортежей в порядке колонок запроса;
+        - 'columns': словарь {колонка: список значений} - меньше всего объектов на порцию.
+    :param timeout: Время ожидания каждой порции в секундах (по умолчанию settings['DATABASE']['QUERY_TIMEOUT']).
+    :return: Асинхронный генератор порций. Ошибка до первой порции выводится, и генератор ничего
+        не отдает (как execute_query); ошибка после первой порции прерывает итерацию исключением.
+    :raises mysql.connector.Error: Ошибка базы данных после первой порции.
+    :raises asyncio.TimeoutError: Превышено время ожидания порции после первой порции.
+    """
+
+    if row_format not in ("dict", "tuple", "columns"):
+        raise ValueError("row_format должен быть 'dict', 'tuple' или 'columns'")
+
+    executor = _get_executor()
+    timeout = timeout if timeout is not None else _query_timeout
+    state = _QueryState()
+
+    opening = executor.submit(_open_stream, query, params, row_format, state)
+    try:
+        db, cur = await asyncio.wait_for(asyncio.wrap_future(opening), timeout)
+    except (mysql.connector.Error, PoolError) as err:
+        print(f"Ошибка при выполнении запроса: {err}")
+        return
+    except (asyncio.TimeoutError, asyncio.CancelledError) as err:
+        # Запрос еще выполняется: прерываем его, а соединение закроется, когда поток освободится
+        state.kill()
+        opening.add_done_callback(partial(_discard_opened, state))
+        if isinstance(err, asyncio.CancelledError):
+            raise
+        print(f"Превышено время выполнения запроса: {query}")
+        return
+
+    pending = None
+    exhausted = False
+    started = False
+    try:
+        while not exhausted:
+            pending = executor.submit(_fetch_batch, db, cur, batch_size, row_format)
+            try:
+                batch, exhausted = await asyncio.wait_for(asyncio.wrap_future(pending), timeout)
+            except asyncio.TimeoutError:
+                # После первой порции вызывающий код уже получил часть строк: обрыв нельзя
+                # принять за конец результата, поэтому ошибка передается дальше
+                if started:
+                    raise
+                print(f"Превышено время выполнения запроса: {query}")
+                return
+            except mysql.connector.Error as err:
+                if started:
+                    raise
+                print(f"Ошибка при выполнении запроса: {err}")
+                return
+            pending = None
+            if batch:
+                started = True
+                yield batch
+    finally:
+        if pending is not None and not pending.done():
+            state.kill()
+        executor.submit(_close_stream, db, cur, pending, exhausted, state)
@@ -1,3 +1,9 @@
+from itertools import chain
+from typing import Iterable, Iterator, List, Sequence, Tuple
+from CCDCSQLQueryBuilder.statements import render_statement
+from CCDCSQLQueryBuilder.select import SelectQuery
+
+
 class InsertQuery:
     """
     Класс для создания SQL-запросов INSERT.
@@ -10,7 +16,8 @@ class InsertQuery:
 
         :param table_name: Имя таблицы, в которую будет выполняться вставка данных.
         :param data: Словарь с данными для вставки в виде {имя_колонки: значение}.
-        :param conditions: Словарь с данными для выполнения условия вставки.
+        :param conditions: Словарь {имя_колонки: значение}: строка вставляется, только если в таблице
+            нет строки с такими значениями (INSERT ... SELECT ... WHERE NOT EXISTS).
         """
 
         if not table_name:
@@ -22,17 +29,217 @@ class InsertQuery:
 
     def build_query(self):
         """
-        Создает SQL-запрос INSERT на основе заданных параметров.
+        Создает SQL-запрос INSERT на основе заданных параметров. Текст запроса берется из кэша по форме запроса.
 
         :return: Кортеж, содержащий строку SQL-запроса и список параметров для безопасной вставки значений.
         """
         if not self.data:
             raise ValueError("Нет данных для вставки")
-        columns = ", ".join(self.data.keys())
-        values = ", ".join(["%s" for _ in self.data.values()])
-        conditions = " AND ".join([f"{column} = %s" for column in self.conditions.keys()])
-        query = f"INSERT INTO {self.table_name} ({columns}) VALUES ({values})"
-        if conditions:
-            query += f" WHERE {conditions}"
         query_params = list(self.data.values()) + list(self.conditions.values())
-        return query, query_params
+        return render_statement(self.shape()), query_params
+
+    def shape(self) -> tuple:
+        """
+        Возвращает форму запроса - хэшируемый кортеж без значений параметров.
+
+        :return: Кортеж (InsertQuery, таблица, колонки, колонки условий).
+        """
+
+        return InsertQuery, self.table_name, tuple(self.data), tuple(self.conditions)
+
+    @staticmethod
+    def render(table_name, columns, condition_columns) -> str:
+        """
+        Собирает текст запроса INSERT по форме. Вызывается через кэш render_statement.
+        У INSERT ... VALUES не бывает WHERE, поэтому вставка с условием собирается
+        как INSERT ... SELECT ... FROM DUAL WHERE NOT EXISTS.
+
+        :return: Строка SQL-запроса.
+        """
+
+        values = ", ".join(["%s" for _ in columns])
+        query = f"INSERT INTO {table_name} ({', '.join(columns)})"
+        if not condition_columns:
+            return f"{query} VALUES ({values})"
+
+        conditions = " AND ".join([f"{column} = %s" for column in condition_columns])
+        return f"{query} SELECT {values} FROM DUAL WHERE NOT EXISTS " \
+               f"(SELECT 1 FROM {table_name} WHERE {conditions})"
+
+
+class BulkInsertQuery:
+    """
+    Класс для вставки многих строк. Строки разбиваются на пакеты INSERT ... VALUES (...), (...), ...,
+    размер которых ограничен числом строк и примерным размером запроса (max_allowed_packet сервера).
+    Строки читаются из итератора по мере формирования пакетов, поэтому в памяти держится один пакет.
+    Пакеты выполняются в одной транзакции через execute_batch.
+    """
+    __slots__ = {"table_name", "rows", "columns", "max_packet_size", "max_rows"}
+
+    # Запас на текст запроса, разделители и экранирование значений драйвером
+    _row_overhead = 16
+
+    def __init__(self, table_name: str, rows: Iterable[dict], columns: Sequence[str] = None, **kwargs):
+        """
+        Инициализирует объект BulkInsertQuery.
+
+        :param table_name: Имя таблицы, в которую будет выполняться вставка данных.
+        :param rows: Итератор словарей {имя_колонки: значение}.
+        :param columns: Список колонок (по умолчанию ключи первой строки).
+        :param kwargs: Дополнительные аргументы:
+            - max_packet_size: Максимальный размер одного запроса в байтах (по умолчанию 4 МБ -
+              значение max_allowed_packet в MySQL 5.7; в MySQL 8 по умолчанию 64 МБ).
+            - max_rows: Максимальное число строк в одном запросе (по умолчанию 1000).
+        """
+
+        if not table_name:
+            raise ValueError("Имя таблицы обязательно")
+
+        self.table_name = table_name
+        self.rows = rows
+        self.columns = tuple(columns) if columns else None
+        self.max_packet_size = kwargs.get("max_packet_size", 4 * 1024 * 1024)
+        self.max_rows = kwargs.get("max_rows", 1000)
+
+    @staticmethod
+    def _estimate_size(value) -> int:
+        """
+        Оценивает размер значения в тексте запроса: драйвер экранирует строки и байты,
+        поэтому в худшем случае размер удваивается.
+
+        :param value: Значение колонки.
+        :return: Примерный размер в байтах.
+        """
+
+        if isinstance(value, (bytes, bytearray)):
+            return 2 * len(value) + 3
+        if isinstance(value, str):
+            return 2 * len(value.encode('utf-8')) + 3
+        return 24
+
+    def _row_values(self, row: dict) -> tuple:
+        try:
+            return tuple(row[column] for column in self.columns)
+        except KeyError as err:
+            raise ValueError(f"В строке нет значения для колонки {err}") from None
+
+    def batches(self) -> Iterator[Tuple[str, List]]:
+        """
+        Формирует пакеты многострочных запросов INSERT.
+
+        :return: Генератор кортежей (строка SQL-запроса, список параметров).
+        """
+
+        rows = iter(self.rows)
+        first = next(rows, None)
+        if first is None:
+            return
+        if self.columns is None:
+            self.columns = tuple(first)
+
+        header_size = len(self.table_name) + sum(len(column) + 2 for column in self.columns) + 32
+        batch, params, size = 0, [], header_size
+
+        for row in chain((first,), rows):
+            values = self._row_values(row)
+            row_size = self._row_overhead + sum(self._estimate_size(value) for value in values)
+            if batch and (batch >= self.max_rows or size + row_size > self.max_packet_size):
+                yield render_statement((BulkInsertQuery, self.table_name, self.columns, batch)), params
+                batch, params, size = 0, [], header_size
+            batch += 1
+            params.extend(values)
+            size += row_size
+
+        if batch:
+            yield render_statement((BulkInsertQuery, self.table_name, self.columns, batch)), params
+
+    def executemany_args(self) -> Tuple[str, Iterator[tuple]]:
+        """
+        Возвращает однострочный запрос и итератор кортежей значений для execute_many (cursor.executemany).
+
+        :return: Кортеж (строка SQL-запроса, итератор кортежей параметров).
+        """
+
+        rows = iter(self.rows)
+        first = next(rows, None)
+        if self.columns is None:
+            if first is None:
+                raise ValueError("Нет данных для вставки")
+            self.columns = tuple(first)
+        query = render_statement((InsertQuery, self.table_name, self.columns, ()))
+        if first is None:
+            return query, iter(())
+        return query, (self._row_values(row) for row in chain((first,), rows))
+
+    @staticmethod
+    def render(table_name, columns, row_count) -> str:
+        """
+        Собирает текст многострочного запроса INSERT. Вызывается через кэш render_statement:
+        у полных пакетов одинаковое число строк, поэтому их текст собирается один раз.
+
+        :return: Строка SQL-запроса.
+        """
+
+        row = f"({', '.join(['%s' for _ in columns])})"
+        return f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES {', '.join([row] * row_count)}"
+
+
+class InsertSelectQuery:
+    """
+    Класс для создания запросов INSERT ... SELECT. Данные копируются на стороне сервера,
+    поэтому при копировании проекта, страницы или блока BLOB-колонки не передаются через Python:
+
+        InsertSelectQuery(
+            "blocks", ("users_iduser", "block_html", "block_css", "block_js"),
+            SelectQuery("blocks", "%s", "block_html", "block_css", "block_js", conditions=["idblocks = %s"]),
+            column_params=[new_owner_id], params=[block_id],
+        )
+    """
+    __slots__ = {"table_name", "columns", "select", "column_params", "params"}
+
+    def __init__(self, table_name: str, columns: Sequence[str], select: SelectQuery, **kwargs):
+        """
+        Инициализирует объект InsertSelectQuery.
+
+        :param table_name: Имя таблицы, в которую будет выполняться вставка данных.
+        :param columns: Список колонок, в которые вставляются выбранные значения.
+        :param select: Запрос SELECT, который выбирает вставляемые значения.
+        :param kwargs: Дополнительные аргументы:
+            - column_params: Значения плейсхолдеров %s в списке колонок SELECT (например, новый владелец).
+            - params: Значения плейсхолдеров в условиях SELECT (дополняют select.params).
+        """
+
+        if not table_name:
+            raise ValueError("Имя таблицы обязательно")
+        if not columns:
+            raise ValueError("Не указаны колонки для вставки")
+
+        self.table_name = table_name
+        self.columns = tuple(columns)
+        self.select = select
+        self.column_params = list(kwargs.get("column_params", []))
+        self.params = list(kwargs.get("params", []))
+
+    def build_query(self):
+        """
+        Создает SQL-запрос INSERT ... SELECT.
+
+        :return: Кортеж, содержащий строку SQL-запроса и список параметров для безопасной вставки значений.
+        """
+
+        _, select_params = self.select.build_query()
+        query = render_statement((InsertSelectQuery, self.table_name, self.columns, self.select.shape()))
+        # Значения условий стоят в запросе сразу за select.params: после них идут LIKE, keyset и LIMIT
+        split = len(self.select.params)
+        return query, self.column_params + select_params[:split] + self.params + select_params[split:]
+
+    @staticmethod
+    def render(table_name, columns, select_shape) -> str:
+        """
+        Собирает текст запроса INSERT ... SELECT по форме. Вызывается через кэш render_statement.
+
+        :return: Строка SQL-запроса.
+        """
+
+        return f"INSERT INTO {table_name} ({', '.join(columns)}) {render_statement(select_shape)}"
+
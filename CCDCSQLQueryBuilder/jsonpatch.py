@@ -0,0 +1,197 @@
+import json
+from typing import List, Tuple
+
+OPERATIONS = ("add", "remove", "replace", "move", "copy", "test")
+
+
+def json_pointer_tokens(pointer: str) -> List[str]:
+    """
+    Разбирает JSON Pointer (RFC 6901) на части.
+
+    :param pointer: Указатель, например "/pages/0/title".
+    :return: Список частей с раскрытыми ~1 и ~0.
+    :raises ValueError: Если указатель некорректен.
+    """
+
+    if pointer == "":
+        return []
+    if not isinstance(pointer, str) or not pointer.startswith("/"):
+        raise ValueError(f"Некорректный JSON Pointer: {pointer!r}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def _is_index(token: str) -> bool:
+    return token.isdigit() and (token == "0" or not token.startswith("0"))
+
+
+def json_path(tokens: List[str]) -> str:
+    """
+    Преобразует части JSON Pointer в путь MySQL ($."pages"[0]."title"). Части из цифр считаются
+    индексами массива: по указателю нельзя отличить индекс от ключа объекта "0".
+
+    :param tokens: Части указателя.
+    :return: Путь MySQL.
+    """
+
+    path = "$"
+    for token in tokens:
+        if _is_index(token):
+            path += f"[{token}]"
+        else:
+            escaped = token.replace("\\", "\\\\").replace('"', '\\"')
+            path += f'."{escaped}"'
+    return path
+
+
+class JsonPatch:
+    """
+    Класс для преобразования операций JSON Patch (RFC 6902) в выражения MySQL над JSON-колонкой,
+    чтобы изменять документ на сервере, не читая и не перезаписывая его целиком:
+
+        add     -> JSON_SET / JSON_ARRAY_INSERT / JSON_ARRAY_APPEND (путь "/.../-")
+        remove  -> JSON_REMOVE
+        replace -> JSON_REPLACE
+        move    -> JSON_REMOVE + вставка значения JSON_EXTRACT из исходного пути
+        copy    -> вставка значения JSON_EXTRACT из исходного пути
+        test    -> условие WHERE JSON_EXTRACT(колонка, путь) = значение
+
+    Пути и значения передаются параметрами, поэтому текст запроса зависит только от набора операций.
+    Отличия от RFC 6902: remove и replace несуществующего пути не считаются ошибкой, а test
+    проверяет документ до применения патча, поэтому должна стоять перед изменяющими операциями.
+
+    JSON_SET и JSON_ARRAY_* молча пропускают путь, у которого нет родителя, поэтому существование
+    родителя целевого пути add, move и copy и исходного пути move и copy проверяется условием WHERE
+    (см. tests): UPDATE не находит строку, и вызывающий получает конфликт, а не "успешный" пустой патч.
+    """
+    __slots__ = {"column", "operations"}
+
+    def __init__(self, column: str, operations: List[dict]):
+        """
+        Инициализирует объект JsonPatch.
+
+        :param column: Имя JSON-колонки.
+        :param operations: Список операций вида {"op": "add", "path": "/pages/0/title", "value": "..."}.
+        :raises ValueError: Если операция некорректна.
+        """
+
+        if not column:
+            raise ValueError("Не указана колонка")
+
+        modified = False
+        for operation in operations:
+            op = operation.get("op")
+            if op not in OPERATIONS:
+                raise ValueError(f"Неизвестная операция JSON Patch: {op!r}")
+            if "path" not in operation:
+                raise ValueError(f"В операции {op} нет path")
+            if op in ("add", "replace", "test") and "value" not in operation:
+                raise ValueError(f"В операции {op} нет value")
+            if op in ("move", "copy") and "from" not in operation:
+                raise ValueError(f"В операции {op} нет from")
+            if op == "test" and modified:
+                raise ValueError("Операция test должна стоять перед изменяющими операциями")
+            modified = modified or op != "test"
+
+        self.column = column
+        self.operations = operations
+
+    @staticmethod
+    def _value(operation: dict) -> str:
+        return json.dumps(operation["value"], ensure_ascii=False)
+
+    def _insert(self, document: str, pointer: str, value_sql: str) -> Tuple[str, list]:
+        """
+        Собирает выражение вставки значения по указателю (семантика add).
+
+        :param document: SQL-выражение документа.
+        :param pointer: Указатель целевого пути.
+        :param value_sql: SQL-выражение значения.
+        :return: Кортеж (выражение, параметры пути); параметры значения добавляет вызывающий.
+        """
+
+        tokens = json_pointer_tokens(pointer)
+        if not tokens:
+            raise ValueError("Вставка в корень документа не поддерживается, используйте replace")
+        if tokens[-1] == "-":
+            return f"JSON_ARRAY_APPEND({document}, %s, {value_sql})", [json_path(tokens[:-1])]
+        if _is_index(tokens[-1]):
+            return f"JSON_ARRAY_INSERT({document}, %s, {value_sql})", [json_path(tokens)]
+        return f"JSON_SET({document}, %s, {value_sql})", [json_path(tokens)]
+
+    def expressions(self) -> List[Tuple[str, str, list]]:
+        """
+        Строит присваивания для UpdateQuery(expressions=...). Подряд идущие add/remove/replace
+        вкладываются в одно выражение; move и copy ссылаются на исходное значение колонки,
+        поэтому начинают новое присваивание (MySQL выполняет присваивания UPDATE слева направо).
+
+        :return: Список кортежей (колонка, SQL-выражение, параметры).
+        """
+
+        result = []
+        document, params = self.column, []
+        for operation in self.operations:
+            op = operation["op"]
+            if op == "test":
+                continue
+            if op in ("move", "copy") and params:
+                result.append((self.column, document, params))
+                document, params = self.column, []
+
+            path = json_path(json_pointer_tokens(operation["path"]))
+            if op == "add":
+                expression, path_params = self._insert(document, operation["path"], "CAST(%s AS JSON)")
+                document, params = expression, params + path_params + [self._value(operation)]
+            elif op == "remove":
+                if path == "$":
+                    raise ValueError("Нельзя удалить корень документа")
+                document, params = f"JSON_REMOVE({document}, %s)", params + [path]
+            elif op == "replace":
+                if path == "$":
+                    document, params = "CAST(%s AS JSON)", [self._value(operation)]
+                else:
+                    document = f"JSON_REPLACE({document}, %s, CAST(%s AS JSON))"
+                    params = params + [path, self._value(operation)]
+            else:
+                source = json_path(json_pointer_tokens(operation["from"]))
+                target = f"JSON_REMOVE({self.column}, %s)" if op == "move" else self.column
+                expression, path_params = self._insert(target, operation["path"], f"JSON_EXTRACT({self.column}, %s)")
+                document = expression
+                params = ([source] if op == "move" else []) + path_params + [source]
+                result.append((self.column, document, params))
+                document, params = self.column, []
+
+        if params:
+            result.append((self.column, document, params))
+        return result
+
+    def tests(self) -> Tuple[List[str], list]:
+        """
+        Строит условия WHERE: операции test и проверки существования путей, без которых add, move
+        и copy не выполняются. Условия проверяют документ до патча, поэтому пути внутри значений,
+        записанных предыдущими операциями патча, не проверяются.
+
+        :return: Кортеж (список условий, параметры).
+        """
+
+        conditions, params = [], []
+        written = []
+        for operation in self.operations:
+            op = operation["op"]
+            if op == "test":
+                conditions.append(f"JSON_EXTRACT({self.column}, %s) = CAST(%s AS JSON)")
+                params += [json_path(json_pointer_tokens(operation["path"])), self._value(operation)]
+                continue
+
+            target = json_pointer_tokens(operation["path"])
+            required = []
+            if op in ("add", "move", "copy"):
+                required.append(target[:-1])
+            if op in ("move", "copy"):
+                required.append(json_pointer_tokens(operation["from"]))
+            for tokens in required:
+                if tokens and not any(tokens[:len(prefix)] == prefix for prefix in written):
+                    conditions.append(f"JSON_CONTAINS_PATH({self.column}, 'one', %s)")
+                    params.append(json_path(tokens))
+            if op != "remove":
+                written.append(target)
+        return conditions, params
@@ -0,0 +1,315 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from CCDCSQLQueryBuilder.connect import DB
+from CCDCSQLQueryBuilder.exceptions import PoolError, PoolTimeout
+
+
+class ConnectionPool:
+    """
+    Пул соединений с базой данных MySQL, построенный вокруг класса DB.
+    Соединения переиспользуются между запросами вместо подключения на каждый запрос.
+    Пул потокобезопасен и не привязан к циклу событий, поэтому его можно использовать
+    как из потоков WSGI-сервера, так и из пула потоков асинхронного исполнителя.
+    """
+
+    def __init__(self, host: str, user: str, password: str, database: str, **kwargs):
+        """
+        Конструктор класса ConnectionPool.
+
+        :param host: Хост базы данных.
+        :param user: Пользователь базы данных.
+        :param password: Пароль пользователя базы данных.
+        :param database: Название базы данных.
+        :param kwargs: Дополнительные аргументы:
+            - min_size: Минимальное число соединений, которое пул держит открытыми (по умолчанию 1).
+            - max_size: Максимальное число соединений (по умолчанию 10).
+            - timeout: Время ожидания свободного соединения в секундах (по умолчанию 10).
+            - idle_timeout: Время простоя, после которого лишнее соединение закрывается (по умолчанию 300).
+            - max_lifetime: Время жизни соединения, после которого оно пересоздается (по умолчанию 3600).
+            - ping_interval: Соединение, простаивавшее дольше этого времени, проверяется ping при выдаче
+              (по умолчанию 1 секунда; 0 - проверять при каждой выдаче).
+            - prepared_cache_size: Число подготовленных запросов на соединение (по умолчанию 64).
+            - connection_factory: Функция без аргументов, возвращающая неподключенный объект DB
+              (по умолчанию DB с переданными параметрами подключения).
+        """
+
+        self.min_size = kwargs.get("min_size", 1)
+        self.max_size = kwargs.get("max_size", 10)
+        if self.max_size < 1 or self.min_size > self.max_size:
+            raise ValueError("Некорректные размеры пула соединений")
+
+        self.timeout = kwargs.get("timeout", 10.0)
+        self.idle_timeout = kwargs.get("idle_timeout", 300.0)
+        self.max_lifetime = kwargs.get("max_lifetime", 3600.0)
+        self.ping_interval = kwargs.get("ping_interval", 1.0)
+        self.connection_factory = kwargs.get(
+            "connection_factory",
+            lambda: DB(host=host, user=user, password=password, database=database,
+                       max_statements=kwargs.get("prepared_cache_size", 64))
+        )
+
+        self._idle = deque()
+        self._condition = threading.Condition()
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._created = 0
+        self._recycled = 0
+        self._closed = False
+
+    def fill(self):
+        """
+        Открывает соединения, пока их число не достигнет min_size.
+
+        :return: Ничего не возвращает.
+        """
+
+        while True:
+            with self._condition:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                db = self._open()
+            except PoolError:
+                with self._condition:
+                    self._size -= 1
+                    self._condition.notify()
+                raise
+            with self._condition:
+                self._idle.append(db)
+                self._condition.notify()
+
+    def acquire(self) -> DB:
+        """
+        Выдает соединение из пула. Если свободных соединений нет и пул не заполнен, открывает новое,
+        иначе ждет освобождения соединения не дольше timeout.
+
+        :return: Подключенный объект DB.
+        """
+
+        deadline = time.monotonic() + self.timeout
+        evicted = []
+        try:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        raise PoolError("Пул соединений закрыт")
+                    evicted.extend(self._evict_idle())
+                    if self._idle:
+                        db = self._idle.pop()
+                        self._in_use += 1
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        self._in_use += 1
+                        db = None
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout("Превышено время ожидания свободного соединения")
+                    self._waiting += 1
+                    try:
+                        self._condition.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+        finally:
+            for old in evicted:
+                old.disconnect()
+
+        try:
+            if db is None:
+                return self._open()
+            return self._check(db)
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, db: DB, discard: bool = False):
+        """
+        Возвращает соединение в пул.
+
+        :param db: Объект DB, полученный через acquire.
+        :param discard: Закрыть соединение вместо возврата (например, после ошибки в его состоянии).
+        :return: Ничего не возвращает.
+        """
+
+        expired = self.max_lifetime and time.monotonic() - db.created_at > self.max_lifetime
+        with self._condition:
+            self._in_use -= 1
+            if discard or expired or self._closed:
+                self._size -= 1
+                if expired and not discard:
+                    self._recycled += 1
+            else:
+                db.last_used = time.monotonic()
+                self._idle.append(db)
+                db = None
+            self._condition.notify()
+
+        if db is not None:
+            db.disconnect()
+
+    @contextmanager
+    def connection(self):
+        """
+        Контекстный менеджер, выдающий соединение и возвращающий его в пул по выходе.
+        Если внутри блока произошла ошибка, соединение закрывается, а не возвращается.
+
+        :return: Подключенный объект DB.
+        """
+
+        db = self.acquire()
+        try:
+            yield db
+        except BaseException:
+            self.release(db, discard=True)
+            raise
+        else:
+            self.release(db)
+
+    def stats(self) -> dict:
+        """
+        Возвращает текущие показатели пула для мониторинга.
+
+        :return: Словарь с ключами size, idle, in_use, waiting, created, recycled.
+        """
+
+        with self._condition:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "waiting": self._waiting,
+                "created": self._created,
+                "recycled": self._recycled,
+            }
+
+    def close(self):
+        """
+        Закрывает все свободные соединения. Занятые соединения закрываются при возврате.
+
+        :return: Ничего не возвращает.
+        """
+
+        with self._condition:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for db in idle:
+            db.disconnect()
+
+    def _open(self) -> DB:
+        """
+        Открывает новое соединение.
+
+        :return: Подключенный объект DB.
+        """
+
+        db = self.connection_factory()
+        db.connect()
+        if db.link is None:
+            raise PoolError("Не удалось подключиться к базе данных")
+        with self._condition:
+            self._created += 1
+        return db
+
+    def _check(self, db: DB) -> DB:
+        """
+        Проверяет соединение перед выдачей: пересоздает его, если истекло время жизни
+        или соединение не отвечает на ping.
+
+        :param db: Объект DB из списка свободных соединений.
+        :return: Подключенный объект DB.
+        """
+
+        now = time.monotonic()
+        if self.max_lifetime and now - db.created_at > self.max_lifetime:
+            recycle = True
+        elif now - db.last_used >= self.ping_interval:
+            recycle = not db.is_alive()
+        else:
+            recycle = False
+
+        if not recycle:
+            return db
+
+        db.disconnect()
+        with self._condition:
+            self._recycled += 1
+        return self._open()
+
+    def _evict_idle(self):
+        """
+        Убирает из пула соединения, простаивающие дольше idle_timeout, оставляя не меньше min_size соединений.
+        Вызывается под блокировкой пула, сами соединения закрывает вызывающий код вне блокировки.
+
+        :return: Список убранных из пула объектов DB.
+        """
+
+        evicted = []
+        if not self.idle_timeout:
+            return evicted
+        now = time.monotonic()
+        while self._idle and self._size > self.min_size and now - self._idle[0].last_used > self.idle_timeout:
+            evicted.append(self._idle.popleft())
+            self._size -= 1
+            self._recycled += 1
+        return evicted
+
+
+_pool = None
+
+
+def configure_pool(config: dict) -> ConnectionPool:
+    """
+    Создает пул соединений по настройкам settings['DATABASE'] и делает его пулом по умолчанию.
+
+    :param config: Словарь с ключами HOST, USER, PASSWORD, NAME и необязательными POOL_MIN_SIZE,
+        POOL_MAX_SIZE, POOL_TIMEOUT, POOL_IDLE_TIMEOUT, POOL_MAX_LIFETIME, POOL_PING_INTERVAL, PREPARED_CACHE_SIZE.
+    :return: Созданный пул соединений.
+    """
+
+    global _pool
+
+    pool = ConnectionPool(
+        host=config["HOST"],
+        user=config["USER"],
+        password=config["PASSWORD"],
+        database=config["NAME"],
+        min_size=config.get("POOL_MIN_SIZE", 1),
+        max_size=config.get("POOL_MAX_SIZE", 10),
+        timeout=config.get("POOL_TIMEOUT", 10.0),
+        idle_timeout=config.get("POOL_IDLE_TIMEOUT", 300.0),
+        max_lifetime=config.get("POOL_MAX_LIFETIME", 3600.0),
+        ping_interval=config.get("POOL_PING_INTERVAL", 1.0),
+        prepared_cache_size=config.get("PREPARED_CACHE_SIZE", 64),
+    )
+    try:
+        pool.fill()
+    except PoolError as err:
+        print(f"Ошибка при заполнении пула соединений: {err}")
+
+    if _pool is not None:
+        _pool.close()
+    _pool = pool
+    return pool
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Возвращает пул соединений по умолчанию.
+
+    :return: Пул соединений, созданный configure_pool.
+    """
+
+    if _pool is None:
+        raise PoolError("Пул соединений не настроен, вызовите configure_pool(settings['DATABASE'])")
+    return _pool
@@ -0,0 +1,153 @@
+import asyncio
+from typing import Dict, Iterable, Iterator, List, Tuple
+from CCDCSQLQueryBuilder.select import SelectQuery
+from CCDCSQLQueryBuilder.statements import render_statement
+from CCDCSQLQueryBuilder.execute import execute_query
+
+
+class RelationQuery:
+    """
+    Класс для загрузки дочерних строк сразу для многих родителей. Вместо запроса на каждого родителя
+    строится SELECT ... WHERE foreign_key IN (%s, ...) на пакет идентификаторов, а строки
+    группируются по родителю в Python:
+
+        projects = RelationQuery("projects", "users_iduser", user_ids, "idprojects", "project_name")
+        rows = []
+        for query, params in projects.batches():
+            rows += await execute_query(query, params, "fetchall") or []
+        by_user = projects.group(rows)
+    """
+
+    def __init__(self, table_name: str, foreign_key: str, ids: Iterable, *columns, **kwargs):
+        """
+        Инициализирует объект RelationQuery.
+
+        :param table_name: Имя дочерней таблицы.
+        :param foreign_key: Колонка дочерней таблицы со ссылкой на родителя (например, users_iduser).
+        :param ids: Идентификаторы родителей; повторы отбрасываются.
+        :param columns: Выбираемые колонки (по умолчанию все); колонка foreign_key добавляется автоматически.
+        :param kwargs: Дополнительные аргументы:
+            - chunk_size: Максимальное число идентификаторов в одном запросе (по умолчанию 1000).
+            - conditions: Дополнительные условия с плейсхолдерами %s.
+            - params: Список значений для плейсхолдеров в conditions.
+            - order_by: Сортировка дочерних строк внутри родителя (опциональный).
+        """
+
+        if not table_name:
+            raise ValueError("Имя таблицы обязательно")
+        if not foreign_key:
+            raise ValueError("Не указан внешний ключ")
+
+        self.table_name = table_name
+        self.foreign_key = foreign_key
+        self.ids = list(dict.fromkeys(ids))
+        if columns and foreign_key not in columns:
+            columns = (foreign_key,) + tuple(columns)
+        self.columns = tuple(columns)
+        self.chunk_size = kwargs.get("chunk_size", 1000)
+        self.conditions = tuple(kwargs.get("conditions", ()))
+        self.params = list(kwargs.get("params", []))
+        self.order_by = kwargs.get("order_by", None)
+
+    def _shape(self, chunk_length: int) -> tuple:
+        in_condition = f"{self.foreign_key} IN ({', '.join(['%s'] * chunk_length)})"
+        return SelectQuery(self.table_name, *self.columns, conditions=(in_condition,) + self.conditions,
+                           order_by=self.order_by).shape()
+
+    def batches(self) -> Iterator[Tuple[str, List]]:
+        """
+        Формирует пакеты запросов SELECT ... WHERE foreign_key IN (...).
+
+        :return: Генератор кортежей (строка SQL-запроса, список параметров).
+        """
+
+        for start in range(0, len(self.ids), self.chunk_size):
+            chunk = self.ids[start:start + self.chunk_size]
+            yield render_statement(self._shape(len(chunk))), chunk + self.params
+
+    def group(self, rows: Iterable[dict]) -> Dict[object, List[dict]]:
+        """
+        Группирует строки по родителю.
+
+        :param rows: Строки всех пакетов (словари).
+        :return: Словарь {идентификатор родителя: список строк}; у родителей без детей - пустой список.
+        """
+
+        grouped = {parent_id: [] for parent_id in self.ids}
+        for row in rows:
+            grouped.setdefault(row[self.foreign_key], []).append(row)
+        return grouped
+
+
+class RelationCountQuery(RelationQuery):
+    """
+    Класс для подсчета дочерних строк у многих родителей одним запросом
+    SELECT foreign_key, COUNT(*) ... WHERE foreign_key IN (...) GROUP BY foreign_key.
+    """
+
+    def __init__(self, table_name: str, foreign_key: str, ids: Iterable, **kwargs):
+        """
+        Инициализирует объект RelationCountQuery.
+
+        :param table_name: Имя дочерней таблицы.
+        :param foreign_key: Колонка дочерней таблицы со ссылкой на родителя.
+        :param ids: Идентификаторы родителей.
+        :param kwargs: Те же дополнительные аргументы, что у RelationQuery, кроме order_by.
+        """
+
+        super().__init__(table_name, foreign_key, ids, foreign_key, "COUNT(*) AS count", **kwargs)
+
+    def _shape(self, chunk_length: int) -> tuple:
+        in_condition = f"{self.foreign_key} IN ({', '.join(['%s'] * chunk_length)})"
+        return SelectQuery(self.table_name, *self.columns, conditions=(in_condition,) + self.conditions,
+                           group_by=self.foreign_key).shape()
+
+    def group(self, rows: Iterable[dict]) -> Dict[object, int]:
+        """
+        Собирает количество дочерних строк по родителю.
+
+        :param rows: Строки всех пакетов (словари).
+        :return: Словарь {идентификатор родителя: количество}; у родителей без детей - 0.
+        """
+
+        counts = dict.fromkeys(self.ids, 0)
+        for row in rows:
+            counts[row[self.foreign_key]] = row["count"]
+        return counts
+
+
+async def fetch_relation(relation: RelationQuery, timeout: float = None) -> dict:
+    """
+    Выполняет все пакеты запроса связи параллельно на соединениях пула и группирует результат.
+
+    :param relation: Объект RelationQuery или RelationCountQuery.
+    :param timeout: Время ожидания каждого запроса в секундах (по умолчанию QUERY_TIMEOUT).
+    :return: Результат relation.group.
+    """
+
+    results = await asyncio.gather(*[
+        execute_query(query, params, "fetchall", timeout=timeout) for query, params in relation.batches()
+    ])
+    return relation.group(row for rows in results if rows for row in rows)
+
+
+async def load_related(table_name: str, foreign_key: str, ids: Iterable, *columns, **kwargs) -> Dict[object, List[dict]]:
+    """
+    Загружает дочерние строки для списка родителей (см. RelationQuery).
+
+    :return: Словарь {идентификатор родителя: список строк}.
+    """
+
+    timeout = kwargs.pop("timeout", None)
+    return await fetch_relation(RelationQuery(table_name, foreign_key, ids, *columns, **kwargs), timeout)
+
+
+async def count_related(table_name: str, foreign_key: str, ids: Iterable, **kwargs) -> Dict[object, int]:
+    """
+    Считает дочерние строки для списка родителей (см. RelationCountQuery).
+
+    :return: Словарь {идентификатор родителя: количество}.
+    """
+
+    timeout = kwargs.pop("timeout", None)
+    return await fetch_relation(RelationCountQuery(table_name, foreign_key, ids, **kwargs), timeout)
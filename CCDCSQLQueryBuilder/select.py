@@ -1,6 +1,64 @@
+import base64
+import json
+from typing import List, Optional, Sequence
+from CCDCSQLQueryBuilder.statements import render_statement
+
+
+def encode_cursor(values: Sequence) -> str:
+    """
+    Упаковывает значения ключа последней строки страницы в непрозрачный токен продолжения.
+
+    :param values: Значения колонок ключа пагинации.
+    :return: Строка, безопасная для URL.
+    """
+
+    data = json.dumps(list(values), separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(token: str, size: int) -> List:
+    """
+    Распаковывает токен продолжения, созданный encode_cursor.
+
+    :param token: Токен продолжения.
+    :param size: Ожидаемое число значений (число колонок ключа пагинации).
+    :return: Список значений ключа.
+    :raises ValueError: Если токен поврежден или создан для другого ключа.
+    """
+
+    try:
+        data = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(data.decode("utf-8"))
+    except (ValueError, TypeError):
+        raise ValueError("Некорректный токен пагинации") from None
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Некорректный токен пагинации")
+    return values
+
+
+def escape_like(value: str) -> str:
+    """
+    Экранирует символы шаблона LIKE (%, _ и \\), чтобы значение искалось буквально.
+
+    :param value: Искомая строка.
+    :return: Экранированная строка.
+    """
+
+    return str(value).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
 class SelectQuery:
     """
     Класс для создания SQL-запросов SELECT.
+
+    Постраничная выборка по ключу (keyset) не использует OFFSET: следующая страница начинается
+    с условия по индексированной колонке, поэтому время загрузки не зависит от номера страницы:
+
+        query = SelectQuery("blocks", "idblocks", "block_html", conditions=["users_iduser = %s"],
+                            keyset="idblocks", limit=50, after=token)
+        query.params.append(user_id)
+        rows = await execute_query(*query.build_query(), "fetchall")
+        token = query.next_token(rows)
     """
 
     def __init__(self, table_name, *args, **kwargs):
@@ -12,8 +70,17 @@ class SelectQuery:
         :param kwargs: Дополнительные аргументы:
             - conditions: Список условий для фильтрации результатов (опциональный).
             - order_by: Название колонки для сортировки результатов (опциональный).
+            - group_by: Колонка или список колонок для GROUP BY (опциональный).
             - like_column: Название колонки для операции LIKE (опциональный).
             - like_value: Значение для операции LIKE (опциональный).
+            - like_mode: "contains" (LIKE '%значение%', по умолчанию) или "prefix" (LIKE 'значение%',
+              может использовать индекс по колонке).
+            - limit: Максимальное число строк (опциональный).
+            - offset: Число пропускаемых строк (опциональный; для больших таблиц используйте keyset).
+            - keyset: Колонка или кортеж колонок ключа пагинации; сочетание значений должно быть
+              уникальным (например, первичный ключ). Задает сортировку, поэтому не совместим с order_by.
+            - descending: Сортировать ли по ключу пагинации в обратном порядке (по умолчанию False).
+            - after: Токен продолжения из next_token - выборка начнется со строки после него.
         """
 
         if not table_name:
@@ -23,32 +90,120 @@ class SelectQuery:
         self.columns = args
         self.conditions = kwargs.get("conditions", [])
         self.order_by = kwargs.get("order_by", None)
+        group_by = kwargs.get("group_by", None)
+        self.group_by = tuple(group_by) if isinstance(group_by, list) else group_by
         self.like_column = kwargs.get("like_column", None)
         self.like_value = kwargs.get("like_value", None)
+        self.like_mode = kwargs.get("like_mode", "contains")
+        self.limit = kwargs.get("limit", None)
+        self.offset = kwargs.get("offset", None)
+        keyset = kwargs.get("keyset", ())
+        self.keyset = (keyset,) if isinstance(keyset, str) else tuple(keyset)
+        self.descending = kwargs.get("descending", False)
+        self.after = kwargs.get("after", None)
         self.params = []
 
+        if self.like_mode not in ("contains", "prefix"):
+            raise ValueError(f"Неизвестный режим LIKE: {self.like_mode}")
+        if self.keyset and self.order_by:
+            raise ValueError("keyset задает сортировку и не совместим с order_by")
+        if self.after is not None and not self.keyset:
+            raise ValueError("Для токена продолжения нужен keyset")
+
+    def shape(self) -> tuple:
+        """
+        Возвращает форму запроса - хэшируемый кортеж без значений параметров.
+
+        :return: Кортеж (SelectQuery, таблица, колонки, условия, сортировка, колонка LIKE,
+            ключ пагинации, обратный порядок, есть ли токен, есть ли LIMIT, есть ли OFFSET, группировка).
+        """
+
+        like_column = self.like_column if self.like_column and self.like_value else None
+        return (SelectQuery, self.table_name, tuple(self.columns), tuple(self.conditions), self.order_by,
+                like_column, self.keyset, bool(self.descending), self.after is not None,
+                self.limit is not None, self.offset is not None, self.group_by)
+
+    @staticmethod
+    def render(table_name, columns, conditions, order_by, like_column,
+               keyset=(), descending=False, has_after=False, has_limit=False, has_offset=False,
+               group_by=None) -> str:
+        """
+        Собирает текст запроса SELECT по форме. Вызывается через кэш render_statement.
+
+        :return: Строка SQL-запроса.
+        """
+
+        columns_str = ", ".join(columns) if columns else "*"
+        if like_column:
+            conditions += (f"{like_column} LIKE %s",)
+        if keyset:
+            operator = "<" if descending else ">"
+            placeholders = ", ".join(["%s"] * len(keyset))
+            if len(keyset) == 1:
+                seek = f"{keyset[0]} {operator} %s"
+            else:
+                # Сравнение строк (a, b) > (x, y) MySQL выполняет как поиск по диапазону составного индекса
+                seek = f"({', '.join(keyset)}) {operator} ({placeholders})"
+            if has_after:
+                conditions += (seek,)
+            direction = " DESC" if descending else ""
+            order_by = ", ".join([f"{column}{direction}" for column in keyset])
+
+        query = f"SELECT {columns_str} FROM {table_name}"
+        if conditions:
+            query += f" WHERE {' AND '.join(conditions)}"
+        if group_by:
+            query += f" GROUP BY {group_by if isinstance(group_by, str) else ', '.join(group_by)}"
+        if order_by:
+            query += f" ORDER BY {order_by}"
+        if has_limit:
+            query += " LIMIT %s"
+        if has_offset:
+            query += " OFFSET %s" if has_limit else " LIMIT 18446744073709551615 OFFSET %s"
+        return query
+
     def build_query(self):
         """
-        Создает SQL-запрос SELECT на основе заданных параметров.
+        Создает SQL-запрос SELECT на основе заданных параметров. Текст запроса берется из кэша по форме запроса.
 
         :return: Кортеж, содержащий строку SQL-запроса и список параметров для безопасной вставки значений.
         """
 
-        columns_str = ", ".join(self.columns) if self.columns else "*"
-        conditions_str = " AND ".join(self.conditions) if self.conditions else ""
-        order_by_str = f" ORDER BY {self.order_by}" if self.order_by else ""
-        like_str = ""
+        query_params = list(self.params)
+        if self.like_column and self.like_value:
+            value = escape_like(self.like_value)
+            query_params.append(f'{value}%' if self.like_mode == "prefix" else f'%{value}%')
+        if self.keyset:
+            if self.columns and "*" not in self.columns:
+                missing = [column for column in self.keyset if column not in self.columns]
+                if missing:
+                    raise ValueError(f"Колонки ключа пагинации должны быть выбраны: {', '.join(missing)}")
+            if self.after is not None:
+                query_params.extend(decode_cursor(self.after, len(self.keyset)))
+        if self.limit is not None:
+            query_params.append(int(self.limit))
+        if self.offset is not None:
+            query_params.append(int(self.offset))
 
-        query_params = self.params
+        return render_statement(self.shape()), query_params
 
-        if self.like_column and self.like_value:
-            like_str = f" AND {self.like_column} LIKE %s"
-            query_params.append(f'%{self.like_value}%')
+    def next_token(self, rows: Sequence) -> Optional[str]:
+        """
+        Возвращает токен продолжения для следующей страницы keyset-выборки.
+
+        :param rows: Строки текущей страницы (словари или кортежи в порядке колонок запроса).
+        :return: Токен для параметра after или None, если страница последняя.
+        """
 
-        query = f"SELECT {columns_str} FROM {self.table_name}"
-        if conditions_str:
-            query += f" WHERE {conditions_str}"
-        query += like_str
-        query += order_by_str
+        if not self.keyset:
+            raise ValueError("Токен продолжения доступен только для выборки с keyset")
+        if not rows or (self.limit is not None and len(rows) < self.limit):
+            return None
 
-        return query, query_params
+        last = rows[-1]
+        if isinstance(last, dict):
+            # Курсор-словарь возвращает колонку "t.col" под именем "col"
+            values = [last[column.rsplit(".", 1)[-1]] for column in self.keyset]
+        else:
+            values = [last[self.columns.index(column)] for column in self.keyset]
+        return encode_cursor(values)
@@ -0,0 +1,30 @@
+from functools import lru_cache
+
+STATEMENT_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def render_statement(shape: tuple) -> str:
+    """
+    Возвращает текст SQL-запроса по его форме (shape). Форма - хэшируемый кортеж
+    (класс построителя, таблица, колонки, условия, ...) без значений параметров, поэтому
+    одинаковые запросы с разными значениями собираются из строк один раз.
+    Для одной формы всегда возвращается один и тот же объект строки, поэтому подготовленный курсор
+    соединения узнает уже подготовленный запрос без повторного разбора на сервере.
+
+    :param shape: Кортеж, первый элемент которого - класс построителя с методом render.
+    :return: Строка SQL-запроса с плейсхолдерами %s.
+    """
+
+    builder, *parts = shape
+    return builder.render(*parts)
+
+
+def statement_cache_info():
+    """
+    Возвращает статистику кэша SQL-запросов (hits, misses, maxsize, currsize).
+
+    :return: Объект functools._CacheInfo.
+    """
+
+    return render_statement.cache_info()
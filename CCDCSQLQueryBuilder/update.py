@@ -1,3 +1,9 @@
+from itertools import chain
+from typing import Iterable, Iterator, List, Tuple
+from CCDCSQLQueryBuilder.statements import render_statement
+from CCDCSQLQueryBuilder.jsonpatch import JsonPatch
+
+
 class UpdateQuery:
     """
     Класс для создания SQL-запроса UPDATE.
@@ -9,7 +15,14 @@ class UpdateQuery:
 
         :param table_name: Имя таблицы, которую необходимо обновить.
         :param data: Словарь, содержащий пары ключ-значение для обновления в таблице.
-        :param kwargs: Дополнительные аргументы (например, conditions для фильтрации).
+        :param kwargs: Дополнительные аргументы:
+            - conditions: Список условий для фильтрации строк с плейсхолдерами %s (например, "idblocks = %s").
+            - params: Список значений для плейсхолдеров в conditions.
+            - expressions: Список кортежей (колонка, SQL-выражение, параметры выражения), присваиваемых
+              после data, например ("version", "version + 1", []). Присваивания выполняются слева направо,
+              поэтому одна колонка может встречаться несколько раз.
+            - json_patch: Словарь {JSON-колонка: список операций JSON Patch (RFC 6902)} - изменения
+              применяются на сервере через JSON_SET / JSON_REMOVE (см. JsonPatch).
         """
 
         if not table_name:
@@ -18,20 +31,156 @@ class UpdateQuery:
         self.table_name = table_name
         self.data = data
         self.conditions = kwargs.get("conditions", [])
+        self.params = list(kwargs.get("params", []))
+        self.expressions = list(kwargs.get("expressions", []))
+        for column, operations in kwargs.get("json_patch", {}).items():
+            patch = JsonPatch(column, operations)
+            self.expressions = patch.expressions() + self.expressions
+            test_conditions, test_params = patch.tests()
+            self.conditions = list(self.conditions) + test_conditions
+            self.params += test_params
 
-    def build_query(self):
+    def shape(self) -> tuple:
         """
-        Создает SQL-запрос UPDATE на основе данных объекта.
+        Возвращает форму запроса - хэшируемый кортеж без значений параметров.
 
-        :return: Строка с SQL-запросом UPDATE.
+        :return: Кортеж (UpdateQuery, таблица, колонки, условия, выражения).
         """
 
-        update_pairs = [f"{key} = '{value}'" for key, value in self.data.items()]
-        update_str = ", ".join(update_pairs)
-        conditions_str = " AND ".join(self.conditions) if self.conditions else ""
+        expressions = tuple((column, expression) for column, expression, _ in self.expressions)
+        return UpdateQuery, self.table_name, tuple(self.data), tuple(self.conditions), expressions
 
-        query = f"UPDATE {self.table_name} SET {update_str}"
-        if conditions_str:
-            query += f" WHERE {conditions_str}"
+    @staticmethod
+    def render(table_name, columns, conditions, expressions=()) -> str:
+        """
+        Собирает текст запроса UPDATE по форме. Вызывается через кэш render_statement.
+
+        :return: Строка SQL-запроса.
+        """
 
+        assignments = [f"{column} = %s" for column in columns]
+        assignments += [f"{column} = {expression}" for column, expression in expressions]
+        query = f"UPDATE {table_name} SET {', '.join(assignments)}"
+        if conditions:
+            query += f" WHERE {' AND '.join(conditions)}"
         return query
+
+    def build_query(self):
+        """
+        Создает SQL-запрос UPDATE на основе данных объекта. Значения передаются параметрами,
+        текст запроса берется из кэша по форме запроса.
+
+        :return: Кортеж, содержащий строку SQL-запроса и список параметров для безопасной вставки значений.
+        """
+
+        if not self.data and not self.expressions:
+            raise ValueError("Нет данных для обновления")
+        params = list(self.data.values())
+        for _, _, expression_params in self.expressions:
+            params += expression_params
+        return render_statement(self.shape()), params + self.params
+
+
+class BatchUpdateQuery:
+    """
+    Класс для обновления многих строк по ключу. Строки разбиваются на пакеты вида
+    UPDATE t SET col = CASE key WHEN %s THEN %s ... ELSE col END, ... WHERE key IN (%s, ...),
+    поэтому тысяча строк обновляется несколькими запросами, а не тысячей.
+    Пакеты выполняются в одной транзакции через execute_batch.
+    """
+
+    def __init__(self, table_name: str, key_column: str, rows: Iterable[dict], **kwargs):
+        """
+        Инициализирует объект BatchUpdateQuery.
+
+        :param table_name: Имя таблицы, которую необходимо обновить.
+        :param key_column: Колонка-ключ (обычно первичный ключ), по которой находятся строки.
+        :param rows: Итератор словарей {key_column: ключ, колонка: значение, ...}; у всех строк
+            должен быть одинаковый набор колонок.
+        :param kwargs: Дополнительные аргументы:
+            - chunk_size: Максимальное число строк в одном запросе (по умолчанию 500).
+        """
+
+        if not table_name:
+            raise ValueError("Имя таблицы обязательно")
+        if not key_column:
+            raise ValueError("Не указана колонка-ключ")
+
+        self.table_name = table_name
+        self.key_column = key_column
+        self.rows = rows
+        self.chunk_size = kwargs.get("chunk_size", 500)
+
+    def _split(self, row: dict, columns: tuple) -> Tuple[object, tuple]:
+        if row.keys() - {self.key_column} != set(columns) or self.key_column not in row:
+            raise ValueError("У всех строк должны быть ключ и одинаковый набор колонок")
+        return row[self.key_column], tuple(row[column] for column in columns)
+
+    def batches(self) -> Iterator[Tuple[str, List]]:
+        """
+        Формирует пакеты запросов UPDATE ... CASE.
+
+        :return: Генератор кортежей (строка SQL-запроса, список параметров).
+        """
+
+        columns = None
+        chunk = []
+        for row in self.rows:
+            if columns is None:
+                columns = tuple(column for column in row if column != self.key_column)
+                if not columns:
+                    raise ValueError("Нет данных для обновления")
+            chunk.append(self._split(row, columns))
+            if len(chunk) >= self.chunk_size:
+                yield self._build_chunk(columns, chunk)
+                chunk = []
+        if chunk:
+            yield self._build_chunk(columns, chunk)
+
+    def _build_chunk(self, columns: tuple, chunk: list) -> Tuple[str, List]:
+        params = []
+        for index in range(len(columns)):
+            for key, values in chunk:
+                params.append(key)
+                params.append(values[index])
+        params.extend(key for key, _ in chunk)
+        query = render_statement((BatchUpdateQuery, self.table_name, self.key_column, columns, len(chunk)))
+        return query, params
+
+    def executemany_args(self) -> Tuple[str, Iterator[tuple]]:
+        """
+        Возвращает однострочный запрос UPDATE ... WHERE key = %s и итератор кортежей значений
+        для execute_many (cursor.executemany).
+
+        :return: Кортеж (строка SQL-запроса, итератор кортежей параметров).
+        """
+
+        rows = iter(self.rows)
+        first = next(rows, None)
+        if first is None:
+            raise ValueError("Нет данных для обновления")
+        columns = tuple(column for column in first if column != self.key_column)
+        query = render_statement((UpdateQuery, self.table_name, columns, (f"{self.key_column} = %s",)))
+
+        def params():
+            for row in chain((first,), rows):
+                key, values = self._split(row, columns)
+                yield values + (key,)
+
+        return query, params()
+
+    @staticmethod
+    def render(table_name, key_column, columns, row_count) -> str:
+        """
+        Собирает текст запроса UPDATE ... CASE для пакета из row_count строк.
+        Вызывается через кэш render_statement.
+
+        :return: Строка SQL-запроса.
+        """
+
+        whens = " ".join(["WHEN %s THEN %s"] * row_count)
+        assignments = ", ".join(
+            [f"{column} = CASE {key_column} {whens} ELSE {column} END" for column in columns]
+        )
+        keys = ", ".join(["%s"] * row_count)
+        return f"UPDATE {table_name} SET {assignments} WHERE {key_column} IN ({keys})"
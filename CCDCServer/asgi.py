@@ -0,0 +1,362 @@
+import asyncio
+import inspect
+from functools import partial
+from tempfile import SpooledTemporaryFile
+from CCDCServer.main import CCDCServer
+from CCDCServer.exceptions import BadRequest, NotFound, NotAllowed, RequestEntityTooLarge, Conflict
+from CCDCServer.view import View
+from CCDCServer.request import Request
+from CCDCServer.response import Response, FileResponse
+from CCDCServer.storage_environ import EnvironStorage
+
+
+class ASGIInput:
+    """
+    Поток тела запроса ASGI (wsgi.input). Части тела получаются из receive по мере чтения потока:
+    синхронный view, который выполняется в пуле потоков, разбирает тело (например, multipart/form-data
+    с файлами) по мере поступления, не дожидаясь его целиком.
+
+    Синхронное чтение ждет receive в цикле событий запроса, поэтому в самом цикле событий оно невозможно.
+    Перед вызовом async-view (Request разбирает тело синхронно) оставшееся тело дочитывается методом preload
+    в SpooledTemporaryFile: небольшие тела остаются в памяти, тела больше spool_size сбрасываются во временный файл.
+    """
+    __slots__ = ('_receive', '_loop', '_buffer', '_more', '_spool', 'spool_size', 'max_size', 'size')
+
+    def __init__(self, receive, loop: asyncio.AbstractEventLoop, spool_size: int, max_size: int = None):
+        """
+        Конструктор класса ASGIInput.
+
+        :param receive: Корутина для получения сообщений от сервера.
+        :param loop: Цикл событий запроса.
+        :param spool_size: Размер тела, после которого preload сбрасывает его во временный файл.
+        :param max_size: Максимальный размер тела: части сверх него preload не сохраняет (Request ответит 413).
+        """
+        self._receive = receive
+        self._loop = loop
+        self._buffer = bytearray()
+        self._more = True
+        self._spool = None
+        self.spool_size = spool_size
+        self.max_size = max_size
+        # Число байт тела, полученных из receive
+        self.size = 0
+
+    async def _receive_chunk(self) -> bytes:
+        """
+        Получает следующую часть тела из receive.
+
+        :return: Байты части тела (b'', если тело закончилось или клиент отключился).
+        """
+        if not self._more:
+            return b''
+        message = await self._receive()
+        if message['type'] == 'http.disconnect':
+            self._more = False
+            return b''
+        self._more = message.get('more_body', False)
+        chunk = message.get('body', b'')
+        self.size += len(chunk)
+        return chunk
+
+    async def preload(self) -> int:
+        """
+        Дочитывает оставшееся тело запроса в SpooledTemporaryFile, после чего поток можно читать синхронно
+        в цикле событий.
+
+        :return: Полный размер тела в байтах.
+        """
+        if self._spool is None and self._more:
+            spool = SpooledTemporaryFile(max_size=self.spool_size)
+            spool.write(self._buffer)
+            self._buffer = bytearray()
+            while self._more:
+                chunk = await self._receive_chunk()
+                if self.max_size is None or self.size <= self.max_size:
+                    spool.write(chunk)
+            spool.seek(0)
+            self._spool = spool
+        return self.size
+
+    def _fill(self, ready) -> None:
+        """
+        Получает части тела, пока ready(буфер) не вернет True или тело не закончится.
+        """
+        while self._more and not ready(self._buffer):
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is self._loop:
+                raise RuntimeError("Тело запроса ASGI нельзя читать синхронно в цикле событий до preload")
+            self._buffer += asyncio.run_coroutine_threadsafe(self._receive_chunk(), self._loop).result()
+
+    def _take(self, size: int) -> bytes:
+        if size < 0 or size >= len(self._buffer):
+            data, self._buffer = bytes(self._buffer), bytearray()
+            return data
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Читает не больше size байт (все оставшееся тело, если size отрицательный).
+
+        :param size: Число байт.
+        :return: Прочитанные байты.
+        """
+        if self._spool is not None:
+            return self._spool.read(size)
+        size = -1 if size is None else size
+        self._fill(lambda buffer: 0 <= size <= len(buffer))
+        return self._take(size)
+
+    def readline(self, size: int = -1) -> bytes:
+        """
+        Читает одну строку (не больше size байт).
+
+        :param size: Максимальная длина строки.
+        :return: Прочитанные байты.
+        """
+        if self._spool is not None:
+            return self._spool.readline(size)
+        size = -1 if size is None else size
+        self._fill(lambda buffer: b'\n' in buffer or 0 <= size <= len(buffer))
+        end = self._buffer.find(b'\n') + 1 or len(self._buffer)
+        return self._take(end if size < 0 else min(end, size))
+
+
+class CCDCASGIServer(CCDCServer):
+    """
+    ASGI-приложение, использующее те же маршруты (Url), view, Request, Response и middleware, что и CCDCServer.
+    Методы view могут быть объявлены как async def - тогда они выполняются прямо в цикле событий.
+    Синхронные методы view выполняются в пуле потоков, чтобы не блокировать цикл событий.
+    """
+    __slots__ = ('async_chain',)
+
+    def __init__(self, *args, **kwargs):
+        """
+        Конструктор класса CCDCASGIServer. Принимает те же аргументы, что и CCDCServer,
+        и дополнительно собирает асинхронную цепочку middleware.
+        """
+        super().__init__(*args, **kwargs)
+        self.async_chain = self._build_async_chain()
+
+    async def __call__(self, scope: dict, receive, send):
+        """
+        Точка входа ASGI.
+
+        :param scope: Словарь с информацией о соединении.
+        :param receive: Корутина для получения сообщений от сервера.
+        :param send: Корутина для отправки сообщений серверу.
+        :return: Ничего не возвращает.
+        """
+        if scope['type'] == 'lifespan':
+            await self._handle_lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f"Неподдерживаемый тип соединения: {scope['type']}")
+
+        environ = await self._build_environ(scope, receive)
+        EnvironStorage.set_environ(environ)
+        EnvironStorage.set_start_response(None)
+        request = self._get_request(environ)
+        response = await self.async_chain(request)
+
+        await self._send_response(send, response)
+
+    def _build_async_chain(self):
+        """
+        Метод собирает асинхронную цепочку middleware (BaseMiddleware.process_async) так же, как CCDCServer._build_chain.
+
+        :return: Корутина, принимающая объект запроса (Request) и возвращающая объект ответа (Response).
+        """
+        handler = self._dispatch_async
+        for middleware in reversed(self.middlewares):
+            handler = partial(middleware.process_async, call_next=handler)
+        return handler
+
+    async def _dispatch_async(self, request: Request) -> Response:
+        """
+        Асинхронный вариант CCDCServer._dispatch.
+
+        :param request: Объект запроса (Request).
+        :return: Объект ответа (Response).
+        """
+        try:
+            view, kwargs = self._get_view(request.environ)
+            return await self._get_response_async(request.environ, view, request, **kwargs)
+        except NotFound:
+            return self._handle_404(request)
+        except NotAllowed:
+            return self._handle_405(request)
+        except BadRequest:
+            return self._handle_400(request)
+        except RequestEntityTooLarge:
+            return self._handle_413(request)
+        except Conflict:
+            return self._handle_409(request)
+
+    @staticmethod
+    async def _handle_lifespan(receive, send):
+        """
+        Метод обрабатывает сообщения протокола lifespan (запуск и остановка приложения).
+
+        :param receive: Корутина для получения сообщений от сервера.
+        :param send: Корутина для отправки сообщений серверу.
+        :return: Ничего не возвращает.
+        """
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _build_environ(self, scope: dict, receive) -> dict:
+        """
+        Метод строит WSGI-совместимый словарь environ из ASGI scope, чтобы Request,
+        Redirect и middleware работали без изменений. Тело запроса (wsgi.input) читается из receive
+        по мере чтения (см. ASGIInput).
+
+        :param scope: Словарь с информацией о соединении.
+        :param receive: Корутина для получения сообщений от сервера.
+        :return: Словарь environ.
+        """
+        body = ASGIInput(receive, asyncio.get_running_loop(),
+                         spool_size=self.settings.get('ASGI_BODY_SPOOL_SIZE', 1024 * 1024),
+                         max_size=self.settings.get('MAX_BODY_SIZE'))
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            'PATH_INFO': scope['path'],
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'asgi.scope': scope,
+        }
+
+        server = scope.get('server')
+        if server:
+            environ['SERVER_NAME'], environ['SERVER_PORT'] = server[0], str(server[1])
+        client = scope.get('client')
+        if client:
+            environ['REMOTE_ADDR'] = client[0]
+
+        for raw_name, raw_value in scope.get('headers', []):
+            name = raw_name.decode('latin-1').upper().replace('-', '_')
+            value = raw_value.decode('latin-1')
+            if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                name = f'HTTP_{name}'
+            if name in environ:
+                separator = '; ' if name == 'HTTP_COOKIE' else ','
+                value = f'{environ[name]}{separator}{value}'
+            environ[name] = value
+
+        if 'CONTENT_LENGTH' not in environ:
+            # Размер тела без Content-Length (chunked) известен только после чтения всего тела
+            body_size = await body.preload()
+            if body_size:
+                environ['CONTENT_LENGTH'] = str(body_size)
+
+        return environ
+
+    async def _get_response_async(self, environ: dict, view: View, request: Request, **kwargs) -> Response:
+        """
+        Метод вызывает обработчик view. Корутины ожидаются в цикле событий (тело запроса перед этим
+        дочитывается), синхронные обработчики выполняются в пуле потоков и читают тело по мере поступления.
+        Как и в CCDCServer, перед вызовом проверяются валидаторы view и при совпадении возвращается 304.
+
+        :param environ: Словарь environ текущего запроса.
+        :param view: Объект View, который обрабатывает запрос.
+        :param request: Объект запроса (Request).
+        :param kwargs: Именованные параметры маршрута, передаваемые во view.
+        :return: Объект ответа (Response).
+        """
+        handler = self._get_handler(environ, view)
+
+        etag, last_modified = self.conditional.get_validators(view, request, kwargs)
+        if inspect.isawaitable(etag):
+            etag = await etag
+        if inspect.isawaitable(last_modified):
+            last_modified = await last_modified
+        etag, last_modified = self.conditional.normalize(etag, last_modified)
+        if self.conditional.is_not_modified(environ, etag, last_modified):
+            return self.conditional.not_modified(request, etag, last_modified)
+
+        if inspect.iscoroutinefunction(handler):
+            # Request читает тело синхронно, а в цикле событий ждать receive нельзя
+            await environ['wsgi.input'].preload()
+            response = await handler(request, **kwargs)
+        else:
+            response = await asyncio.to_thread(handler, request, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+        return self.conditional.finalize(environ, response, etag, last_modified)
+
+    @staticmethod
+    async def _send_response(send, response: Response):
+        """
+        Метод отправляет ответ клиенту сообщениями http.response.start и http.response.body.
+        Тело StreamingResponse отправляется по частям с more_body=True. Файл FileResponse передается
+        без копирования, если сервер поддерживает расширение http.response.zerocopysend.
+
+        :param send: Корутина для отправки сообщений серверу.
+        :param response: Объект ответа (Response).
+        :return: Ничего не возвращает.
+        """
+        headers = [
+            (str(name).lower().encode('latin-1'), str(value).encode('latin-1'))
+            for name, value in response.headers.items()
+        ]
+        await send({'type': 'http.response.start', 'status': response.status_code, 'headers': headers})
+        if not response.streaming:
+            await send({'type': 'http.response.body', 'body': response.body})
+            return
+
+        scope = response.request.environ.get('asgi.scope', {}) if response.request is not None else {}
+        if isinstance(response, FileResponse) and 'http.response.zerocopysend' in scope.get('extensions', {}):
+            try:
+                await send({
+                    'type': 'http.response.zerocopysend',
+                    'file': response.file,
+                    'offset': response.offset,
+                    'count': response.length,
+                    'more_body': False,
+                })
+            finally:
+                response.file.close()
+            return
+
+        async for chunk in CCDCASGIServer._iterate_body(response.body):
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+    @staticmethod
+    async def _iterate_body(body):
+        """
+        Метод перебирает части тела потокового ответа. Асинхронные итераторы перебираются напрямую,
+        синхронные (например, генератор шаблона) - в пуле потоков, чтобы рендеринг не блокировал цикл событий.
+
+        :param body: Итератор или асинхронный итератор байтов.
+        :return: Асинхронный генератор байтов.
+        """
+        if hasattr(body, '__aiter__'):
+            async for chunk in body:
+                yield chunk
+            return
+
+        iterator = iter(body)
+        done = object()
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, iterator, done)
+                if chunk is done:
+                    break
+                yield chunk
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
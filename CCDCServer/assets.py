@@ -0,0 +1,292 @@
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import BinaryIO, Iterable, Set
+from CCDCSQLQueryBuilder.select import SelectQuery
+from CCDCSQLQueryBuilder.execute import execute_query, stream_query
+
+_DIGEST = re.compile(r'^[0-9a-f]{64}$')
+
+# Колонки таблицы blocks со ссылками на содержимое в хранилище
+BLOCK_ASSET_COLUMNS = ("asset_html", "asset_css", "asset_js")
+
+
+def atomic_write(path: str, data: bytes):
+    """
+    Записывает файл атомарно: данные пишутся во временный файл в той же папке, который затем
+    переименовывается в целевой. Читатели видят либо старый файл, либо новый целиком.
+
+    :param path: Путь к файлу.
+    :param data: Содержимое.
+    :return: Ничего не возвращает.
+    """
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class AssetStore:
+    """
+    Хранилище содержимого блоков на диске с адресацией по хэшу (sha256). Одинаковое содержимое
+    хранится один раз, а строки blocks ссылаются на хэш, поэтому копирование блока или проекта
+    копирует только ссылки. Файлы неизменяемы: root/ab/cdef... для хэша abcdef...
+
+    Чтение выполняется через mmap: read возвращает memoryview над отображением файла без копирования
+    в память процесса. Отображения недавно прочитанных файлов переиспользуются (LRU).
+    Неиспользуемые файлы удаляются сборкой мусора collect_assets (mark-and-sweep по таблице blocks).
+    """
+
+    def __init__(self, root: str, mmap_cache_size: int = 256):
+        """
+        Конструктор класса AssetStore.
+
+        :param root: Папка хранилища.
+        :param mmap_cache_size: Число открытых отображений файлов, которые переиспользуются между чтениями.
+        """
+        self.root = os.path.abspath(root)
+        self.mmap_cache_size = mmap_cache_size
+        self._maps = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path(self, digest: str) -> str:
+        """
+        Возвращает путь к файлу содержимого.
+
+        :param digest: Хэш содержимого (64 шестнадцатеричных символа).
+        :return: Путь к файлу.
+        :raises ValueError: Если хэш некорректен.
+        """
+        if not isinstance(digest, str) or not _DIGEST.match(digest):
+            raise ValueError(f"Некорректный хэш содержимого: {digest!r}")
+        return os.path.join(self.root, digest[:2], digest[2:])
+
+    def exists(self, digest: str) -> bool:
+        return os.path.isfile(self.path(digest))
+
+    def put(self, data: bytes) -> str:
+        """
+        Сохраняет содержимое. Если такое содержимое уже есть, файл не перезаписывается.
+
+        :param data: Содержимое.
+        :return: Хэш содержимого.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if os.path.isfile(path):
+            # Обновляем время изменения, чтобы сборка мусора не удалила файл до записи ссылки на него
+            os.utime(path)
+        else:
+            atomic_write(path, data)
+        return digest
+
+    def put_stream(self, file: BinaryIO, chunk_size: int = 64 * 1024) -> str:
+        """
+        Сохраняет содержимое из файлового объекта (например, UploadedFile.file), читая его частями.
+
+        :param file: Файловый объект, открытый на чтение в двоичном режиме.
+        :param chunk_size: Размер части в байтах.
+        :return: Хэш содержимого.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.tmp-')
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                while True:
+                    chunk = file.read(chunk_size)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                tmp.flush()
+                os.fsync(tmp.fileno())
+            digest = digest.hexdigest()
+            path = self.path(digest)
+            if os.path.isfile(path):
+                os.utime(path)
+                os.unlink(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        return digest
+
+    def read(self, digest: str) -> memoryview:
+        """
+        Возвращает содержимое через отображение файла в память, без копирования.
+
+        :param digest: Хэш содержимого.
+        :return: memoryview только для чтения.
+        :raises FileNotFoundError: Если содержимого нет в хранилище.
+        """
+        with self._lock:
+            mapped = self._maps.get(digest)
+            if mapped is not None:
+                self._maps.move_to_end(digest)
+                return memoryview(mapped)
+
+        with open(self.path(digest), 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return memoryview(b'')
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        with self._lock:
+            self._maps[digest] = mapped
+            while len(self._maps) > self.mmap_cache_size:
+                # Отображение не закрывается явно: его могут держать выданные memoryview,
+                # оно закроется, когда освободится последняя ссылка
+                self._maps.popitem(last=False)
+        return memoryview(mapped)
+
+    def digests(self) -> Iterable[str]:
+        """
+        Перечисляет хэши всех файлов хранилища.
+
+        :return: Генератор хэшей.
+        """
+        if not os.path.isdir(self.root):
+            return
+        for prefix in os.listdir(self.root):
+            directory = os.path.join(self.root, prefix)
+            if len(prefix) != 2 or not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if _DIGEST.match(prefix + name):
+                    yield prefix + name
+
+    def sweep(self, referenced: Set[str], grace: float = 3600) -> int:
+        """
+        Удаляет файлы, на которые нет ссылок. Файлы, измененные позже чем grace секунд назад,
+        не удаляются: ссылка на них может быть еще не записана в базу данных.
+
+        :param referenced: Множество хэшей, на которые есть ссылки.
+        :param grace: Время в секундах, в течение которого новые файлы не удаляются.
+        :return: Число удаленных файлов.
+        """
+        threshold = time.time() - grace
+        removed = 0
+        for digest in list(self.digests()):
+            if digest in referenced:
+                continue
+            path = self.path(digest)
+            try:
+                if os.stat(path).st_mtime > threshold:
+                    continue
+                os.unlink(path)
+            except OSError:
+                continue
+            with self._lock:
+                self._maps.pop(digest, None)
+            removed += 1
+        return removed
+
+
+async def referenced_assets(batch_size: int = 5000) -> Set[str]:
+    """
+    Собирает хэши, на которые ссылаются строки blocks (фаза mark сборки мусора).
+    Строки читаются порциями через stream_query одним SELECT, то есть из одного согласованного снимка таблицы.
+
+    :param batch_size: Число строк в порции.
+    :return: Множество хэшей.
+    :raises RuntimeError: Если строки blocks не удалось прочитать.
+    :raises mysql.connector.Error: Ошибка базы данных во время чтения.
+    :raises asyncio.TimeoutError: Превышено время ожидания порции.
+    """
+
+    referenced = set()
+    rows = 0
+    query, params = SelectQuery("blocks", *BLOCK_ASSET_COLUMNS).build_query()
+    async for batch in stream_query(query, params, batch_size=batch_size, row_format="columns"):
+        for values in batch.values():
+            referenced.update(value for value in values if value)
+        rows += len(batch[BLOCK_ASSET_COLUMNS[0]])
+
+    if not rows:
+        # stream_query не отдает ни одной порции и при ошибке до первой порции:
+        # пустой результат принимается, только если таблица действительно пуста
+        query, params = SelectQuery("blocks", "COUNT(*) AS count").build_query()
+        count = await execute_query(query, params, "fetchone")
+        if count is None or count["count"]:
+            raise RuntimeError("Не удалось прочитать таблицу blocks")
+    return referenced
+
+
+async def collect_assets(store: AssetStore = None, grace: float = None) -> int:
+    """
+    Сборка мусора хранилища: удаляет файлы, на которые не ссылается ни одна строка blocks.
+    Если список ссылок прочитан не полностью (любая ошибка фазы mark), файлы не удаляются.
+
+    :param store: Хранилище (по умолчанию get_asset_store()).
+    :param grace: Время в секундах, в течение которого новые файлы не удаляются
+        (по умолчанию ASSET_GC_GRACE из настроек).
+    :return: Число удаленных файлов.
+    """
+
+    store = store or get_asset_store()
+    try:
+        referenced = await referenced_assets()
+    except Exception as err:
+        print(f"Сборка мусора хранилища прервана: {err!r}")
+        return 0
+    return store.sweep(referenced, _gc_grace if grace is None else grace)
+
+
+_store = None
+_gc_grace = 3600
+
+
+def configure_asset_store(settings: dict) -> AssetStore:
+    """
+    Создает хранилище содержимого блоков по настройкам сервера.
+
+    :param settings: Словарь с настройками сервера. Используются ключи ASSET_DIR (папка хранилища),
+        ASSET_MMAP_CACHE_SIZE (число переиспользуемых отображений, по умолчанию 256) и ASSET_GC_GRACE
+        (время в секундах, в течение которого новые файлы не удаляются сборкой мусора, по умолчанию 3600).
+    :return: Созданное хранилище.
+    """
+
+    global _store, _gc_grace
+
+    _store = AssetStore(
+        settings.get('ASSET_DIR', os.path.join(settings.get('BASE_DIR', ''), 'assets')),
+        mmap_cache_size=settings.get('ASSET_MMAP_CACHE_SIZE', 256),
+    )
+    _gc_grace = settings.get('ASSET_GC_GRACE', 3600)
+    return _store
+
+
+def get_asset_store() -> AssetStore:
+    """
+    Возвращает хранилище по умолчанию, создавая его с настройками по умолчанию, если оно не настроено.
+
+    :return: Хранилище содержимого блоков.
+    """
+
+    if _store is None:
+        configure_asset_store({})
+    return _store
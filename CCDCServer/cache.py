@@ -0,0 +1,423 @@
+import asyncio
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import wraps
+from typing import Callable, Iterable, Optional
+from CCDCServer.request import Request
+from CCDCServer.response import Response
+from CCDCServer.conditional import ConditionalHandler
+
+
+class CachedResponse:
+    """
+    Снимок ответа view, который хранится в кэше вместо самого Response: объект Response
+    привязан к запросу, и middleware дописывают в него заголовки (например, Set-Cookie).
+    """
+    __slots__ = ('status_code', 'headers', 'body')
+
+    def __init__(self, response: Response):
+        """
+        Конструктор класса CachedResponse.
+
+        :param response: Объект ответа (Response) с готовым телом.
+        """
+        self.status_code = response.status_code
+        self.headers = dict(response.headers)
+        self.body = response.body
+        # ETag считается один раз при записи в кэш, а не при каждой отдаче страницы
+        self.headers.setdefault('ETag', ConditionalHandler.hash_body(self.body))
+
+    def to_response(self, request: Request) -> Response:
+        """
+        Создает новый объект ответа для запроса.
+
+        :param request: Объект запроса (Request).
+        :return: Объект ответа (Response).
+        """
+        return Response(request, status_code=self.status_code, headers=dict(self.headers), body=self.body)
+
+    def __len__(self):
+        return len(self.body) + sum(len(str(name)) + len(str(value)) for name, value in self.headers.items())
+
+
+class _Flight:
+    """
+    Рендеринг, выполняющийся для ключа кэша: остальные запросы с тем же ключом ждут его результата.
+    """
+    __slots__ = ('lock', 'waiters')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.waiters = 0
+
+
+class ResponseCache:
+    """
+    Кэш страниц и фрагментов страниц в памяти. Записи живут не дольше TTL, при превышении
+    бюджета памяти вытесняются давно неиспользуемые (LRU). Каждой записи можно назначить теги
+    (например, 'project:5', 'page:12') и сбросить все записи с тегом через invalidate_tags,
+    когда меняется проект, страница или блок.
+    При промахе рендерит только один запрос на ключ, остальные ждут и получают результат из кэша.
+    """
+
+    def __init__(self, max_size: int = 64 * 1024 * 1024, default_ttl: float = 60):
+        """
+        Конструктор класса ResponseCache.
+
+        :param max_size: Бюджет памяти в байтах (примерный размер тел и заголовков записей).
+        :param default_ttl: Время жизни записи в секундах по умолчанию.
+        """
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self.size = 0
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._async_flights = {}
+        # Увеличивается при каждой инвалидации: значение, которое рендерилось во время инвалидации,
+        # могло быть построено по старым данным и в кэш не кладется
+        self._generation = 0
+
+    @staticmethod
+    def _sizeof(value) -> int:
+        if isinstance(value, str):
+            return len(value.encode('utf-8'))
+        return len(value)
+
+    def get(self, key):
+        """
+        Возвращает значение из кэша.
+
+        :param key: Ключ записи.
+        :return: Значение или None, если записи нет или она истекла.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at, tags = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float = None, tags: Iterable[str] = ()):
+        """
+        Кладет значение в кэш, вытесняя давно неиспользуемые записи при превышении бюджета памяти.
+
+        :param key: Ключ записи.
+        :param value: Значение (CachedResponse, строка или байты).
+        :param ttl: Время жизни в секундах (по умолчанию default_ttl).
+        :param tags: Теги для инвалидации.
+        :return: Ничего не возвращает.
+        """
+        size = self._sizeof(value)
+        if size > self.max_size:
+            return
+        tags = frozenset(tags)
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, expires_at, tags)
+            self.size += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while self.size > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def invalidate_tags(self, *tags: str) -> int:
+        """
+        Удаляет все записи с любым из тегов.
+
+        :param tags: Теги.
+        :return: Число удаленных записей.
+        """
+        removed = 0
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                    removed += 1
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tags.clear()
+            self.size = 0
+
+    def _remove(self, key):
+        """
+        Удаляет запись и ссылки на нее из индекса тегов. Вызывается под блокировкой.
+
+        :param key: Ключ записи.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        value, _, tags = entry
+        self.size -= self._sizeof(value)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get_or_render(self, key, render: Callable, ttl: float = None, tags: Iterable[str] = ()):
+        """
+        Возвращает значение из кэша, а при промахе вызывает render. Пока один поток рендерит значение
+        для ключа, остальные потоки с тем же ключом ждут и берут готовое значение из кэша.
+
+        :param key: Ключ записи.
+        :param render: Функция без аргументов, возвращающая значение; None не кэшируется.
+        :param ttl: Время жизни в секундах.
+        :param tags: Теги для инвалидации.
+        :return: Значение.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+            flight.waiters += 1
+        try:
+            with flight.lock:
+                value = self.get(key)
+                if value is None:
+                    generation = self._generation
+                    value = render()
+                    if value is not None and generation == self._generation:
+                        self.set(key, value, ttl, tags)
+                return value
+        finally:
+            with self._lock:
+                flight.waiters -= 1
+                if flight.waiters == 0:
+                    del self._flights[key]
+
+    async def get_or_render_async(self, key, render: Callable, ttl: float = None, tags: Iterable[str] = ()):
+        """
+        Асинхронный вариант get_or_render: render - функция, возвращающая корутину.
+        Запросы с тем же ключом ждут завершения первой корутины, не блокируя цикл событий.
+        Ожидание идет через concurrent.futures.Future, а не через future цикла событий: WSGI-сервер
+        выполняет каждый запрос в своем цикле (asyncio.run), и запросы с одним ключом могут ждать друг друга
+        из разных потоков.
+
+        :param key: Ключ записи.
+        :param render: Функция без аргументов, возвращающая корутину; результат None не кэшируется.
+        :param ttl: Время жизни в секундах.
+        :param tags: Теги для инвалидации.
+        :return: Значение.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            flight = self._async_flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._async_flights[key] = Future()
+
+        if not leader:
+            # shield: отмена ожидающего запроса не должна отменять общий Future
+            await asyncio.shield(asyncio.wrap_future(flight))
+            value = self.get(key)
+            if value is not None:
+                return value
+            # Первый запрос не дал кэшируемого значения: рендерим сами
+            return await render()
+
+        try:
+            generation = self._generation
+            value = await render()
+            if value is not None and generation == self._generation:
+                self.set(key, value, ttl, tags)
+            return value
+        finally:
+            with self._lock:
+                del self._async_flights[key]
+            flight.set_result(None)
+
+
+_cache = None
+
+
+def configure_response_cache(settings: dict) -> ResponseCache:
+    """
+    Создает кэш страниц по настройкам сервера и делает его кэшем по умолчанию.
+
+    :param settings: Словарь с настройками сервера. Используются ключи RESPONSE_CACHE_SIZE
+        (бюджет памяти в байтах) и RESPONSE_CACHE_TTL (время жизни записи в секундах).
+    :return: Созданный кэш.
+    """
+
+    global _cache
+
+    _cache = ResponseCache(
+        max_size=settings.get('RESPONSE_CACHE_SIZE', 64 * 1024 * 1024),
+        default_ttl=settings.get('RESPONSE_CACHE_TTL', 60),
+    )
+    return _cache
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    Возвращает кэш страниц по умолчанию, создавая его с настройками по умолчанию, если он не настроен.
+
+    :return: Кэш страниц.
+    """
+
+    if _cache is None:
+        configure_response_cache({})
+    return _cache
+
+
+def invalidate_tags(*tags: str) -> int:
+    """
+    Сбрасывает записи кэша страниц и фрагментов с любым из тегов. Вызывается слоем моделей
+    при изменении данных, например invalidate_tags(f'project:{project_id}').
+
+    :param tags: Теги.
+    :return: Число удаленных записей.
+    """
+
+    return get_response_cache().invalidate_tags(*tags)
+
+
+def _build_key(func, request: Request, kwargs: dict, query_params: Iterable[str], per_session: bool,
+               key: Optional[Callable]) -> tuple:
+    """
+    Собирает ключ кэша страницы.
+
+    :param func: Метод view.
+    :param request: Объект запроса (Request).
+    :param kwargs: Именованные параметры маршрута.
+    :param query_params: Имена GET-параметров, входящих в ключ.
+    :param per_session: Входит ли в ключ пользователь сессии.
+    :param key: Функция key(request, **kwargs), заменяющая путь и параметры в ключе.
+    :return: Кортеж.
+    """
+
+    if key is not None:
+        parts = (func.__module__, func.__qualname__, key(request, **kwargs))
+    else:
+        params = tuple((name, tuple(request.GET.get(name, ()))) for name in query_params)
+        parts = (func.__module__, func.__qualname__, request.environ.get('PATH_INFO', ''), params)
+    if per_session:
+        session = request.session
+        parts += (session.user_id if session is not None else None,)
+    return parts
+
+
+def _cacheable(response: Response) -> Optional[CachedResponse]:
+    """
+    Возвращает снимок ответа, если его можно положить в кэш: 200, не потоковый и без Set-Cookie.
+
+    :param response: Объект ответа (Response).
+    :return: CachedResponse или None.
+    """
+
+    if response is None or response.status_code != 200 or response.streaming or 'Set-Cookie' in response.headers:
+        return None
+    return CachedResponse(response)
+
+
+def cache_page(ttl: float = None, query_params: Iterable[str] = (), per_session: bool = False,
+               key: Callable = None, tags=(), cache: ResponseCache = None):
+    """
+    Декоратор метода view (get), кэширующий ответ целиком:
+
+        class LoginPage(View):
+            @cache_page(ttl=300)
+            def get(self, request, *args, **kwargs): ...
+
+        class ProjectPage(View):
+            @cache_page(query_params=('page',), tags=lambda request, project_id: [f'project:{project_id}'])
+            async def get(self, request, project_id): ...
+
+    По умолчанию ключ - путь запроса; GET-параметры, не перечисленные в query_params, не учитываются.
+    Кэшируются только ответы 200 без Set-Cookie; запросы, кроме GET, передаются view без кэша.
+
+    :param ttl: Время жизни записи в секундах (по умолчанию RESPONSE_CACHE_TTL).
+    :param query_params: Имена GET-параметров, входящих в ключ.
+    :param per_session: Кэшировать страницу отдельно для каждого пользователя сессии.
+    :param key: Функция key(request, **kwargs), возвращающая хэшируемую часть ключа вместо пути и параметров.
+    :param tags: Теги записи или функция tags(request, **kwargs), возвращающая теги.
+    :param cache: Кэш (по умолчанию get_response_cache()).
+    :return: Декоратор.
+    """
+
+    query_params = tuple(query_params)
+
+    def prepare(func, request: Request, kwargs: dict):
+        entry_tags = tags(request, **kwargs) if callable(tags) else tags
+        return cache or get_response_cache(), _build_key(func, request, kwargs, query_params, per_session, key), entry_tags
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def wrapper(view, request: Request, *args, **kwargs):
+                if request.environ.get('REQUEST_METHOD', 'GET') != 'GET':
+                    return await func(view, request, *args, **kwargs)
+                store, cache_key, entry_tags = prepare(func, request, kwargs)
+                rendered = []
+
+                async def render():
+                    rendered.append(await func(view, request, *args, **kwargs))
+                    return _cacheable(rendered[0])
+
+                entry = await store.get_or_render_async(cache_key, render, ttl, entry_tags)
+                return rendered[0] if rendered else entry.to_response(request)
+        else:
+            @wraps(func)
+            def wrapper(view, request: Request, *args, **kwargs):
+                if request.environ.get('REQUEST_METHOD', 'GET') != 'GET':
+                    return func(view, request, *args, **kwargs)
+                store, cache_key, entry_tags = prepare(func, request, kwargs)
+                rendered = []
+
+                def render():
+                    rendered.append(func(view, request, *args, **kwargs))
+                    return _cacheable(rendered[0])
+
+                entry = store.get_or_render(cache_key, render, ttl, entry_tags)
+                return rendered[0] if rendered else entry.to_response(request)
+        return wrapper
+
+    return decorator
+
+
+def cache_fragment(key, render: Callable[[], str], ttl: float = None, tags: Iterable[str] = (),
+                   cache: ResponseCache = None) -> str:
+    """
+    Кэширует фрагмент страницы (например, отрендеренный блок), общий для разных страниц и пользователей:
+
+        html = cache_fragment(('block', block_id), lambda: render_template('block.html', context),
+                              tags=[f'block:{block_id}'])
+
+    :param key: Хэшируемый ключ фрагмента.
+    :param render: Функция без аргументов, возвращающая строку фрагмента.
+    :param ttl: Время жизни записи в секундах (по умолчанию RESPONSE_CACHE_TTL).
+    :param tags: Теги для инвалидации.
+    :param cache: Кэш (по умолчанию get_response_cache()).
+    :return: Строка фрагмента.
+    """
+
+    return (cache or get_response_cache()).get_or_render(('fragment', key), render, ttl, tags)
@@ -0,0 +1,227 @@
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class Encoder:
+    """
+    Базовый класс кодировщика тела ответа для заголовка Content-Encoding.
+    Подклассы реализуют сжатие целого тела (compress) и потоковое сжатие (compressobj/compress_chunk/finish).
+    """
+
+    name = None
+
+    def __init__(self, level: int = None):
+        """
+        Конструктор класса Encoder.
+
+        :param level: Уровень сжатия (None - уровень по умолчанию кодировщика).
+        """
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        """
+        Сжимает тело ответа целиком.
+
+        :param data: Тело ответа.
+        :return: Сжатые байты.
+        """
+        compressor = self.compressobj()
+        return self.compress_chunk(compressor, data, flush=False) + self.finish(compressor)
+
+    def compressobj(self):
+        raise NotImplementedError
+
+    def compress_chunk(self, compressor, data: bytes, flush: bool = True) -> bytes:
+        """
+        Сжимает очередную часть потокового тела. При flush=True накопленные данные сбрасываются,
+        чтобы клиент получил часть сразу, а не после окончания ответа.
+
+        :param compressor: Объект, созданный compressobj.
+        :param data: Часть тела.
+        :param flush: Сбросить ли буфер кодировщика после части.
+        :return: Сжатые байты (могут быть пустыми).
+        """
+        raise NotImplementedError
+
+    def finish(self, compressor) -> bytes:
+        raise NotImplementedError
+
+
+class ZlibEncoder(Encoder):
+    """
+    Кодировщики gzip и deflate на основе стандартного модуля zlib.
+    """
+
+    wbits = zlib.MAX_WBITS
+
+    def compressobj(self):
+        level = zlib.Z_DEFAULT_COMPRESSION if self.level is None else self.level
+        return zlib.compressobj(level, zlib.DEFLATED, self.wbits)
+
+    def compress_chunk(self, compressor, data: bytes, flush: bool = True) -> bytes:
+        output = compressor.compress(data)
+        if flush:
+            output += compressor.flush(zlib.Z_SYNC_FLUSH)
+        return output
+
+    def finish(self, compressor) -> bytes:
+        return compressor.flush(zlib.Z_FINISH)
+
+
+class GzipEncoder(ZlibEncoder):
+    name = 'gzip'
+    wbits = 16 + zlib.MAX_WBITS
+
+
+class DeflateEncoder(ZlibEncoder):
+    # В HTTP "deflate" означает поток в формате zlib (RFC 1950), а не "сырой" deflate
+    name = 'deflate'
+    wbits = zlib.MAX_WBITS
+
+
+class ZstdEncoder(Encoder):
+    """
+    Кодировщик zstd. Доступен, если установлен пакет zstandard.
+    """
+
+    name = 'zstd'
+
+    def compressobj(self):
+        return zstandard.ZstdCompressor(level=3 if self.level is None else self.level).compressobj()
+
+    def compress_chunk(self, compressor, data: bytes, flush: bool = True) -> bytes:
+        output = compressor.compress(data)
+        if flush:
+            output += compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return output
+
+    def finish(self, compressor) -> bytes:
+        return compressor.flush()
+
+
+class BrotliEncoder(Encoder):
+    """
+    Кодировщик br. Доступен, если установлен пакет brotli.
+    """
+
+    name = 'br'
+
+    def compressobj(self):
+        return brotli.Compressor(quality=5 if self.level is None else self.level)
+
+    def compress_chunk(self, compressor, data: bytes, flush: bool = True) -> bytes:
+        output = compressor.process(data)
+        if flush:
+            output += compressor.flush()
+        return output
+
+    def finish(self, compressor) -> bytes:
+        return compressor.finish()
+
+
+def available_encoders(levels: Dict[str, int] = None) -> List[Encoder]:
+    """
+    Возвращает кодировщики, доступные в текущем окружении, в порядке предпочтения сервера.
+    zstd и br добавляются, только если установлены пакеты zstandard и brotli.
+
+    :param levels: Словарь {название кодировки: уровень сжатия}.
+    :return: Список объектов Encoder.
+    """
+    levels = levels or {}
+    classes = []
+    if zstandard is not None:
+        classes.append(ZstdEncoder)
+    if brotli is not None:
+        classes.append(BrotliEncoder)
+    classes += [GzipEncoder, DeflateEncoder]
+    return [cls(levels.get(cls.name)) for cls in classes]
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """
+    Разбирает заголовок Accept-Encoding.
+
+    :param header: Значение заголовка Accept-Encoding.
+    :return: Словарь {название кодировки в нижнем регистре: q}.
+    """
+    result = {}
+    for item in header.split(','):
+        name, _, params = item.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        result[name] = q
+    return result
+
+
+def choose_encoder(header: str, encoders: List[Encoder]) -> Optional[Encoder]:
+    """
+    Выбирает кодировщик по Accept-Encoding клиента: с наибольшим q, при равенстве - первый в списке сервера.
+
+    :param header: Значение заголовка Accept-Encoding.
+    :param encoders: Кодировщики в порядке предпочтения сервера.
+    :return: Объект Encoder или None, если клиент не принимает ни одну из кодировок.
+    """
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get('*', 0.0)
+    best, best_q = None, 0.0
+    for encoder in encoders:
+        q = accepted.get(encoder.name, wildcard)
+        if q > best_q:
+            best, best_q = encoder, q
+    return best
+
+
+def compress_stream(encoder: Encoder, chunks: Iterable[bytes]):
+    """
+    Сжимает тело потокового ответа по мере генерации частей.
+
+    :param encoder: Кодировщик.
+    :param chunks: Итератор байтов.
+    :return: Генератор сжатых байтов.
+    """
+    compressor = encoder.compressobj()
+    try:
+        for chunk in chunks:
+            output = encoder.compress_chunk(compressor, chunk)
+            if output:
+                yield output
+        yield encoder.finish(compressor)
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+async def compress_stream_async(encoder: Encoder, chunks):
+    """
+    Асинхронный вариант compress_stream для тела, которое является асинхронным итератором.
+
+    :param encoder: Кодировщик.
+    :param chunks: Асинхронный итератор байтов.
+    :return: Асинхронный генератор сжатых байтов.
+    """
+    compressor = encoder.compressobj()
+    async for chunk in chunks:
+        output = encoder.compress_chunk(compressor, chunk)
+        if output:
+            yield output
+    yield encoder.finish(compressor)
@@ -0,0 +1,222 @@
+import time
+import zlib
+from functools import lru_cache
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+from CCDCServer.request import Request
+from CCDCServer.response import Response
+
+
+@lru_cache(maxsize=64)
+def _format_http_date(seconds: int) -> str:
+    """
+    Форматирует время в секундах в HTTP-дату. Кэш хранит последние значения,
+    поэтому в пределах одной секунды строка форматируется один раз.
+
+    :param seconds: Время в секундах с начала эпохи.
+    :return: Строка вида 'Sun, 06 Nov 1994 08:49:37 GMT'.
+    """
+    return formatdate(seconds, usegmt=True)
+
+
+def http_date(timestamp: float = None) -> str:
+    """
+    Возвращает HTTP-дату (RFC 7231) для заданного времени.
+
+    :param timestamp: Время в секундах с начала эпохи (по умолчанию текущее).
+    :return: Строка с датой в формате HTTP.
+    """
+    return _format_http_date(int(time.time() if timestamp is None else timestamp))
+
+
+def parse_http_date(value: str) -> Optional[float]:
+    """
+    Разбирает HTTP-дату.
+
+    :param value: Строка с датой в формате HTTP.
+    :return: Время в секундах с начала эпохи или None, если строку не удалось разобрать.
+    """
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _opaque_tag(etag: str) -> str:
+    """
+    Возвращает ETag без признака слабого сравнения W/, как того требует слабое сравнение (RFC 7232, 2.3.2).
+
+    :param etag: ETag в кавычках.
+    :return: ETag без префикса W/.
+    """
+    etag = etag.strip()
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def etag_matches(etag: str, if_none_match: str) -> bool:
+    """
+    Проверяет ETag ресурса по заголовку If-None-Match слабым сравнением.
+
+    :param etag: ETag ресурса в кавычках.
+    :param if_none_match: Значение заголовка If-None-Match.
+    :return: True, если один из перечисленных клиентом ETag совпадает или клиент прислал '*'.
+    """
+    if if_none_match.strip() == '*':
+        return True
+    opaque = _opaque_tag(etag)
+    return any(_opaque_tag(tag) == opaque for tag in if_none_match.split(','))
+
+
+class ConditionalHandler:
+    """
+    Подсистема условных GET-запросов (RFC 7232). Сервер вызывает ее до и после view:
+    - до вызова view спрашивает у view дешевые валидаторы (get_etag/get_last_modified) и, если клиентская
+      копия актуальна, возвращает 304 без рендеринга;
+    - после вызова view проставляет ETag (при необходимости считая быстрый некриптографический хэш тела)
+      и заголовки кэширования.
+    Класс можно заменить через settings['CONDITIONAL_HANDLER'].
+    """
+
+    methods = ('GET', 'HEAD')
+
+    def __init__(self, settings: dict):
+        """
+        Конструктор класса ConditionalHandler.
+
+        :param settings: Словарь с настройками сервера (используется CACHE_MAX_AGE, по умолчанию 3600 секунд).
+        """
+        self.max_age = settings.get('CACHE_MAX_AGE', 3600)
+
+    @staticmethod
+    def hash_body(body: bytes) -> str:
+        """
+        Считает ETag по телу ответа быстрым некриптографическим хэшем (CRC32 и длина тела).
+
+        :param body: Тело ответа.
+        :return: ETag в кавычках.
+        """
+        return f'"{len(body):x}-{zlib.crc32(body):08x}"'
+
+    @staticmethod
+    def format_etag(validator) -> str:
+        """
+        Приводит валидатор, который вернул view (номер версии, строку), к виду ETag в кавычках.
+
+        :param validator: Значение валидатора.
+        :return: ETag в кавычках.
+        """
+        validator = str(validator)
+        if validator.startswith('"') or validator.startswith('W/"'):
+            return validator
+        return f'"{validator}"'
+
+    def is_not_modified(self, environ: dict, etag: Optional[str], last_modified: Optional[float]) -> bool:
+        """
+        Проверяет условные заголовки запроса. If-None-Match имеет приоритет: если он передан,
+        If-Modified-Since не учитывается.
+
+        :param environ: Словарь environ текущего запроса.
+        :param etag: ETag ресурса или None.
+        :param last_modified: Время изменения ресурса в секундах или None.
+        :return: True, если клиентская копия актуальна и можно ответить 304.
+        """
+        if environ['REQUEST_METHOD'] not in self.methods:
+            return False
+
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None:
+            return etag is not None and etag_matches(etag, if_none_match)
+
+        if_modified_since = environ.get('HTTP_IF_MODIFIED_SINCE')
+        if if_modified_since is not None and last_modified is not None:
+            client_modified = parse_http_date(if_modified_since)
+            return client_modified is not None and int(last_modified) <= client_modified
+
+        return False
+
+    def get_validators(self, view, request: Request, kwargs: dict) -> Tuple:
+        """
+        Возвращает функции view, которые дают валидаторы без рендеринга страницы.
+
+        :param view: Объект View, который обрабатывает запрос.
+        :param request: Объект запроса (Request).
+        :param kwargs: Именованные параметры маршрута.
+        :return: Кортеж (результат get_etag, результат get_last_modified); элементы могут быть корутинами.
+        """
+        if request.environ['REQUEST_METHOD'] not in self.methods:
+            return None, None
+        return view.get_etag(request, **kwargs), view.get_last_modified(request, **kwargs)
+
+    def normalize(self, etag, last_modified) -> Tuple[Optional[str], Optional[float]]:
+        """
+        Приводит валидаторы view к ETag в кавычках и времени в секундах.
+
+        :param etag: Значение, которое вернул get_etag.
+        :param last_modified: Значение, которое вернул get_last_modified (datetime или число секунд).
+        :return: Кортеж (ETag или None, время в секундах или None).
+        """
+        if etag is not None:
+            etag = self.format_etag(etag)
+        if last_modified is not None and hasattr(last_modified, 'timestamp'):
+            last_modified = last_modified.timestamp()
+        return etag, last_modified
+
+    def not_modified(self, request: Request, etag: Optional[str], last_modified: Optional[float]) -> Response:
+        """
+        Создает ответ 304 (Not Modified) без тела.
+
+        :param request: Объект запроса (Request).
+        :param etag: ETag ресурса или None.
+        :param last_modified: Время изменения ресурса в секундах или None.
+        :return: Объект ответа (Response).
+        """
+        response = Response(request, status_code=304)
+        response.headers.pop('Content-Type', None)
+        response.headers.pop('Content-Length', None)
+        self._set_cache_headers(response, etag, last_modified)
+        return response
+
+    def finalize(self, environ: dict, response: Response, etag: Optional[str] = None,
+                 last_modified: Optional[float] = None) -> Response:
+        """
+        Добавляет к успешному ответу ETag и заголовки кэширования. Если view не передала ETag,
+        он считается по телу ответа (кроме потоковых ответов, тело которых еще не сформировано).
+        Если клиентская копия актуальна, ответ заменяется на 304.
+
+        :param environ: Словарь environ текущего запроса.
+        :param response: Объект ответа (Response), полученный от view.
+        :param etag: ETag, полученный от view до рендеринга, или None.
+        :param last_modified: Время изменения, полученное от view до рендеринга, или None.
+        :return: Объект ответа (Response).
+        """
+        if response.status_code != 200 or environ['REQUEST_METHOD'] not in self.methods:
+            return response
+        if response.streaming:
+            if etag is not None or last_modified is not None:
+                self._set_cache_headers(response, etag, last_modified)
+            return response
+
+        etag = response.headers.get('ETag') or etag or self.hash_body(response.body)
+        if self.is_not_modified(environ, etag, last_modified):
+            return self.not_modified(response.request, etag, last_modified)
+
+        self._set_cache_headers(response, etag, last_modified)
+        return response
+
+    def _set_cache_headers(self, response: Response, etag: Optional[str], last_modified: Optional[float]):
+        """
+        Устанавливает заголовки ETag, Last-Modified, Cache-Control и Expires.
+        Cache-Control, который уже выставила view (например, статика со своим max-age), не перезаписывается.
+
+        :param response: Объект ответа (Response).
+        :param etag: ETag ресурса или None.
+        :param last_modified: Время изменения ресурса в секундах или None.
+        :return: Ничего не возвращает.
+        """
+        if etag is not None:
+            response.headers['ETag'] = etag
+        if last_modified is not None:
+            response.headers['Last-Modified'] = http_date(last_modified)
+        if 'Cache-Control' not in response.headers:
+            response.headers['Cache-Control'] = f'max-age={self.max_age}'
+            response.headers['Expires'] = http_date(time.time() + self.max_age)
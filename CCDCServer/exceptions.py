@@ -6,9 +6,34 @@ class NotFound(Exception):
     code = 404
 
 
+class BadRequest(Exception):
+    """
+    Исключение, которое представляет ошибку "Некорректный запрос" с HTTP-кодом 400.
+    """
+
+    code = 400
+
+
 class NotAllowed(Exception):
     """
     Исключение, которое представляет ошибку "Неподдерживаемый HTTP-метод" с HTTP-кодом 405.
     """
 
     code = 405
+
+
+class RequestEntityTooLarge(Exception):
+    """
+    Исключение, которое представляет ошибку "Слишком большое тело запроса" с HTTP-кодом 413.
+    """
+
+    code = 413
+
+
+class Conflict(Exception):
+    """
+    Исключение, которое представляет ошибку "Конфликт версий" с HTTP-кодом 409
+    (например, документ изменен другим запросом).
+    """
+
+    code = 409
@@ -1,15 +1,18 @@
-import re
-import hashlib
+import asyncio
+import inspect
 import tracemalloc
-from datetime import datetime, timedelta
-from typing import List, Type
+from functools import partial
+from typing import Dict, List, Tuple, Type
 from CCDCServer.urls import Url
-from CCDCServer.exceptions import NotFound, NotAllowed
+from CCDCServer.exceptions import BadRequest, NotFound, NotAllowed, RequestEntityTooLarge, Conflict
 from CCDCServer.view import View
+from CCDCServer.router import Router
 from CCDCServer.request import Request
-from CCDCServer.response import Response
+from CCDCServer.response import Response, FileResponse
 from CCDCServer.middleware import BaseMiddleware
 from CCDCServer.storage_environ import EnvironStorage
+from CCDCServer.template import TemplateEngine
+from CCDCServer.conditional import ConditionalHandler
 
 
 class CCDCServer:
@@ -20,7 +23,7 @@ class CCDCServer:
     Это также экономит память, так как Python не создает словарь
     для хранения атрибутов объекта.
     """
-    __slots__ = ('urls', 'settings', 'middlewares')
+    __slots__ = ('urls', 'settings', 'middlewares', 'router', 'conditional', 'chain')
 
     def __init__(self, urls: List[Url], settings: dict, middlewares: List[Type[BaseMiddleware]]):
         """
@@ -28,11 +31,18 @@ class CCDCServer:
 
         :param urls: Список URL, где каждый элемент должен быть типа Url.
         :param settings: Словарь с настройками сервера.
-        :param middlewares: Список middleware, являющихся подклассами BaseMiddleware.
+        :param middlewares: Список middleware, являющихся подклассами BaseMiddleware (или их экземплярами).
+            Классы создаются один раз при запуске сервера.
         """
         self.urls = urls
         self.settings = settings
-        self.middlewares = middlewares
+        self.middlewares = [
+            middleware() if isinstance(middleware, type) else middleware for middleware in middlewares
+        ]
+        self.router = Router(urls)
+        self.conditional = settings.get('CONDITIONAL_HANDLER', ConditionalHandler)(settings)
+        self.chain = self._build_chain()
+        TemplateEngine.configure(settings)
 
         tracemalloc.start()
 
@@ -45,19 +55,19 @@ class CCDCServer:
         :param start_response: Функция обратного вызова для начала ответа сервера.
         :return: Возвращает тело ответа для передачи пользователю.
         """
-        try:
-            EnvironStorage.set_environ(environ)
-            EnvironStorage.set_start_response(start_response)
-            view = self._get_view(environ)
-            request = self._get_request(environ)
-            self._apply_middleware_to_request(request)
-            response = self._get_response(environ, view, request)
-        except NotFound:
-            response = self._handle_404()
-        except NotAllowed:
-            response = self._handle_405()
+        EnvironStorage.set_environ(environ)
+        EnvironStorage.set_start_response(start_response)
+        request = self._get_request(environ)
+        response = self.chain(request)
 
         start_response(str(response.status_code), response.headers.items())
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if isinstance(response, FileResponse) and response.to_end and file_wrapper is not None:
+            # WSGI-сервер отдает файл без копирования через os.sendfile, если умеет
+            response.file.seek(response.offset)
+            return file_wrapper(response.file, response.chunk_size)
+        if response.streaming:
+            return response.body
         return iter([response.body])
 
     def __del__(self):
@@ -71,34 +81,31 @@ class CCDCServer:
         :param url: Входной URL.
         :return: Возвращает чистый URL.
         """
-        if url[-1] == '/':
+        if url.endswith('/'):
             return url[:-1]
         return url
 
-    def _find_view(self, raw_url: str) -> Type[View]:
+    def _find_view(self, raw_url: str) -> Tuple[Type[View], Dict[str, str]]:
         """
-        Метод ищет соответствующий view (класс, обрабатывающий запрос) для переданного URL.
+        Метод ищет соответствующий view (класс, обрабатывающий запрос) для переданного URL
+        в таблице маршрутов, скомпилированной при создании сервера.
 
         :param raw_url: Начальный (сырой) URL.
-        :return: Возвращает либо 404 (NotFound), либо путь до страницы (View).
+        :return: Возвращает либо 404 (NotFound), либо кортеж из view и именованных параметров маршрута.
         """
         url = self._prepare_url(raw_url)
-        for path in self.urls:
-            m = re.match(path.url, url)
-            if m is not None:
-                return path.view
-        raise NotFound
+        return self.router.resolve(url)
 
-    def _get_view(self, environ: dict) -> View:
+    def _get_view(self, environ: dict) -> Tuple[View, Dict[str, str]]:
         """
         Метод получает view для текущего запроса, используя environ['PATH_INFO'] для определения URL.
 
         :param environ: Это словарь, содержащий информацию о текущем запросе.
-        :return: Возвращает объект View, который будет обрабатывать запрос.
+        :return: Возвращает объект View, который будет обрабатывать запрос, и именованные параметры маршрута.
         """
         raw_url = environ['PATH_INFO']
-        view = self._find_view(raw_url)()
-        return view
+        view, kwargs = self._find_view(raw_url)
+        return view(), kwargs
 
     def _get_request(self, environ: dict):
         """
@@ -110,64 +117,100 @@ class CCDCServer:
         return Request(environ, self.settings)
 
     @staticmethod
-    def _get_response(environ: dict, view: View, request: Request) -> Response:
+    def _get_handler(environ: dict, view: View):
         """
-        Метод определяет HTTP-метод текущего запроса (environ['REQUEST_METHOD']), а затем
-        вызывает соответствующий метод в объекте view. Если метод не существует, вызывается исключение NotAllowed.
+        Метод определяет HTTP-метод текущего запроса (environ['REQUEST_METHOD']) и возвращает
+        соответствующий метод объекта view. Если метод не существует, вызывается исключение NotAllowed.
 
         :param environ: Это словарь, содержащий информацию о текущем запросе.
         :param view: Объект View, который обрабатывает запрос.
-        :param request: Объект запроса (Request).
-        :return: Объект ответа (Response).
+        :return: Метод view (get, post и т.д.), обрабатывающий запрос.
         """
         method = environ['REQUEST_METHOD'].lower()
         if not hasattr(view, method):
             raise NotAllowed
+        return getattr(view, method)
+
+    @staticmethod
+    def _resolve(value):
+        """
+        Метод возвращает значение как есть, а корутину выполняет до конца в отдельном цикле событий,
+        так как WSGI-вызов синхронный.
+
+        :param value: Значение или корутина, которую вернул метод view.
+        :return: Результат.
+        """
+        if inspect.isawaitable(value):
+            return asyncio.run(value)
+        return value
 
-        response = getattr(view, method)(request)
+    def _get_response(self, environ: dict, view: View, request: Request, **kwargs) -> Response:
+        """
+        Метод вызывает обработчик view для текущего запроса. Перед вызовом у view запрашиваются
+        дешевые валидаторы (get_etag/get_last_modified): если клиентская копия актуальна,
+        view не вызывается и возвращается 304. Методы view могут быть объявлены как async def.
 
-        if response.status_code == 200:
-            response_body = response.body
+        :param environ: Это словарь, содержащий информацию о текущем запросе.
+        :param view: Объект View, который обрабатывает запрос.
+        :param request: Объект запроса (Request).
+        :param kwargs: Именованные параметры маршрута, передаваемые во view.
+        :return: Объект ответа (Response).
+        """
+        handler = self._get_handler(environ, view)
 
-            etag = hashlib.sha256(response_body).hexdigest()
-            response.headers['ETag'] = f'"{etag}"'
-            response.headers['Cache-Control'] = 'max-age=3600'  # Например, кэшировать на 1 час
-            response.headers['Expires'] = (datetime.now() + timedelta(hours=1)).strftime('%a, %d %b %Y %H:%M:%S GMT')
-            response.headers['Last-Modified'] = datetime.now().strftime('%a, %d %b %Y %H:%M:%S GMT')
+        etag, last_modified = self.conditional.get_validators(view, request, kwargs)
+        etag, last_modified = self.conditional.normalize(self._resolve(etag), self._resolve(last_modified))
+        if self.conditional.is_not_modified(environ, etag, last_modified):
+            return self.conditional.not_modified(request, etag, last_modified)
 
-            if 'HTTP_IF_NONE_MATCH' in environ and 'HTTP_IF_MODIFIED_SINCE' in environ:
-                client_etag = environ['HTTP_IF_NONE_MATCH']
-                client_modified = datetime.strptime(environ['HTTP_IF_MODIFIED_SINCE'], '%a, %d %b %Y %H:%M:%S GMT')
+        response = self._resolve(handler(request, **kwargs))
+        return self.conditional.finalize(environ, response, etag, last_modified)
 
-                if etag == client_etag and datetime.now() - client_modified < timedelta(hours=1):
-                    response.status_code = 304
-                    response.body = b''
-                    response.headers.pop('Cache-Control', None)
-                    response.headers.pop('Expires', None)
+    def _build_chain(self):
+        """
+        Метод один раз при запуске сервера собирает цепочку middleware по принципу "луковицы":
+        первый middleware списка - внешний слой, последний вызывает _dispatch. Каждый слой получает
+        запрос и функцию call_next, поэтому может прервать обработку, замерить время или обернуть ответ.
 
-        return response
+        :return: Функция, принимающая объект запроса (Request) и возвращающая объект ответа (Response).
+        """
+        handler = self._dispatch
+        for middleware in reversed(self.middlewares):
+            handler = partial(middleware.process, call_next=handler)
+        return handler
 
-    def _apply_middleware_to_request(self, request: Request):
+    def _dispatch(self, request: Request) -> Response:
         """
-        Метод применяет middleware к объекту запроса. Он проходит по списку middleware
-        и вызывает метод to_request для каждого из них.
+        Метод находит view для запроса и вызывает ее. Ошибки маршрутизации превращаются в ответы 404/405,
+        чтобы middleware обрабатывали их так же, как обычные ответы.
 
         :param request: Объект запроса (Request).
-        :return: Ничего не возвращает.
+        :return: Объект ответа (Response).
         """
-        for i in self.middlewares:
-            i().to_request(request)
+        try:
+            view, kwargs = self._get_view(request.environ)
+            return self._get_response(request.environ, view, request, **kwargs)
+        except NotFound:
+            return self._handle_404(request)
+        except NotAllowed:
+            return self._handle_405(request)
+        except BadRequest:
+            return self._handle_400(request)
+        except RequestEntityTooLarge:
+            return self._handle_413(request)
+        except Conflict:
+            return self._handle_409(request)
 
-    def _apply_middleware_to_response(self, response: Response):
+    @staticmethod
+    def _handle_400(request: Request = None) -> Response:
         """
-        Метод применяет middleware к объекту ответа. Он проходит по списку middleware
-        и вызывает метод to_response для каждого из них.
+        Метод для обработки страницы 400 (Некорректный запрос).
 
-        :param response: Объект ответа (Response).
-        :return: Ничего не возвращает.
+        :param request: Объект запроса (Request).
+        :return: Объект Response для страницы 400.
         """
-        for i in self.middlewares:
-            i().to_response(response)
+        response = Response(request, status_code=400, body="400 - Некорректный запрос")
+        return response
 
     @staticmethod
     def _handle_404(request: Request = None) -> Response:
@@ -190,3 +233,25 @@ class CCDCServer:
         """
         response = Response(request, status_code=405, body="405 - Метод не разрешен")
         return response
+
+    @staticmethod
+    def _handle_409(request: Request = None) -> Response:
+        """
+        Метод для обработки страницы 409 (Конфликт версий).
+
+        :param request: Объект запроса (Request).
+        :return: Объект Response для страницы 409.
+        """
+        response = Response(request, status_code=409, body="409 - Конфликт версий")
+        return response
+
+    @staticmethod
+    def _handle_413(request: Request = None) -> Response:
+        """
+        Метод для обработки страницы 413 (Слишком большое тело запроса).
+
+        :param request: Объект запроса (Request).
+        :return: Объект Response для страницы 413.
+        """
+        response = Response(request, status_code=413, body="413 - Слишком большое тело запроса")
+        return response
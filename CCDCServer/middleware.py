@@ -1,16 +1,50 @@
+import asyncio
+from typing import Dict, Tuple
 from CCDCServer.request import Request
-from CCDCServer.response import Response
+from CCDCServer.response import Response, StreamingResponse, FileResponse
+from CCDCServer.sessions import SessionStore, SessionData, get_session_store
+from CCDCServer.static import FileCache
+from CCDCServer.compression import Encoder, available_encoders, choose_encoder, compress_stream, compress_stream_async
 from uuid import uuid4
-from urllib.parse import parse_qs
 
 
 class BaseMiddleware:
     """
-    Базовый класс для всех промежуточных слоев. Он определяет два метода: to_request и to_response,
-    которые пока не выполняют никаких действий. Промежуточные слои будут наследоваться от этого базового
-    класса и переопределять эти методы для выполнения своей функциональности.
+    Базовый класс для всех промежуточных слоев. Экземпляр создается один раз при запуске сервера
+    и встраивается в цепочку вызовов. Простые слои переопределяют методы to_request и to_response,
+    слои, которым нужно прервать обработку или обернуть view (кэширование, сжатие, замер времени),
+    переопределяют process и process_async.
     """
 
+    def process(self, request: Request, call_next) -> Response:
+        """
+        Обрабатывает запрос внутри цепочки middleware: вызывает to_request, передает запрос
+        следующему слою через call_next и вызывает to_response для полученного ответа.
+
+        :param request: Объект запроса (Request)
+        :param call_next: Функция, вызывающая следующий слой цепочки
+        :return: Объект ответа (Response)
+        """
+
+        self.to_request(request)
+        response = call_next(request)
+        self.to_response(response)
+        return response
+
+    async def process_async(self, request: Request, call_next) -> Response:
+        """
+        Асинхронный вариант process для ASGI-сервера: call_next - корутина.
+
+        :param request: Объект запроса (Request)
+        :param call_next: Корутина, вызывающая следующий слой цепочки
+        :return: Объект ответа (Response)
+        """
+
+        self.to_request(request)
+        response = await call_next(request)
+        self.to_response(response)
+        return response
+
     def to_request(self, request: Request):
         """
         Этот метод может быть переопределен в производных классах для выполнения действий
@@ -34,20 +68,104 @@ class BaseMiddleware:
 
 class Session(BaseMiddleware):
     """
-    Конкретный промежуточный слой для работы с сессиями. Он наследует функциональность из BaseMiddleware
-    и переопределяет методы to_request и to_response.
+    Конкретный промежуточный слой для работы с сессиями. Он читает идентификатор сессии из куки,
+    кладет в request.session ленивый объект SessionData (данные загружаются при первом обращении),
+    после view записывает сессию в хранилище, если она изменилась, и устанавливает куки новой сессии.
     """
 
-    def __init__(self, cookie_name='session_id', cookie_value=None):
+    def __init__(self, cookie_name='session_id', cookie_value=None, store: SessionStore = None):
         """
         Инициализирует объект Session с именем куки и его начальным значением.
 
         :param cookie_name: Имя куки (по умолчанию 'session_id')
-        :param cookie_value: Начальное значение куки (по умолчанию None)
+        :param cookie_value: Значение куки для to_response (по умолчанию None - генерируется при установке куки)
+        :param store: Хранилище сессий (по умолчанию get_session_store())
         """
 
         self.cookie_name = cookie_name
-        self.cookie_value = cookie_value or str(uuid4())
+        self.cookie_value = cookie_value
+        self.store = store
+
+    def process(self, request: Request, call_next) -> Response:
+        """
+        Создает сессию запроса, вызывает следующий слой и записывает сессию, если она изменилась.
+
+        :param request: Объект запроса (Request)
+        :param call_next: Функция, вызывающая следующий слой цепочки
+        :return: Объект ответа (Response)
+        """
+
+        session = self._open_session(request)
+        response = call_next(request)
+        self._get_store().save(session)
+        self._set_session_cookie(request, response, session)
+        return response
+
+    async def process_async(self, request: Request, call_next) -> Response:
+        """
+        Асинхронный вариант process. Обращения к постоянному хранилищу выполняются в пуле потоков;
+        сессия, которой нет в кэше, загружается заранее, чтобы view не блокировала цикл событий.
+
+        :param request: Объект запроса (Request)
+        :param call_next: Корутина, вызывающая следующий слой цепочки
+        :return: Объект ответа (Response)
+        """
+
+        session = self._open_session(request)
+        if session.session_id is not None and not self._get_store().is_cached(session.session_id):
+            await asyncio.to_thread(session.load)
+        response = await call_next(request)
+        if session.dirty:
+            await asyncio.to_thread(self._get_store().save, session)
+        self._set_session_cookie(request, response, session)
+        return response
+
+    def _get_store(self) -> SessionStore:
+        """
+        Возвращает хранилище сессий, получая хранилище по умолчанию при первом запросе.
+
+        :return: Хранилище сессий.
+        """
+
+        if self.store is None:
+            self.store = get_session_store()
+        return self.store
+
+    def _open_session(self, request: Request) -> SessionData:
+        """
+        Читает куки сессии и кладет ленивый объект SessionData в request.session.
+
+        :param request: Объект запроса (Request)
+        :return: Объект SessionData
+        """
+
+        self.to_request(request)
+        session = SessionData(self._get_store(), request.extra.get(self.cookie_name))
+        request.extra['session'] = session
+        return session
+
+    def _set_session_cookie(self, request: Request, response: Response, session: SessionData):
+        """
+        Устанавливает куки, если у сессии появился новый идентификатор (создание сессии или вход пользователя).
+
+        :param request: Объект запроса (Request)
+        :param response: Объект ответа (Response)
+        :param session: Объект SessionData
+        """
+
+        if session.session_id is not None and session.session_id != request.extra.get(self.cookie_name):
+            response.update_headers({'Set-Cookie': self._cookie(session.session_id)})
+
+    def _cookie(self, value: str) -> str:
+        """
+        Формирует значение заголовка Set-Cookie.
+
+        :param value: Значение куки
+        :return: Строка для заголовка Set-Cookie
+        """
+
+        max_age = 2_700_000  # примерно месяц
+        return f'{self.cookie_name}={value}; Max-Age={max_age}; Path=/; HttpOnly'
 
     def to_request(self, request: Request):
         """
@@ -57,11 +175,9 @@ class Session(BaseMiddleware):
         :param request: Объект запроса (Request)
         """
 
-        cookie = request.environ.get('HTTP_COOKIE', None)
-        if cookie:
-            cookies = parse_qs(cookie)
-            if self.cookie_name in cookies:
-                request.extra[self.cookie_name] = cookies[self.cookie_name][0]
+        value = request.cookies.get(self.cookie_name)
+        if value:
+            request.extra[self.cookie_name] = value
 
     def to_response(self, response: Response):
         """
@@ -72,12 +188,219 @@ class Session(BaseMiddleware):
         """
 
         if not response.request.extra.get(self.cookie_name):
-            max_age = 2_700_000  # примерно месяц
-            response.update_headers(
-                {'Set-Cookie': f'{self.cookie_name}={self.cookie_value}; Max-Age={max_age}'}
-            )
+            response.update_headers({'Set-Cookie': self._cookie(self.cookie_value or str(uuid4()))})
+
+
+class Compression(BaseMiddleware):
+    """
+    Промежуточный слой для сжатия ответов (Content-Encoding) по Accept-Encoding клиента: gzip и deflate
+    из стандартной библиотеки, zstd и br - если установлены пакеты zstandard и brotli.
+    Не сжимаются небольшие тела, уже сжатые типы содержимого (изображения, архивы и т. п.), ответы с
+    Content-Encoding и Cache-Control: no-transform. Потоковые ответы сжимаются по частям.
+    Сжатые тела кэшируются по адресу запроса и ETag ответа, поэтому одна и та же страница не сжимается
+    при каждом запросе.
+    """
+
+    compressible_types = (
+        'text/', 'application/json', 'application/javascript', 'application/xml',
+        'application/xhtml+xml', 'application/rss+xml', 'image/svg+xml',
+    )
+    # Несжатые тела больше этого размера сжимаются в ASGI-сервере в пуле потоков
+    thread_threshold = 64 * 1024
+
+    def __init__(self, min_size: int = 1024, levels: Dict[str, int] = None, cache_size: int = 32 * 1024 * 1024,
+                 cache_max_entry_size: int = 1024 * 1024, encoders=None):
+        """
+        Инициализирует объект Compression.
+
+        :param min_size: Минимальный размер тела в байтах, начиная с которого ответ сжимается
+        :param levels: Уровни сжатия {название кодировки: уровень}
+        :param cache_size: Суммарный размер кэша сжатых тел в байтах (0 - не кэшировать)
+        :param cache_max_entry_size: Максимальный размер одного сжатого тела в кэше
+        :param encoders: Список кодировщиков в порядке предпочтения (по умолчанию available_encoders(levels))
+        """
+
+        self.min_size = min_size
+        self.encoders = encoders if encoders is not None else available_encoders(levels)
+        self.cache = FileCache(cache_size, cache_max_entry_size) if cache_size else None
+
+    def process(self, request: Request, call_next) -> Response:
+        """
+        Вызывает следующий слой и сжимает полученный ответ.
+
+        :param request: Объект запроса (Request)
+        :param call_next: Функция, вызывающая следующий слой цепочки
+        :return: Объект ответа (Response)
+        """
+
+        response = call_next(request)
+        encoder = self._get_encoder(request, response)
+        if encoder is None:
+            return response
+        return self._compress(response, encoder)
+
+    async def process_async(self, request: Request, call_next) -> Response:
+        """
+        Асинхронный вариант process. Большие несжатые тела сжимаются в пуле потоков,
+        части потоковых тел сервер и так получает из пула потоков.
+
+        :param request: Объект запроса (Request)
+        :param call_next: Корутина, вызывающая следующий слой цепочки
+        :return: Объект ответа (Response)
+        """
+
+        response = await call_next(request)
+        encoder = self._get_encoder(request, response)
+        if encoder is None:
+            return response
+        if not response.streaming and len(response.body) >= self.thread_threshold:
+            return await asyncio.to_thread(self._compress, response, encoder)
+        return self._compress(response, encoder)
+
+    def _get_encoder(self, request: Request, response: Response):
+        """
+        Проверяет, нужно ли сжимать ответ, и выбирает кодировщик по Accept-Encoding.
+
+        :param request: Объект запроса (Request)
+        :param response: Объект ответа (Response)
+        :return: Объект Encoder или None, если ответ отдается как есть
+        """
+
+        headers = response.headers
+        if response.status_code < 200 or response.status_code >= 300 or response.status_code in (204, 206):
+            return None
+        if request.environ.get('REQUEST_METHOD') == 'HEAD' or 'Content-Encoding' in headers:
+            return None
+        if 'no-transform' in headers.get('Cache-Control', ''):
+            return None
+        if not headers.get('Content-Type', '').startswith(self.compressible_types):
+            return None
+        if not response.streaming and len(response.body) < self.min_size:
+            return None
+        if response.streaming and int(headers.get('Content-Length') or self.min_size) < self.min_size:
+            return None
+
+        self._add_vary(headers)
+        return choose_encoder(request.environ.get('HTTP_ACCEPT_ENCODING', ''), self.encoders)
+
+    def _compress(self, response: Response, encoder: Encoder) -> Response:
+        """
+        Сжимает тело ответа или берет сжатое тело из кэша. ETag сжатого ответа становится слабым
+        (W/), так как байты тела отличаются, а содержимое то же; проверка If-None-Match по-прежнему совпадает.
+
+        :param response: Объект ответа (Response)
+        :param encoder: Выбранный кодировщик
+        :return: Объект ответа (Response) со сжатым телом
+        """
+
+        headers = dict(response.headers)
+        headers['Content-Encoding'] = encoder.name
+        etag = headers.get('ETag')
+        cache_key = self._cache_key(response.request, etag, encoder)
+        if etag is not None and not etag.startswith('W/'):
+            headers['ETag'] = 'W/' + etag
+
+        cached = self.cache.get(cache_key) if cache_key is not None else None
+        if cached is not None:
+            if response.streaming:
+                self._close_body(response)
+            return self._make_response(response, headers, cached)
+
+        if not response.streaming:
+            body = encoder.compress(response.body)
+            if cache_key is not None:
+                self.cache.put(cache_key, body)
+            return self._make_response(response, headers, body)
+
+        headers.pop('Content-Length', None)
+        if hasattr(response.body, '__aiter__'):
+            body = compress_stream_async(encoder, response.body)
+        else:
+            body = compress_stream(encoder, response.body)
+            if cache_key is not None:
+                body = self._cache_stream(cache_key, body)
+        compressed = StreamingResponse(response.request, status_code=response.status_code, headers=headers)
+        compressed.body = body
+        return compressed
+
+    def _cache_key(self, request: Request, etag: str, encoder: Encoder) -> Tuple[str, str, str, str]:
+        """
+        Возвращает ключ кэша сжатых тел. Кэшируются только ответы с сильным ETag:
+        слабый ETag не гарантирует, что тела побайтно совпадают. ETag уникален только в пределах
+        одного адреса (у StaticFiles он строится из времени изменения и размера файла), поэтому
+        в ключ входят путь и строка запроса.
+
+        :param request: Объект запроса (Request)
+        :param etag: ETag ответа или None
+        :param encoder: Кодировщик
+        :return: Кортеж (путь, строка запроса, ETag, кодировка) или None
+        """
+
+        if self.cache is None or etag is None or etag.startswith('W/'):
+            return None
+        environ = request.environ
+        path = environ.get('SCRIPT_NAME', '') + environ.get('PATH_INFO', '')
+        return path, environ.get('QUERY_STRING', ''), etag, encoder.name
+
+    def _cache_stream(self, cache_key: Tuple[str, str, str, str], chunks):
+        """
+        Отдает части сжатого потокового тела и кладет тело в кэш, если поток дошел до конца
+        и не превысил размер записи кэша.
+
+        :param cache_key: Ключ кэша
+        :param chunks: Генератор сжатых байтов
+        :return: Генератор сжатых байтов
+        """
+
+        parts, size = [], 0
+        try:
+            for chunk in chunks:
+                if parts is not None:
+                    size += len(chunk)
+                    if size <= self.cache.max_file_size:
+                        parts.append(chunk)
+                    else:
+                        parts = None
+                yield chunk
+        finally:
+            chunks.close()
+        if parts is not None:
+            self.cache.put(cache_key, b''.join(parts))
+
+    @staticmethod
+    def _close_body(response: Response):
+        """
+        Закрывает тело потокового ответа, которое не будет отправлено (сжатое тело взято из кэша).
+
+        :param response: Объект ответа (Response)
+        """
+
+        close = getattr(response.body, 'close', None)
+        if close is not None:
+            close()
+        if isinstance(response, FileResponse):
+            response.file.close()
+
+    @staticmethod
+    def _make_response(response: Response, headers: dict, body: bytes) -> Response:
+        return Response(response.request, status_code=response.status_code, headers=headers, body=body)
+
+    @staticmethod
+    def _add_vary(headers: dict):
+        """
+        Добавляет Accept-Encoding в заголовок Vary, так как ответ зависит от кодировок клиента.
+
+        :param headers: Заголовки ответа
+        """
+
+        vary = headers.get('Vary')
+        if not vary:
+            headers['Vary'] = 'Accept-Encoding'
+        elif 'accept-encoding' not in vary.lower() and vary.strip() != '*':
+            headers['Vary'] = f'{vary}, Accept-Encoding'
 
 
 middlewares = [
-    Session
+    Compression,
+    Session,
 ]
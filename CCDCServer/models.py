@@ -1,13 +1,22 @@
+import asyncio
 from CCDCSQLQueryBuilder.select import SelectQuery
-from CCDCSQLQueryBuilder.insert import InsertQuery
+from CCDCSQLQueryBuilder.insert import InsertQuery, InsertSelectQuery
+from CCDCSQLQueryBuilder.update import UpdateQuery
+from CCDCSQLQueryBuilder.delete import DeleteQuery
 from CCDCSQLQueryBuilder.execute import execute_query
+from CCDCSQLQueryBuilder.relations import load_related, count_related
+from CCDCServer.assets import BLOCK_ASSET_COLUMNS, get_asset_store
+from CCDCServer.cache import invalidate_tags
+from CCDCServer.patches import get_site_patcher
+from CCDCServer.publisher import get_publisher
+from CCDCServer.passwords import get_password_hasher
 
 
 class Authentication:
     """
     Класс для аутентификации пользователей.
     """
-    __slots__ = {"login", "password"}
+    __slots__ = {"login", "password", "user"}
 
     def __init__(self, login: str, password: str):
         """
@@ -23,69 +32,137 @@ class Authentication:
             raise ValueError("Не передан параметр password")
         self.login = login
         self.password = password
+        self.user = None
 
     async def _select_user(self):
         """
-        Выполняет запрос к базе данных для выбора пользователя по логину и паролю.
+        Выполняет запрос к базе данных для выбора пользователя по логину.
 
         :return: Результат запроса к базе данных (одна запись) или None, если пользователь не найден.
         """
 
-        select_user = SelectQuery("users", "login", "password")
+        select_user = SelectQuery("users", "idusers", "login", "password")
         select_user.conditions.append("login = %s")
-        select_user.conditions.append("password = %s")
         select_user.params.append(self.login)
-        select_user.params.append(self.password)
         query, params = select_user.build_query()
         return await execute_query(query, params, "fetchone")
 
     async def _create_user(self):
         """
-        Создает новую запись пользователя в базе данных.
+        Создает новую запись пользователя в базе данных. Сохраняется хэш пароля, а не сам пароль.
 
         :return: Ничего не возвращает.
         """
 
-        data_to_insert = {"hash": f"{self.login}", "password": f"{self.password}"}
+        password_hash = await get_password_hasher().hash(self.password)
+        data_to_insert = {"login": self.login, "password": password_hash}
         insert_query = InsertQuery("users", data_to_insert)
         query, params = insert_query.build_query()
         await execute_query(query, params)
 
+    async def _update_hash(self, user_id: int):
+        """
+        Пересчитывает хэш пароля с текущими параметрами (пароль старого формата или параметры scrypt изменились).
+
+        :param user_id: Идентификатор пользователя.
+        :return: Ничего не возвращает.
+        """
+
+        password_hash = await get_password_hasher().hash(self.password)
+        update_query = UpdateQuery("users", {"password": password_hash}, conditions=["idusers = %s"], params=[user_id])
+        query, params = update_query.build_query()
+        await execute_query(query, params)
+
     async def _insert_hash(self):
-        user = self._select_user()
+        user = await self._select_user()
         if not user:
             return False
         data_to_insert = {"hash": f"{self.login}", "password": f"{self.password}"}
 
-    def auth(self):
+    async def auth(self):
         """
-        Выполняет аутентификацию пользователя.
+        Выполняет аутентификацию пользователя. Пароль проверяется в пуле процессов хэширования;
+        если хэш сохранен в старом формате или с другими параметрами, он пересчитывается.
+        Найденная запись (без хэша пароля) сохраняется в атрибуте user.
 
         :return: True, если аутентификация успешна, иначе False.
         """
 
-        res = self._select_user()
-        if res is not None:
-
-            return True
-        else:
+        hasher = get_password_hasher()
+        res = await self._select_user()
+        if res is None:
+            # Проверка выполняется и для несуществующего логина, чтобы время ответа его не выдавало
+            await hasher.dummy_verify(self.password)
+            return False
+        if not await hasher.verify(self.password, res["password"]):
             return False
 
-    def reg(self):
+        if hasher.needs_rehash(res["password"]):
+            await self._update_hash(res["idusers"])
+        self.user = {key: value for key, value in res.items() if key != "password"}
+        return True
+
+    async def reg(self):
         """
         Регистрирует нового пользователя.
 
         :return: True, если регистрация успешна (новый пользователь добавлен), иначе False (пользователь уже существует)
         """
 
-        res = self._select_user()
+        res = await self._select_user()
         if res is not None:
             return False
         else:
-            self._create_user()
+            await self._create_user()
             return True
 
 
+class Dashboard:
+    """
+    Класс для загрузки данных панели пользователей: проекты с сайтами и количество блоков.
+    Данные загружаются фиксированным числом запросов независимо от числа проектов и сайтов:
+    проекты и количество блоков - параллельно, затем сайты всех проектов одним запросом IN (...).
+    """
+    __slots__ = {"user_ids"}
+
+    def __init__(self, *user_ids: int):
+        """
+        Инициализирует объект Dashboard.
+
+        :param user_ids: Идентификаторы пользователей.
+        """
+
+        if not user_ids:
+            raise ValueError("Не переданы идентификаторы пользователей")
+        self.user_ids = user_ids
+
+    async def load(self) -> dict:
+        """
+        Загружает данные панели.
+
+        :return: Словарь {идентификатор пользователя: {"projects": [проект с ключом "sites", ...],
+            "block_count": количество блоков}}.
+        """
+
+        projects, block_counts = await asyncio.gather(
+            load_related("projects", "users_iduser", self.user_ids,
+                         "idprojects", "project_name", "project_path", order_by="idprojects"),
+            count_related("blocks", "users_iduser", self.user_ids),
+        )
+        project_ids = [project["idprojects"] for rows in projects.values() for project in rows]
+        # site_json не выбирается: для панели достаточно названий сайтов
+        sites = await load_related("sites", "projects_idproject", project_ids,
+                                   "idsites", "site_name", "folder_name", order_by="idsites")
+
+        dashboard = {}
+        for user_id in self.user_ids:
+            user_projects = projects.get(user_id, [])
+            for project in user_projects:
+                project["sites"] = sites.get(project["idprojects"], [])
+            dashboard[user_id] = {"projects": user_projects, "block_count": block_counts.get(user_id, 0)}
+        return dashboard
+
+
 class ManagingProject:
     def __init__(self, username: str):
         if not username:
@@ -117,25 +194,114 @@ class ManagingPages:
     def delete_page(self):
         pass
 
-    def settings_page(self):
-        pass
+    async def settings_page(self, site_id: int, version: int, page_index: int, settings: dict, client=None):
+        """
+        Сохраняет настройки страницы сайта частичным изменением site_json (JSON Patch),
+        не перезаписывая документ целиком. У страницы должен быть объект "settings".
+        Сбрасывает записи кэша страниц с тегом 'site:<site_id>'; если сайт опубликован,
+        измененные страницы перепубликуются.
+
+        :param site_id: Идентификатор сайта.
+        :param version: Версия сайта, которую видел редактор.
+        :param page_index: Номер страницы в site_json["pages"].
+        :param settings: Словарь настроек {имя: значение}.
+        :param client: Ключ экземпляра редактора для объединения частых сохранений
+            (например, идентификатор сессии и вкладки).
+        :return: Новая версия сайта или None при ошибке базы данных.
+        :raises Conflict: Если сайт изменен другим запросом или у страницы нет объекта "settings".
+        """
+
+        operations = [
+            {"op": "add", "path": f"/pages/{int(page_index)}/settings/{name.replace('~', '~0').replace('/', '~1')}",
+             "value": value}
+            for name, value in settings.items()
+        ]
+        new_version = await get_site_patcher().patch(site_id, version, operations, client=client)
+        if new_version is not None:
+            invalidate_tags(f'site:{site_id}')
+        publisher = get_publisher()
+        if new_version is not None and publisher.is_published(site_id):
+            await publisher.publish_site(site_id)
+        return new_version
 
 
 class ManagingBlocks:
+    """
+    Класс для управления блоками. Содержимое блоков хранится в хранилище с адресацией по хэшу
+    (CCDCServer.assets), строки blocks ссылаются на хэши, поэтому копирование блока не копирует содержимое.
+    После изменения сбрасываются записи кэша страниц с тегами 'user:<владелец>' (списки блоков пользователя)
+    и 'block:<идентификатор>' (страницы и фрагменты с блоком).
+    """
+
     def __init__(self):
         pass
 
-    def create_block(self):
-        pass
+    async def create_block(self, user_id: int, block_html: bytes, block_css: bytes, block_js: bytes = None):
+        """
+        Создает блок пользователя.
+
+        :param user_id: Идентификатор пользователя.
+        :param block_html: HTML блока.
+        :param block_css: CSS блока.
+        :param block_js: JS блока (опционально).
+        :return: Ничего не возвращает.
+        """
+
+        store = get_asset_store()
+        loop = asyncio.get_running_loop()
+        data_to_insert = {"users_iduser": user_id}
+        for column, content in zip(BLOCK_ASSET_COLUMNS, (block_html, block_css, block_js)):
+            if content is not None:
+                if isinstance(content, str):
+                    content = content.encode('utf-8')
+                data_to_insert[column] = await loop.run_in_executor(None, store.put, content)
+        query, params = InsertQuery("blocks", data_to_insert).build_query()
+        await execute_query(query, params)
+        invalidate_tags(f'user:{user_id}')
 
     def append_block(self):
         pass
 
-    def delete_block(self):
-        pass
+    async def delete_block(self, block_id: int):
+        """
+        Удаляет блок. Содержимое удаляется из хранилища сборкой мусора (collect_assets),
+        если на него больше не ссылаются другие блоки. Опубликованные страницы с этим блоком перепубликуются.
 
-    def copy_block(self):
-        pass
+        :param block_id: Идентификатор блока.
+        :return: Ничего не возвращает.
+        """
+
+        select_owner = SelectQuery("blocks", "users_iduser", conditions=["idblocks = %s"])
+        select_owner.params.append(block_id)
+        owner = await execute_query(*select_owner.build_query(), "fetchone")
+        query, params = DeleteQuery("blocks", conditions=["idblocks = %s"], params=[block_id]).build_query()
+        await execute_query(query, params)
+        tags = [f'block:{block_id}']
+        if owner:
+            tags.append(f'user:{owner["users_iduser"]}')
+        invalidate_tags(*tags)
+        # publish_blocks сбрасывает и скомпилированные страницы с этим блоком
+        await get_publisher().publish_blocks([block_id])
+
+    async def copy_block(self, block_id: int, user_id: int):
+        """
+        Копирует блок пользователю. Копируются только ссылки на содержимое (и BLOB-колонки
+        старых блоков, созданных до хранилища) - на стороне сервера, через INSERT ... SELECT.
+
+        :param block_id: Идентификатор копируемого блока.
+        :param user_id: Идентификатор пользователя, которому принадлежит копия.
+        :return: Ничего не возвращает.
+        """
+
+        columns = ("block_html", "block_css", "block_js") + BLOCK_ASSET_COLUMNS
+        insert_query = InsertSelectQuery(
+            "blocks", ("users_iduser",) + columns,
+            SelectQuery("blocks", "%s", *columns, conditions=["idblocks = %s"]),
+            column_params=[user_id], params=[block_id],
+        )
+        query, params = insert_query.build_query()
+        await execute_query(query, params)
+        invalidate_tags(f'user:{user_id}')
 
     def setting_block(self):
         pass
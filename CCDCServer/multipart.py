@@ -0,0 +1,244 @@
+from email.message import Message
+from tempfile import SpooledTemporaryFile
+from typing import Dict, List, Tuple
+from CCDCServer.exceptions import BadRequest
+
+
+def parse_header_params(name: str, value: str) -> Message:
+    """
+    Разбирает заголовок с параметрами (например, Content-Type или Content-Disposition).
+
+    :param name: Имя заголовка.
+    :param value: Значение заголовка.
+    :return: Объект email.message.Message, из которого параметры читаются через get_param.
+    """
+
+    message = Message()
+    message[name] = value
+    return message
+
+
+class UploadedFile:
+    """
+    Загруженный файл из multipart/form-data. Содержимое хранится в SpooledTemporaryFile:
+    небольшие файлы остаются в памяти, большие сбрасываются во временный файл на диске.
+    Объект ведет себя как файл (read, seek, tell, close).
+    """
+    __slots__ = ("name", "filename", "content_type", "headers", "file", "size")
+
+    def __init__(self, name: str, filename: str, content_type: str, headers: dict, spool_size: int):
+        """
+        Конструктор класса UploadedFile.
+
+        :param name: Имя поля формы.
+        :param filename: Имя файла, переданное клиентом.
+        :param content_type: MIME-тип файла, переданный клиентом.
+        :param headers: Заголовки части multipart.
+        :param spool_size: Размер, после которого содержимое сбрасывается на диск.
+        """
+
+        self.name = name
+        self.filename = filename
+        self.content_type = content_type
+        self.headers = headers
+        self.file = SpooledTemporaryFile(max_size=spool_size)
+        self.size = 0
+
+    def write(self, data: bytes):
+        self.file.write(data)
+        self.size += len(data)
+
+    def read(self, size: int = -1) -> bytes:
+        return self.file.read(size)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self.file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class MultipartParser:
+    """
+    Потоковый разборщик тела multipart/form-data. Тело читается частями фиксированного размера,
+    поэтому память на запрос ограничена размером части и порогом сброса файлов на диск,
+    а не размером загружаемых файлов.
+    """
+
+    _max_header_size = 16 * 1024
+
+    def __init__(self, stream, boundary: str, **kwargs):
+        """
+        Конструктор класса MultipartParser.
+
+        :param stream: Поток тела запроса (Request.stream).
+        :param boundary: Разделитель частей из заголовка Content-Type.
+        :param kwargs: Дополнительные аргументы:
+            - chunk_size: Размер читаемой части тела в байтах (по умолчанию 64 КБ).
+            - spool_size: Размер файла, после которого он сбрасывается на диск (по умолчанию 1 МБ).
+            - max_field_size: Максимальный размер обычного (не файлового) поля (по умолчанию 1 МБ).
+            - encoding: Кодировка обычных полей (по умолчанию utf-8).
+        """
+
+        if not boundary or len(boundary) > 200:
+            raise BadRequest("Некорректный разделитель multipart")
+
+        self.stream = stream
+        self.delimiter = b'\r\n--' + boundary.encode('latin-1')
+        self.chunk_size = kwargs.get("chunk_size", 64 * 1024)
+        self.spool_size = kwargs.get("spool_size", 1024 * 1024)
+        self.max_field_size = kwargs.get("max_field_size", 1024 * 1024)
+        self.encoding = kwargs.get("encoding", "utf-8")
+
+    def _chunks(self):
+        """
+        Читает тело запроса частями. Перед телом добавляется CRLF, чтобы первый разделитель
+        имел тот же вид, что и остальные.
+
+        :return: Генератор байтов.
+        """
+
+        yield b'\r\n'
+        while True:
+            chunk = self.stream.read(self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def parse(self) -> Tuple[Dict[str, List[str]], Dict[str, List[UploadedFile]]]:
+        """
+        Разбирает тело запроса. Если тело некорректно, файлы уже разобранных частей закрываются.
+
+        :return: Кортеж из словаря обычных полей {имя: [значения]} и словаря файлов {имя: [UploadedFile]}.
+        :raises BadRequest: Если тело не соответствует формату multipart/form-data.
+        """
+
+        fields, files = {}, {}
+        delimiter = self.delimiter
+        keep = len(delimiter) + 1
+        buffer = bytearray()
+        state = 'preamble'
+        part = None
+
+        try:
+            for chunk in self._chunks():
+                buffer += chunk
+                while True:
+                    if state == 'preamble':
+                        index = buffer.find(delimiter)
+                        if index < 0:
+                            del buffer[:max(len(buffer) - keep, 0)]
+                            break
+                        del buffer[:index + len(delimiter)]
+                        state = 'boundary'
+
+                    if state == 'boundary':
+                        if len(buffer) < 2:
+                            break
+                        if buffer[:2] == b'--':
+                            return fields, files
+                        end = buffer.find(b'\r\n')
+                        if (end if end >= 0 else len(buffer)) > self._max_header_size:
+                            raise BadRequest("Некорректный разделитель multipart")
+                        if end < 0:
+                            break
+                        del buffer[:end + 2]
+                        state = 'headers'
+
+                    if state == 'headers':
+                        end = buffer.find(b'\r\n\r\n')
+                        if (end if end >= 0 else len(buffer)) > self._max_header_size:
+                            raise BadRequest("Слишком большие заголовки части multipart")
+                        if end < 0:
+                            break
+                        part = self._start_part(bytes(buffer[:end]))
+                        del buffer[:end + 4]
+                        state = 'body'
+
+                    if state == 'body':
+                        index = buffer.find(delimiter)
+                        if index < 0:
+                            flush = len(buffer) - keep
+                            if flush > 0:
+                                self._write_part(part, buffer[:flush])
+                                del buffer[:flush]
+                            break
+                        self._write_part(part, buffer[:index])
+                        self._finish_part(part, fields, files)
+                        part = None
+                        del buffer[:index + len(delimiter)]
+                        state = 'boundary'
+
+            raise BadRequest("Тело multipart обрывается до завершающего разделителя")
+        except Exception:
+            # Файлы не попадут к view: временные файлы уже созданных частей закрываются сразу
+            for uploads in files.values():
+                for upload in uploads:
+                    upload.close()
+            if isinstance(part, UploadedFile):
+                part.close()
+            raise
+
+    def _start_part(self, raw_headers: bytes):
+        """
+        Разбирает заголовки части и создает объект для ее содержимого.
+
+        :param raw_headers: Байты заголовков части.
+        :return: UploadedFile для файлового поля или список [имя, bytearray] для обычного поля.
+        """
+
+        headers = {}
+        for line in raw_headers.decode('utf-8', errors='replace').split('\r\n'):
+            name, _, value = line.partition(':')
+            if name:
+                headers[name.strip().lower()] = value.strip()
+
+        disposition = parse_header_params('content-disposition', headers.get('content-disposition', ''))
+        name = disposition.get_param('name', header='content-disposition')
+        if name is None:
+            raise BadRequest("Часть multipart без имени поля")
+        filename = disposition.get_filename()
+
+        if filename is None:
+            return [name, bytearray()]
+        content_type = headers.get('content-type', 'application/octet-stream')
+        return UploadedFile(name, filename, content_type, headers, self.spool_size)
+
+    def _write_part(self, part, data):
+        """
+        Дописывает данные в текущую часть.
+
+        :param part: UploadedFile или список [имя, bytearray].
+        :param data: Байты содержимого.
+        """
+
+        if isinstance(part, UploadedFile):
+            part.write(data)
+            return
+        if len(part[1]) + len(data) > self.max_field_size:
+            raise BadRequest("Слишком большое поле формы")
+        part[1] += data
+
+    def _finish_part(self, part, fields: dict, files: dict):
+        """
+        Завершает часть и добавляет ее в словарь полей или файлов.
+
+        :param part: UploadedFile или список [имя, bytearray].
+        :param fields: Словарь обычных полей.
+        :param files: Словарь файлов.
+        """
+
+        if isinstance(part, UploadedFile):
+            part.seek(0)
+            files.setdefault(part.name, []).append(part)
+        else:
+            fields.setdefault(part[0], []).append(part[1].decode(self.encoding, errors='replace'))
@@ -0,0 +1,445 @@
+"""
+Компиляция страниц сайтов из sites.site_json.
+
+Страницы сайта описываются колонкой sites.site_json:
+
+    {"pages": [{"path": "index.html", "title": "Главная", "body": [узел, ...]}, ...]}
+
+Узел страницы - один из вариантов:
+    {"block": 12}                                          - блок из таблицы blocks (html, css и js блока);
+    {"html": "<hr>"}                                       - HTML как есть;
+    {"text": "Текст"}                                      - текст, экранируется;
+    {"var": "user_name"}                                   - переменная, подставляется при рендеринге
+                                                             (экранируется; {"var": ..., "raw": true} - как есть);
+    {"tag": "div", "attrs": {"class": "row"}, "children": [узел, ...]} - элемент с вложенными узлами.
+
+Дерево страницы обходится один раз при компиляции: соседние статические части (разметка, блоки,
+CSS и JS) склеиваются и кодируются в байты, остаются только места для переменных. Рендеринг
+скомпилированной страницы - подстановка переменных и один b''.join.
+"""
+
+import asyncio
+import hashlib
+import html
+import json
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from CCDCSQLQueryBuilder.relations import load_related
+from CCDCServer.assets import BLOCK_ASSET_COLUMNS, get_asset_store
+
+_TAG_NAME = re.compile(r'^[a-zA-Z][a-zA-Z0-9-]*$')
+
+
+def page_blocks(page: dict) -> Set[int]:
+    """
+    Возвращает идентификаторы блоков, на которые ссылается страница.
+
+    :param page: Описание страницы из site_json.
+    :return: Множество идентификаторов блоков.
+    """
+
+    found = set()
+    stack = list(page.get('body', []))
+    while stack:
+        node = stack.pop()
+        if 'block' in node:
+            found.add(int(node['block']))
+        stack.extend(node.get('children', []))
+    return found
+
+
+def _encode(value) -> bytes:
+    if value is None:
+        return b''
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, (bytearray, memoryview)):
+        return bytes(value)
+    return str(value).encode('utf-8')
+
+
+class CompiledPage:
+    """
+    Скомпилированная страница: кортеж готовых байтовых частей и места для переменных.
+    Страница без переменных хранится одним объектом bytes и отдается без копирования.
+    """
+    __slots__ = ('parts', 'slots', 'block_ids')
+
+    def __init__(self, parts: Tuple[bytes, ...], slots: Tuple[Tuple[int, str, bool], ...], block_ids: frozenset):
+        """
+        Конструктор класса CompiledPage.
+
+        :param parts: Части страницы; на местах переменных - пустые байты.
+        :param slots: Кортежи (индекс части, имя переменной, вставлять ли без экранирования).
+        :param block_ids: Идентификаторы блоков, из которых собрана страница.
+        """
+        self.parts = (b''.join(parts),) if not slots else parts
+        self.slots = slots
+        self.block_ids = block_ids
+
+    def chunks(self, context: dict = None) -> List[bytes]:
+        """
+        Возвращает части страницы с подставленными переменными, не склеивая их
+        (например, для StreamingResponse).
+
+        :param context: Словарь значений переменных.
+        :return: Список байтов.
+        """
+        if not self.slots:
+            return list(self.parts)
+        context = context or {}
+        parts = list(self.parts)
+        for index, name, raw in self.slots:
+            value = context.get(name, '')
+            parts[index] = _encode(value) if raw else html.escape(str(value)).encode('utf-8')
+        return parts
+
+    def render(self, context: dict = None) -> bytes:
+        """
+        Рендерит страницу.
+
+        :param context: Словарь значений переменных.
+        :return: HTML-документ в байтах.
+        """
+        if not self.slots:
+            return self.parts[0]
+        return b''.join(self.chunks(context))
+
+    def __len__(self):
+        return sum(len(part) for part in self.parts)
+
+
+class _PageBuilder:
+    """
+    Обходит дерево страницы и собирает части: статические байты копятся в буфере
+    и склеиваются только перед местом переменной.
+    """
+    __slots__ = ('blocks', 'parts', 'slots', 'pending', 'css', 'js', 'used')
+
+    def __init__(self, blocks: Dict[int, tuple]):
+        self.blocks = blocks
+        self.parts = []
+        self.slots = []
+        self.pending = []
+        self.css = []
+        self.js = []
+        self.used = set()
+
+    def static(self, data):
+        if data:
+            self.pending.append(_encode(data))
+
+    def variable(self, name: str, raw: bool):
+        self.parts.append(b''.join(self.pending))
+        self.pending = []
+        self.slots.append((len(self.parts), name, raw))
+        self.parts.append(b'')
+
+    def nodes(self, nodes: list):
+        for node in nodes:
+            if 'block' in node:
+                block_id = int(node['block'])
+                block = self.blocks.get(block_id)
+                if block is None:
+                    continue
+                block_html, block_css, block_js = block
+                self.static(block_html)
+                if block_id not in self.used:
+                    self.used.add(block_id)
+                    if block_css:
+                        self.css.append(_encode(block_css))
+                    if block_js:
+                        self.js.append(_encode(block_js))
+            elif 'html' in node:
+                self.static(node['html'])
+            elif 'text' in node:
+                self.static(html.escape(node['text']))
+            elif 'var' in node:
+                self.variable(node['var'], bool(node.get('raw', False)))
+            elif 'tag' in node:
+                tag = node['tag']
+                if not _TAG_NAME.match(tag):
+                    raise ValueError(f"Некорректное имя тега: {tag}")
+                attrs = ''.join(f' {html.escape(name)}="{html.escape(str(value))}"'
+                                for name, value in node.get('attrs', {}).items())
+                self.static(f'<{tag}{attrs}>')
+                self.nodes(node.get('children', []))
+                self.static(f'</{tag}>')
+
+
+def compile_page(page: dict, blocks: Dict[int, tuple]) -> CompiledPage:
+    """
+    Компилирует страницу сайта. CSS и JS блоков выносятся в head и конец body, по одному разу на блок.
+
+    :param page: Описание страницы из site_json.
+    :param blocks: Словарь {идентификатор блока: (block_html, block_css, block_js)}.
+    :return: Объект CompiledPage.
+    """
+
+    body = _PageBuilder(blocks)
+    body.nodes(page.get('body', []))
+
+    head = f'<!DOCTYPE html><html lang="ru"><head><meta charset="utf-8">' \
+           f'<title>{html.escape(page.get("title", ""))}</title>'.encode('utf-8')
+    if body.css:
+        head += b'<style>' + b''.join(body.css) + b'</style>'
+    head += b'</head><body>'
+    tail = b'<script>' + b''.join(body.js) + b'</script>' if body.js else b''
+
+    body.pending.append(tail + b'</body></html>')
+    parts = body.parts + [b''.join(body.pending)]
+    parts[0] = head + parts[0]
+    return CompiledPage(tuple(parts), tuple(body.slots), frozenset(page_blocks(page)))
+
+
+def render_page(page: dict, blocks: Dict[int, tuple], context: dict = None) -> bytes:
+    """
+    Компилирует и рендерит страницу сайта один раз (например, для публикации в файл).
+
+    :param page: Описание страницы из site_json.
+    :param blocks: Словарь {идентификатор блока: (block_html, block_css, block_js)}.
+    :param context: Словарь значений переменных.
+    :return: HTML-документ в байтах.
+    """
+
+    return compile_page(page, blocks).render(context)
+
+
+async def load_sites(site_ids: Iterable[int]) -> Dict[int, dict]:
+    """
+    Загружает описания сайтов одним запросом.
+
+    :param site_ids: Идентификаторы сайтов.
+    :return: Словарь {идентификатор сайта: {"folder_name": ..., "pages": [...], "version": хэш site_json}}.
+    """
+
+    rows = await load_related("sites", "idsites", site_ids, "idsites", "folder_name", "site_json")
+    sites = {}
+    for site_id, found in rows.items():
+        if not found:
+            continue
+        site_json = found[0]['site_json']
+        if isinstance(site_json, (bytes, bytearray, str)):
+            raw = _encode(site_json)
+            site_json = json.loads(raw)
+        else:
+            raw = json.dumps(site_json, sort_keys=True).encode('utf-8')
+        sites[site_id] = {
+            'folder_name': found[0]['folder_name'],
+            'pages': site_json.get('pages', []),
+            'version': hashlib.sha256(raw).hexdigest()[:16],
+        }
+    return sites
+
+
+async def load_blocks(block_ids: Iterable[int]) -> Dict[int, tuple]:
+    """
+    Загружает содержимое блоков одним запросом. Если у блока есть ссылка на хранилище
+    содержимого (asset_html, asset_css, asset_js), содержимое читается оттуда через mmap.
+
+    :param block_ids: Идентификаторы блоков.
+    :return: Словарь {идентификатор блока: (block_html, block_css, block_js)}.
+    """
+
+    rows = await load_related("blocks", "idblocks", block_ids, "idblocks", "block_html", "block_css", "block_js",
+                              *BLOCK_ASSET_COLUMNS)
+    store = get_asset_store()
+    blocks = {}
+    for block_id, found in rows.items():
+        if not found:
+            continue
+        row = found[0]
+        blocks[block_id] = tuple(
+            store.read(row[asset]) if row.get(asset) else row[column]
+            for column, asset in zip(("block_html", "block_css", "block_js"), BLOCK_ASSET_COLUMNS)
+        )
+    return blocks
+
+
+class PageCompiler:
+    """
+    Кэш скомпилированных сайтов по ключу (идентификатор сайта, версия). Версия по умолчанию -
+    хэш site_json; после изменения блоков сайты, которые их используют, сбрасываются через
+    invalidate_blocks. Одновременные промахи по одному сайту ждут одну загрузку, в том числе
+    из разных потоков и циклов событий (WSGI-сервер выполняет каждый запрос в своем asyncio.run).
+    """
+
+    def __init__(self, max_sites: int = 256):
+        """
+        Конструктор класса PageCompiler.
+
+        :param max_sites: Число скомпилированных сайтов в кэше.
+        """
+        self.max_sites = max_sites
+        self._sites: OrderedDict = OrderedDict()
+        # идентификатор сайта -> текущая версия
+        self._current: Dict[int, str] = {}
+        # идентификатор блока -> множество идентификаторов сайтов
+        self._dependents: Dict[int, Set[int]] = {}
+        self._loading: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        # Увеличивается при каждой инвалидации: сайт, который загружался во время инвалидации,
+        # мог быть собран по старым данным и в кэш не кладется
+        self._generation = 0
+
+    def get_compiled(self, site_id: int, version: str = None) -> Optional[Dict[str, CompiledPage]]:
+        """
+        Возвращает скомпилированный сайт из кэша.
+
+        :param site_id: Идентификатор сайта.
+        :param version: Версия сайта (по умолчанию текущая).
+        :return: Словарь {путь страницы: CompiledPage} или None.
+        """
+        with self._lock:
+            key = (site_id, version or self._current.get(site_id))
+            compiled = self._sites.get(key)
+            if compiled is not None:
+                self._sites.move_to_end(key)
+            return compiled
+
+    def put(self, site_id: int, version: str, pages: Dict[str, CompiledPage], generation: int = None) -> bool:
+        """
+        Кладет скомпилированный сайт в кэш и делает версию текущей.
+
+        :param generation: Значение счетчика инвалидаций на начало загрузки; если с тех пор кэш
+            сбрасывался, сайт не кладется.
+        :return: True, если сайт положен в кэш.
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._sites[(site_id, version)] = pages
+            self._sites.move_to_end((site_id, version))
+            self._current[site_id] = version
+            for page in pages.values():
+                for block_id in page.block_ids:
+                    self._dependents.setdefault(block_id, set()).add(site_id)
+            while len(self._sites) > self.max_sites:
+                (evicted_id, evicted_version), _ = self._sites.popitem(last=False)
+                if self._current.get(evicted_id) == evicted_version:
+                    del self._current[evicted_id]
+            return True
+
+    def invalidate_site(self, site_id: int):
+        """
+        Удаляет из кэша все версии сайта.
+
+        :return: Ничего не возвращает.
+        """
+        with self._lock:
+            self._generation += 1
+            self._current.pop(site_id, None)
+            # Новые запросы не должны ждать загрузку, начатую до изменения
+            self._loading.pop(site_id, None)
+            for key in [key for key in self._sites if key[0] == site_id]:
+                del self._sites[key]
+
+    def invalidate_blocks(self, block_ids: Iterable[int]):
+        """
+        Удаляет из кэша сайты, которые используют блоки.
+
+        :return: Ничего не возвращает.
+        """
+        site_ids = set()
+        with self._lock:
+            # Блоки сайтов, которые сейчас загружаются, еще не известны: такие загрузки тоже устаревают
+            self._generation += 1
+            self._loading.clear()
+            for block_id in block_ids:
+                site_ids |= self._dependents.pop(int(block_id), set())
+        for site_id in site_ids:
+            self.invalidate_site(site_id)
+
+    async def get_site(self, site_id: int, version: str = None) -> Optional[Dict[str, CompiledPage]]:
+        """
+        Возвращает скомпилированный сайт, при промахе загружает его из базы данных и компилирует.
+
+        :param site_id: Идентификатор сайта.
+        :param version: Ожидаемая версия (по умолчанию текущая).
+        :return: Словарь {путь страницы: CompiledPage} или None, если сайт не найден.
+        """
+        compiled = self.get_compiled(site_id, version)
+        if compiled is not None:
+            return compiled
+
+        with self._lock:
+            loading = self._loading.get(site_id)
+            leader = loading is None
+            if leader:
+                loading = self._loading[site_id] = Future()
+                generation = self._generation
+
+        if not leader:
+            # shield: отмена ожидающего запроса не должна отменять общую загрузку
+            return await asyncio.shield(asyncio.wrap_future(loading))
+
+        try:
+            compiled = await self._load(site_id, generation)
+            loading.set_result(compiled)
+            return compiled
+        except asyncio.CancelledError:
+            loading.cancel()
+            raise
+        except Exception as err:
+            loading.set_exception(err)
+            raise
+        finally:
+            with self._lock:
+                if self._loading.get(site_id) is loading:
+                    del self._loading[site_id]
+
+    async def _load(self, site_id: int, generation: int) -> Optional[Dict[str, CompiledPage]]:
+        site = (await load_sites([site_id])).get(site_id)
+        if site is None:
+            return None
+        blocks = await load_blocks(set().union(*[page_blocks(page) for page in site['pages']]))
+        compiled = {page['path']: compile_page(page, blocks) for page in site['pages']}
+        self.put(site_id, site['version'], compiled, generation)
+        return compiled
+
+    async def render(self, site_id: int, path: str, context: dict = None, version: str = None) -> Optional[bytes]:
+        """
+        Рендерит страницу сайта: поиск в кэше и подстановка переменных.
+
+        :param site_id: Идентификатор сайта.
+        :param path: Путь страницы из site_json.
+        :param context: Словарь значений переменных.
+        :param version: Версия сайта (по умолчанию текущая).
+        :return: HTML-документ в байтах или None, если страница не найдена.
+        """
+        compiled = await self.get_site(site_id, version)
+        page = compiled.get(path) if compiled is not None else None
+        return page.render(context) if page is not None else None
+
+
+_compiler = None
+
+
+def configure_page_compiler(settings: dict) -> PageCompiler:
+    """
+    Создает кэш скомпилированных страниц по настройкам сервера.
+
+    :param settings: Словарь с настройками сервера. Используется ключ PAGE_CACHE_SITES
+        (число скомпилированных сайтов в кэше, по умолчанию 256).
+    :return: Созданный кэш.
+    """
+
+    global _compiler
+
+    _compiler = PageCompiler(settings.get('PAGE_CACHE_SITES', 256))
+    return _compiler
+
+
+def get_page_compiler() -> PageCompiler:
+    """
+    Возвращает кэш скомпилированных страниц по умолчанию, создавая его, если он не настроен.
+
+    :return: Кэш скомпилированных страниц.
+    """
+
+    if _compiler is None:
+        configure_page_compiler({})
+    return _compiler
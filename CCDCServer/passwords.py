@@ -0,0 +1,201 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+ALGORITHM = 'scrypt'
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + '=' * (-len(data) % 4))
+
+
+def _scrypt(password: bytes, salt: bytes, n: int, r: int, p: int, dklen: int) -> bytes:
+    """
+    Вычисляет scrypt. Выполняется в процессе из пула хэширования.
+    """
+
+    # Память scrypt - 128 * n * r * p байт; значение по умолчанию maxmem (32 МБ) мало для больших n
+    maxmem = 128 * n * r * (p + 2) + 1024 * 1024
+    return hashlib.scrypt(password, salt=salt, n=n, r=r, p=p, dklen=dklen, maxmem=maxmem)
+
+
+class PasswordHasher:
+    """
+    Хэширование паролей scrypt (hashlib) в ограниченном пуле процессов: вычисление хэша занимает
+    десятки миллисекунд процессорного времени, поэтому не выполняется в потоке запроса и не держит GIL.
+    Одновременно выполняется не больше max_workers хэширований, остальные ждут в очереди пула
+    по порядку поступления, поэтому всплеск входов не отнимает процессор у обработки запросов.
+    Пул создается вместе с объектом и запускает процессы через forkserver (или spawn), а не fork:
+    при первом входе у сервера уже есть потоки, и fork мог бы скопировать захваченные ими блокировки.
+
+    Хэш хранится строкой "scrypt$n$r$p$соль$хэш" (соль и хэш в base64), поэтому параметры можно менять:
+    старые хэши проверяются со своими параметрами, а needs_rehash сообщает, что хэш пора пересчитать.
+    """
+
+    def __init__(self, n: int = 2 ** 14, r: int = 8, p: int = 1, dklen: int = 64, salt_size: int = 16,
+                 max_workers: int = None):
+        """
+        Конструктор класса PasswordHasher.
+
+        :param n: Параметр стоимости scrypt (степень двойки).
+        :param r: Размер блока scrypt.
+        :param p: Параметр параллельности scrypt.
+        :param dklen: Длина хэша в байтах.
+        :param salt_size: Длина соли в байтах.
+        :param max_workers: Число процессов пула (по умолчанию половина процессоров, чтобы хэширование
+            не занимало все ядра).
+        """
+        if n < 2 or n & (n - 1):
+            raise ValueError("Параметр n должен быть степенью двойки")
+        self.n = n
+        self.r = r
+        self.p = p
+        self.dklen = dklen
+        self.salt_size = salt_size
+        self.max_workers = max_workers or max((os.cpu_count() or 1) // 2, 1)
+        self._lock = threading.Lock()
+        self._executor = self._create_executor()
+        # Хэш для dummy_verify: проверка стоит столько же, сколько настоящая, а хэш со случайными
+        # солью и значением не совпадет ни с одним паролем
+        self._dummy = f'{ALGORITHM}${n}${r}${p}${_b64encode(os.urandom(salt_size))}${_b64encode(os.urandom(dklen))}'
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Пул пересоздается, если объект используется после shutdown
+            with self._lock:
+                if self._executor is None:
+                    self._executor = self._create_executor()
+        return self._executor
+
+    def shutdown(self):
+        """
+        Останавливает пул процессов хэширования.
+
+        :return: Ничего не возвращает.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def _run(self, password: str, salt: bytes, n: int, r: int, p: int, dklen: int) -> bytes:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._get_executor(), _scrypt, password.encode('utf-8'), salt, n, r, p, dklen
+        )
+
+    async def hash(self, password: str) -> str:
+        """
+        Хэширует пароль с текущими параметрами.
+
+        :param password: Пароль.
+        :return: Строка "scrypt$n$r$p$соль$хэш".
+        """
+        salt = os.urandom(self.salt_size)
+        derived = await self._run(password, salt, self.n, self.r, self.p, self.dklen)
+        return f'{ALGORITHM}${self.n}${self.r}${self.p}${_b64encode(salt)}${_b64encode(derived)}'
+
+    async def verify(self, password: str, encoded: Optional[str]) -> bool:
+        """
+        Проверяет пароль. Пароли, сохраненные до перехода на scrypt открытым текстом, сравниваются
+        напрямую (needs_rehash для них возвращает True). Поврежденный хэш (некорректные параметры
+        или base64) считается несовпадением.
+
+        :param password: Пароль.
+        :param encoded: Сохраненный хэш (или открытый пароль старого формата).
+        :return: True, если пароль верный.
+        """
+        if not encoded:
+            return False
+        parts = encoded.split('$')
+        if parts[0] != ALGORITHM:
+            return hmac.compare_digest(password.encode('utf-8'), encoded.encode('utf-8'))
+        try:
+            n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+            salt, expected = _b64decode(parts[4]), _b64decode(parts[5])
+            if n < 2 or n & (n - 1) or r < 1 or p < 1 or not expected:
+                return False
+            derived = await self._run(password, salt, n, r, p, len(expected))
+        except (IndexError, ValueError):
+            # binascii.Error - подкласс ValueError; ValueError бросает и hashlib.scrypt
+            return False
+        return hmac.compare_digest(derived, expected)
+
+    async def dummy_verify(self, password: str):
+        """
+        Выполняет проверку с той же стоимостью, что и настоящая. Вызывается, если пользователь не найден,
+        чтобы время ответа не выдавало, существует ли логин.
+
+        :param password: Пароль.
+        :return: Ничего не возвращает.
+        """
+        await self.verify(password, self._dummy)
+
+    def needs_rehash(self, encoded: Optional[str]) -> bool:
+        """
+        Проверяет, нужно ли пересчитать хэш: он сохранен в старом формате или с другими параметрами.
+
+        :param encoded: Сохраненный хэш.
+        :return: True, если хэш нужно пересчитать.
+        """
+        if not encoded:
+            return True
+        parts = encoded.split('$')
+        if parts[0] != ALGORITHM or len(parts) != 6:
+            return True
+        try:
+            return (int(parts[1]), int(parts[2]), int(parts[3]), len(_b64decode(parts[5]))) != \
+                (self.n, self.r, self.p, self.dklen)
+        except ValueError:
+            return True
+
+
+_hasher = None
+
+
+def configure_password_hasher(settings: dict) -> PasswordHasher:
+    """
+    Создает объект хэширования паролей по настройкам сервера.
+
+    :param settings: Словарь с настройками сервера. Используются ключи PASSWORD_SCRYPT_N (по умолчанию 2 ** 14),
+        PASSWORD_SCRYPT_R (8), PASSWORD_SCRYPT_P (1) и PASSWORD_WORKERS (число процессов пула,
+        по умолчанию половина процессоров).
+    :return: Созданный объект.
+    """
+
+    global _hasher
+
+    if _hasher is not None:
+        _hasher.shutdown()
+    _hasher = PasswordHasher(
+        n=settings.get('PASSWORD_SCRYPT_N', 2 ** 14),
+        r=settings.get('PASSWORD_SCRYPT_R', 8),
+        p=settings.get('PASSWORD_SCRYPT_P', 1),
+        max_workers=settings.get('PASSWORD_WORKERS'),
+    )
+    return _hasher
+
+
+def get_password_hasher() -> PasswordHasher:
+    """
+    Возвращает объект хэширования паролей, создавая его с настройками по умолчанию, если он не настроен.
+
+    :return: Объект PasswordHasher.
+    """
+
+    if _hasher is None:
+        configure_password_hasher({})
+    return _hasher
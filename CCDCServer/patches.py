@@ -0,0 +1,294 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Hashable, List, Optional, Tuple
+from CCDCServer.exceptions import Conflict
+from CCDCServer.pages import get_page_compiler
+from CCDCSQLQueryBuilder.update import UpdateQuery
+from CCDCSQLQueryBuilder.execute import execute_batch_sync
+
+
+class _PendingPatch:
+    """
+    Операции одного клиента, объединяемые в один UPDATE, и результат их записи
+    (новая версия сайта, None при ошибке базы данных или исключение).
+    """
+    __slots__ = ('key', 'chain', 'version', 'operations', 'previous', 'result', 'timer')
+
+    def __init__(self, key: tuple, chain: '_Chain', version: int, previous: '_PendingPatch' = None):
+        self.key = key
+        self.chain = chain
+        self.version = version
+        self.operations = []
+        # Предыдущая запись того же клиента: патч составлен поверх нее, поэтому записывается
+        # только после нее и только если она удалась
+        self.previous = previous
+        self.result = Future()
+        self.timer = None
+
+
+class _Chain:
+    """
+    Записи одного клиента в один сайт. versions - версии, к которым клиент мог составить патч,
+    не дождавшись ответов на свои предыдущие патчи: начальная версия и версии, которые записывает
+    или уже записал этот объект. head - версия, от которой строится следующая запись.
+    """
+    __slots__ = ('versions', 'head', 'pending', 'tail', 'updated')
+
+    def __init__(self, version: int):
+        self.versions = {version}
+        self.head = version
+        self.pending = None
+        self.tail = None
+        self.updated = time.monotonic()
+
+
+class SitePatcher:
+    """
+    Частичное изменение sites.site_json операциями JSON Patch (RFC 6902) с оптимистичной блокировкой
+    по колонке sites.version:
+
+        version = await get_site_patcher().patch(site_id, version, [
+            {"op": "replace", "path": "/pages/0/title", "value": "Главная"},
+        ], client=editor_id)
+
+    Патчи одного клиента, пришедшие в течение delay секунд, объединяются в один UPDATE. Клиент может
+    отправлять патчи, не дожидаясь ответов: патч, составленный к версии, которую записывает (или недавно
+    записал) этот объект для того же клиента, переносится на последнюю запись клиента. Если сайт изменен
+    другим клиентом (версия не совпала или не прошла операция test), вызовы получают исключение Conflict;
+    его получают и все следующие патчи клиента, составленные поверх неудавшейся записи.
+
+    Состояние не привязано к циклу событий: WSGI-сервер выполняет каждый запрос в своем asyncio.run,
+    поэтому окно объединения отсчитывается таймером, а UPDATE выполняется в пуле потоков.
+    """
+
+    def __init__(self, delay: float = 0.05, max_operations: int = 200, rebase_window: float = 10.0,
+                 max_workers: int = 4):
+        """
+        Конструктор класса SitePatcher.
+
+        :param delay: Окно объединения патчей в секундах (0 - записывать сразу).
+        :param max_operations: Максимальное число операций в одном UPDATE; при достижении
+            накопленные операции записываются, не дожидаясь окончания окна.
+        :param rebase_window: Время в секундах после последней записи клиента, в течение которого его патчи
+            к версиям этой и предыдущих записей переносятся на последнюю запись.
+        :param max_workers: Число потоков, в которых выполняются UPDATE.
+        """
+        self.delay = delay
+        self.max_operations = max_operations
+        self.rebase_window = rebase_window
+        self._chains: Dict[Tuple[int, Hashable], _Chain] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ccdc-patch")
+        self._pruned = time.monotonic()
+
+    async def patch(self, site_id: int, version: int, operations: List[dict],
+                    client: Hashable = None) -> Optional[int]:
+        """
+        Применяет патч к site_json сайта.
+
+        :param site_id: Идентификатор сайта.
+        :param version: Версия сайта, к которой составлен патч.
+        :param operations: Операции JSON Patch.
+        :param client: Ключ экземпляра редактора (например, идентификатор сессии и вкладки): объединяются
+            и переносятся на предыдущие записи только патчи одного клиента, чтобы не пропустить конфликт
+            между разными клиентами.
+        :return: Новая версия сайта или None при ошибке базы данных.
+        :raises Conflict: Если версия сайта изменилась или не прошла операция test.
+        :raises ValueError: Если операции некорректны.
+        """
+
+        # Патч с test проверяет документ до применения, поэтому не объединяется с предыдущими операциями
+        has_test = any(operation.get("op") == "test" for operation in operations)
+        # Проверка операций до постановки в очередь: ошибка не должна затронуть другие патчи
+        UpdateQuery("sites", {}, json_patch={"site_json": operations})
+
+        key = (site_id, client)
+        closed = []
+        with self._lock:
+            self._prune()
+            chain = self._chains.get(key)
+            if chain is None or version not in chain.versions or self._expired(chain):
+                # Патч не опирается на записи этого клиента: новая цепочка от версии патча
+                if chain is not None and chain.pending is not None:
+                    closed.append(self._close(chain))
+                chain = self._chains[key] = _Chain(version)
+
+            pending = chain.pending
+            if pending is not None and (has_test or len(pending.operations) + len(operations) > self.max_operations):
+                closed.append(self._close(chain))
+                pending = None
+            if pending is None:
+                pending = chain.pending = _PendingPatch(key, chain, chain.head, chain.tail)
+                if self.delay > 0:
+                    pending.timer = threading.Timer(self.delay, self._on_timer, (key, pending))
+                    pending.timer.daemon = True
+                    pending.timer.start()
+
+            pending.operations += operations
+            if self.delay <= 0 or len(pending.operations) >= self.max_operations:
+                closed.append(self._close(chain))
+
+        for batch in closed:
+            self._submit(batch)
+        # shield: отмена одного вызова не должна отменять общий результат записи
+        return await asyncio.shield(asyncio.wrap_future(pending.result))
+
+    def _expired(self, chain: _Chain) -> bool:
+        return chain.pending is None and (chain.tail is None or chain.tail.result.done()) and \
+            time.monotonic() - chain.updated > self.rebase_window
+
+    def _prune(self):
+        """
+        Удаляет цепочки клиентов, которые не писали дольше rebase_window. Вызывается под блокировкой.
+        """
+        now = time.monotonic()
+        if now - self._pruned < self.rebase_window:
+            return
+        self._pruned = now
+        for key in [key for key, chain in self._chains.items() if self._expired(chain)]:
+            del self._chains[key]
+
+    def _close(self, chain: _Chain) -> _PendingPatch:
+        """
+        Закрывает накопленный патч цепочки для записи: следующие патчи клиента строятся от версии,
+        которую он запишет. Вызывается под блокировкой.
+
+        :return: Закрытый патч.
+        """
+        pending = chain.pending
+        chain.pending = None
+        if pending.timer is not None:
+            pending.timer.cancel()
+        chain.tail = pending
+        chain.head = pending.version + 1
+        chain.versions.add(chain.head)
+        chain.updated = time.monotonic()
+        return pending
+
+    def _on_timer(self, key: tuple, pending: _PendingPatch):
+        with self._lock:
+            chain = self._chains.get(key)
+            if chain is None or chain.pending is not pending:
+                return
+            self._close(chain)
+        self._submit(pending)
+
+    def _submit(self, pending: _PendingPatch):
+        """
+        Ставит запись патча в пул потоков после завершения предыдущей записи клиента.
+        """
+        previous = pending.previous
+        if previous is None:
+            self._executor.submit(self._write, pending)
+        else:
+            previous.result.add_done_callback(lambda _: self._executor.submit(self._write, pending))
+
+    def _write(self, pending: _PendingPatch):
+        """
+        Записывает накопленные операции одним UPDATE и сообщает результат ожидающим вызовам.
+        Блокирующая функция, выполняется в пуле потоков.
+        """
+
+        previous, pending.previous = pending.previous, None
+        if previous is not None and (previous.result.exception() is not None or previous.result.result() is None):
+            # Патч составлен поверх записи, которая не удалась
+            self._finish(pending, error=Conflict())
+            return
+
+        site_id = pending.key[0]
+        try:
+            update_query = UpdateQuery(
+                "sites", {},
+                json_patch={"site_json": pending.operations},
+                expressions=[("version", "version + 1", [])],
+                conditions=["idsites = %s", "version = %s"],
+                params=[site_id, pending.version],
+            )
+            rowcount = execute_batch_sync([update_query.build_query()])
+        except Exception as err:
+            self._finish(pending, error=err)
+            return
+
+        if rowcount:
+            get_page_compiler().invalidate_site(site_id)
+            self._finish(pending, version=pending.version + 1)
+        else:
+            self._finish(pending, error=Conflict() if rowcount == 0 else None)
+
+    def _finish(self, pending: _PendingPatch, version: int = None, error: Exception = None):
+        """
+        Сообщает результат записи. Если запись не удалась, цепочка клиента сбрасывается: версий,
+        которые она должна была записать, нет, и следующий патч клиента начинает новую цепочку.
+        Патч, который уже накапливается поверх неудавшейся записи, закрывается и получает Conflict.
+
+        :param pending: Записанный патч.
+        :param version: Новая версия сайта, если запись удалась.
+        :param error: Исключение для ожидающих вызовов (None вместе с version=None - ошибка базы данных).
+        """
+        closed = None
+        if version is None:
+            with self._lock:
+                if self._chains.get(pending.key) is pending.chain:
+                    if pending.chain.pending is not None:
+                        closed = self._close(pending.chain)
+                    del self._chains[pending.key]
+        if error is not None:
+            pending.result.set_exception(error)
+        else:
+            pending.result.set_result(version)
+        if closed is not None:
+            self._submit(closed)
+
+    async def flush(self):
+        """
+        Записывает все накопленные патчи, не дожидаясь окончания окна объединения
+        (например, при остановке сервера), и ждет завершения записей.
+
+        :return: Ничего не возвращает.
+        """
+
+        with self._lock:
+            closed = [self._close(chain) for chain in self._chains.values() if chain.pending is not None]
+            results = [chain.tail.result for chain in self._chains.values() if chain.tail is not None]
+        for batch in closed:
+            self._submit(batch)
+        if results:
+            await asyncio.gather(*map(asyncio.wrap_future, results), return_exceptions=True)
+
+
+_patcher = None
+
+
+def configure_site_patcher(settings: dict) -> SitePatcher:
+    """
+    Создает объект для частичного изменения site_json по настройкам сервера.
+
+    :param settings: Словарь с настройками сервера. Используются ключи SITE_PATCH_DELAY (окно
+        объединения патчей в секундах, по умолчанию 0.05), SITE_PATCH_MAX_OPERATIONS
+        (максимальное число операций в одном UPDATE, по умолчанию 200) и SITE_PATCH_REBASE_WINDOW
+        (время в секундах, в течение которого патчи клиента переносятся на его последнюю запись, по умолчанию 10).
+    :return: Созданный объект.
+    """
+
+    global _patcher
+
+    _patcher = SitePatcher(
+        delay=settings.get('SITE_PATCH_DELAY', 0.05),
+        max_operations=settings.get('SITE_PATCH_MAX_OPERATIONS', 200),
+        rebase_window=settings.get('SITE_PATCH_REBASE_WINDOW', 10.0),
+    )
+    return _patcher
+
+
+def get_site_patcher() -> SitePatcher:
+    """
+    Возвращает объект для частичного изменения site_json, создавая его, если он не настроен.
+
+    :return: Объект SitePatcher.
+    """
+
+    if _patcher is None:
+        configure_site_patcher({})
+    return _patcher
@@ -0,0 +1,321 @@
+"""
+Публикация сайтов в статические HTML-файлы. Формат site_json описан в CCDCServer.pages.
+
+Опубликованные страницы лежат в PUBLISH_DIR/<folder_name>/<path> и отдаются как обычные
+статические файлы, без запросов к базе данных и шаблонов. Граф зависимостей хранится рядом,
+в файле PUBLISH_DIR.manifest.json, чтобы не отдаваться вместе со страницами.
+"""
+
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, List, Set
+from CCDCServer.assets import atomic_write
+from CCDCServer.pages import page_blocks, render_page, load_sites, load_blocks, get_page_compiler
+
+
+def _publish_page(path: str, page: dict, blocks: Dict[int, tuple]) -> int:
+    """
+    Рендерит страницу и записывает ее на диск. Выполняется в процессе из пула публикации.
+
+    :return: Размер записанного файла в байтах.
+    """
+
+    data = render_page(page, blocks)
+    atomic_write(path, data)
+    return len(data)
+
+
+class SitePublisher:
+    """
+    Инкрементальная публикация сайтов. Публикатор хранит граф зависимостей "страница - блоки"
+    и хэш входных данных каждой страницы в файле манифеста, поэтому:
+
+    - publish_site перерисовывает только страницы, у которых изменилось описание или блоки;
+    - publish_blocks после изменения блоков перерисовывает только страницы, которые их используют.
+
+    Рендеринг выполняется в пуле процессов, файлы записываются атомарно. Процессы пула запускаются
+    через forkserver (или spawn), а не fork: к моменту первой публикации у сервера уже есть потоки
+    пулов базы данных и записи патчей, и fork мог бы скопировать захваченные ими блокировки.
+    """
+
+    def __init__(self, output_dir: str, max_workers: int = None, manifest_path: str = None):
+        """
+        Конструктор класса SitePublisher.
+
+        :param output_dir: Папка с опубликованными сайтами.
+        :param max_workers: Число процессов рендеринга (по умолчанию число процессоров).
+        :param manifest_path: Файл с графом зависимостей (по умолчанию <output_dir>.manifest.json).
+        """
+
+        self.output_dir = os.path.realpath(output_dir)
+        self.manifest_path = manifest_path or self.output_dir + '.manifest.json'
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        # Завершение последней публикации в очереди (см. _exclusive)
+        self._tail = None
+        # "site_id/path" -> {"site": id, "path": путь страницы, "file": путь файла, "blocks": [...], "digest": ...}
+        self._pages = self._load_manifest()
+        # идентификатор блока -> множество ключей страниц
+        self._dependents: Dict[int, Set[str]] = {}
+        for key, entry in self._pages.items():
+            for block_id in entry['blocks']:
+                self._dependents.setdefault(block_id, set()).add(key)
+
+    def _load_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as file:
+                return json.load(file).get('pages', {})
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self):
+        data = json.dumps({'pages': self._pages}, ensure_ascii=False).encode('utf-8')
+        atomic_write(self.manifest_path, data)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    methods = multiprocessing.get_all_start_methods()
+                    context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+        return self._executor
+
+    @asynccontextmanager
+    async def _exclusive(self):
+        """
+        Выполняет публикации по очереди. Очередь не привязана к циклу событий: WSGI-сервер выполняет
+        каждый запрос в своем asyncio.run, поэтому публикация ждет завершения предыдущей через
+        concurrent.futures.Future. Отмененный вызов освобождает очередь только после предыдущей публикации.
+        """
+
+        done = Future()
+        with self._lock:
+            previous, self._tail = self._tail, done
+        try:
+            if previous is not None:
+                # shield: отмена ожидания не должна отменять Future предыдущей публикации
+                await asyncio.shield(asyncio.wrap_future(previous))
+            yield
+        finally:
+            if previous is None or previous.done():
+                done.set_result(None)
+            else:
+                previous.add_done_callback(lambda _: done.set_result(None))
+
+    def shutdown(self):
+        """
+        Останавливает пул процессов рендеринга.
+
+        :return: Ничего не возвращает.
+        """
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def is_published(self, site_id: int) -> bool:
+        """
+        Проверяет, опубликована ли хотя бы одна страница сайта.
+
+        :param site_id: Идентификатор сайта.
+        :return: True, если сайт есть в манифесте.
+        """
+
+        return any(entry['site'] == site_id for entry in list(self._pages.values()))
+
+    def pages_for_blocks(self, block_ids: Iterable[int]) -> Set[str]:
+        """
+        Возвращает ключи опубликованных страниц, которые используют блоки.
+
+        :param block_ids: Идентификаторы блоков.
+        :return: Множество ключей "site_id/path".
+        """
+
+        keys = set()
+        for block_id in block_ids:
+            keys |= self._dependents.get(int(block_id), set())
+        return keys
+
+    def _output_path(self, folder_name: str, page_path: str) -> str:
+        """
+        Строит путь файла страницы. Пути, выходящие за пределы папки публикации, запрещены.
+
+        :raises ValueError: Если путь выходит за пределы папки публикации.
+        """
+
+        path = os.path.realpath(os.path.join(self.output_dir, folder_name, page_path.lstrip('/')))
+        site_root = os.path.realpath(os.path.join(self.output_dir, folder_name))
+        if not site_root.startswith(self.output_dir + os.sep) or not path.startswith(site_root + os.sep):
+            raise ValueError(f"Некорректный путь страницы: {folder_name}/{page_path}")
+        return path
+
+    @staticmethod
+    def _digest(page: dict, block_ids: Iterable[int], blocks: Dict[int, tuple]) -> str:
+        digest = hashlib.sha256(json.dumps(page, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        for block_id in sorted(block_ids):
+            digest.update(f'\x00{block_id}\x00'.encode('ascii'))
+            for part in blocks.get(block_id, (None, None, None)):
+                data = part if isinstance(part, (bytes, bytearray, memoryview)) else str(part or '').encode('utf-8')
+                digest.update(hashlib.sha256(data).digest())
+        return digest.hexdigest()
+
+    async def publish_site(self, site_id: int, force: bool = False) -> List[str]:
+        """
+        Публикует сайт: перерисовывает измененные страницы и удаляет страницы, которых больше нет в site_json.
+        Скомпилированные страницы сайта сбрасываются.
+
+        :param site_id: Идентификатор сайта.
+        :param force: Перерисовать все страницы, даже если входные данные не изменились.
+        :return: Список путей перерисованных файлов.
+        """
+
+        get_page_compiler().invalidate_site(site_id)
+        async with self._exclusive():
+            sites = await load_sites([site_id])
+            if site_id not in sites:
+                return []
+            site = sites[site_id]
+            pages = {page['path']: page for page in site['pages']}
+            published = await self._render(site_id, site['folder_name'], list(pages.values()), force)
+
+            for key in [key for key, entry in self._pages.items()
+                        if entry['site'] == site_id and entry['path'] not in pages]:
+                self._forget(key, remove_file=True)
+            self._save_manifest()
+            return published
+
+    async def publish_blocks(self, block_ids: Iterable[int]) -> List[str]:
+        """
+        Перепубликует страницы, которые используют измененные блоки. Вызывается после изменения
+        или удаления блоков; скомпилированные страницы с этими блоками сбрасываются.
+
+        :param block_ids: Идентификаторы измененных блоков.
+        :return: Список путей перерисованных файлов.
+        """
+
+        block_ids = list(block_ids)
+        get_page_compiler().invalidate_blocks(block_ids)
+        async with self._exclusive():
+            keys = self.pages_for_blocks(block_ids)
+            if not keys:
+                return []
+            by_site: Dict[int, Set[str]] = {}
+            for key in keys:
+                by_site.setdefault(self._pages[key]['site'], set()).add(self._pages[key]['path'])
+
+            sites = await load_sites(by_site)
+            published = []
+            for site_id, paths in by_site.items():
+                site = sites.get(site_id)
+                if site is None:
+                    continue
+                pages = [page for page in site['pages'] if page['path'] in paths]
+                published += await self._render(site_id, site['folder_name'], pages, force=False)
+            self._save_manifest()
+            return published
+
+    async def _render(self, site_id: int, folder_name: str, pages: List[dict], force: bool) -> List[str]:
+        """
+        Рендерит страницы сайта в пуле процессов. Страницы, входные данные которых не изменились
+        с прошлой публикации, пропускаются.
+
+        :return: Список путей перерисованных файлов.
+        """
+
+        page_block_ids = {page['path']: page_blocks(page) for page in pages}
+        blocks = await load_blocks(set().union(*page_block_ids.values()))
+
+        loop = asyncio.get_running_loop()
+        tasks, entries = [], []
+        for page in pages:
+            key = f"{site_id}/{page['path']}"
+            block_ids = page_block_ids[page['path']]
+            path = self._output_path(folder_name, page['path'])
+            digest = self._digest(page, block_ids, blocks)
+            previous = self._pages.get(key)
+            if not force and previous is not None and previous['digest'] == digest \
+                    and previous['file'] == path and os.path.isfile(path):
+                continue
+            # memoryview над mmap из хранилища содержимого нельзя передать в другой процесс
+            page_blocks_data = {block_id: tuple(bytes(part) if isinstance(part, memoryview) else part
+                                                for part in blocks[block_id])
+                                for block_id in block_ids if block_id in blocks}
+            tasks.append(loop.run_in_executor(self._get_executor(), _publish_page, path, page, page_blocks_data))
+            entries.append((key, {'site': site_id, 'path': page['path'], 'file': path,
+                                  'blocks': sorted(block_ids), 'digest': digest}))
+
+        published = []
+        for (key, entry), result in zip(entries, await asyncio.gather(*tasks, return_exceptions=True)):
+            if isinstance(result, BaseException):
+                print(f"Ошибка публикации страницы {key}: {result}")
+                continue
+            previous = self._pages.get(key)
+            self._forget(key, remove_file=previous is not None and previous['file'] != entry['file'])
+            self._pages[key] = entry
+            for block_id in entry['blocks']:
+                self._dependents.setdefault(block_id, set()).add(key)
+            published.append(entry['file'])
+        return published
+
+    def _forget(self, key: str, remove_file: bool):
+        """
+        Удаляет страницу из графа зависимостей и, при необходимости, ее файл.
+        """
+
+        entry = self._pages.pop(key, None)
+        if entry is None:
+            return
+        for block_id in entry['blocks']:
+            dependents = self._dependents.get(block_id)
+            if dependents is not None:
+                dependents.discard(key)
+                if not dependents:
+                    del self._dependents[block_id]
+        if remove_file:
+            try:
+                os.unlink(entry['file'])
+            except OSError:
+                pass
+
+
+_publisher = None
+
+
+def configure_publisher(settings: dict) -> SitePublisher:
+    """
+    Создает публикатор сайтов по настройкам сервера и делает его публикатором по умолчанию.
+
+    :param settings: Словарь с настройками сервера. Используются ключи PUBLISH_DIR (папка
+        с опубликованными сайтами) и PUBLISH_WORKERS (число процессов рендеринга).
+    :return: Созданный публикатор.
+    """
+
+    global _publisher
+
+    if _publisher is not None:
+        _publisher.shutdown()
+    _publisher = SitePublisher(
+        settings.get('PUBLISH_DIR', os.path.join(settings.get('BASE_DIR', ''), 'published')),
+        max_workers=settings.get('PUBLISH_WORKERS'),
+    )
+    return _publisher
+
+
+def get_publisher() -> SitePublisher:
+    """
+    Возвращает публикатор сайтов по умолчанию, создавая его с настройками по умолчанию, если он не настроен.
+
+    :return: Публикатор сайтов.
+    """
+
+    if _publisher is None:
+        configure_publisher({})
+    return _publisher
@@ -1,10 +1,73 @@
+from functools import cached_property
+from http.cookies import SimpleCookie, CookieError
 from urllib.parse import parse_qs
+from CCDCServer.exceptions import RequestEntityTooLarge
+from CCDCServer.multipart import MultipartParser, parse_header_params
+
+
+class LimitedStream:
+    """
+    Обертка над wsgi.input, которая не дает прочитать больше CONTENT_LENGTH байт.
+    Чтение за пределами тела запроса у некоторых WSGI-серверов блокируется до таймаута.
+    """
+    __slots__ = ("_stream", "remaining")
+
+    def __init__(self, stream, limit: int):
+        """
+        Конструктор класса LimitedStream.
+
+        :param stream: Исходный поток (wsgi.input)
+        :param limit: Число байт, которое разрешено прочитать
+        """
+
+        self._stream = stream
+        self.remaining = limit
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Читает не больше size байт (все оставшиеся, если size отрицательный).
+
+        :param size: Число байт
+        :return: Прочитанные байты
+        """
+
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self._stream.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def readline(self, size: int = -1) -> bytes:
+        """
+        Читает одну строку, не выходя за пределы тела запроса.
+
+        :param size: Максимальная длина строки
+        :return: Прочитанные байты
+        """
+
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self._stream.readline(size)
+        self.remaining -= len(data)
+        return data
+
+    def __iter__(self):
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            yield line
 
 
 class Request:
     """
     Класс Request предназначен для представления HTTP-запроса в веб-фреймворке и предоставляет методы для доступа
     к параметрам GET и POST, а также к другой информации о запросе и настройкам.
+    Параметры, тело, куки и заголовки разбираются лениво - при первом обращении - и кэшируются.
     """
 
     def __init__(self, environ: dict, settings: dict):
@@ -12,11 +75,9 @@ class Request:
         Конструктор класса Request, принимающий два аргумента.
 
         :param environ: Словарь, содержащий информацию о текущем запросе
-        :param settings: Словарь с настройками сервера
+        :param settings: Словарь с настройками сервера (MAX_BODY_SIZE - максимальный размер тела в байтах)
         """
 
-        self.build_get_params_dict(environ['QUERY_STRING'])
-        self.build_post_params_dict(environ['wsgi.input'].read())
         self.environ = environ
         self.settings = settings
         self.extra = {}
@@ -31,6 +92,116 @@ class Request:
 
         return self.extra.get(item)
 
+    @cached_property
+    def GET(self) -> dict:
+        """
+        Словарь параметров GET-запроса, разобранный из QUERY_STRING при первом обращении.
+        """
+
+        return parse_qs(self.environ.get('QUERY_STRING', ''))
+
+    @cached_property
+    def POST(self) -> dict:
+        """
+        Словарь параметров POST-запроса. Тело читается и разбирается при первом обращении,
+        только если оно передано в формате application/x-www-form-urlencoded или multipart/form-data
+        (в последнем случае файлы доступны через FILES).
+        """
+
+        content_type = self.environ.get('CONTENT_TYPE', '')
+        if content_type.startswith('multipart/form-data'):
+            return self._multipart[0]
+        if content_type and not content_type.startswith('application/x-www-form-urlencoded'):
+            return {}
+        return parse_qs(self.body.decode('utf-8', errors='replace'))
+
+    @cached_property
+    def FILES(self) -> dict:
+        """
+        Словарь загруженных файлов {имя поля: [UploadedFile]} из тела multipart/form-data.
+        """
+
+        if not self.environ.get('CONTENT_TYPE', '').startswith('multipart/form-data'):
+            return {}
+        return self._multipart[1]
+
+    @cached_property
+    def _multipart(self) -> tuple:
+        """
+        Результат потокового разбора тела multipart/form-data: кортеж (поля, файлы).
+        Тело читается из stream частями settings['MULTIPART_CHUNK_SIZE'], файлы больше
+        settings['MULTIPART_SPOOL_SIZE'] сбрасываются во временные файлы.
+        """
+
+        content_type = parse_header_params('content-type', self.environ['CONTENT_TYPE'])
+        parser = MultipartParser(
+            self.stream,
+            content_type.get_param('boundary', header='content-type'),
+            chunk_size=self.settings.get('MULTIPART_CHUNK_SIZE', 64 * 1024),
+            spool_size=self.settings.get('MULTIPART_SPOOL_SIZE', 1024 * 1024),
+            max_field_size=self.settings.get('MULTIPART_MAX_FIELD_SIZE', 1024 * 1024),
+        )
+        return parser.parse()
+
+    @cached_property
+    def content_length(self) -> int:
+        """
+        Размер тела запроса из CONTENT_LENGTH (0, если заголовок отсутствует или некорректен).
+        """
+
+        try:
+            return max(int(self.environ.get('CONTENT_LENGTH') or 0), 0)
+        except ValueError:
+            return 0
+
+    @cached_property
+    def stream(self) -> LimitedStream:
+        """
+        Поток тела запроса, ограниченный CONTENT_LENGTH. Позволяет читать большие тела по частям,
+        не загружая их в память. Если CONTENT_LENGTH больше settings['MAX_BODY_SIZE'],
+        вызывается исключение RequestEntityTooLarge.
+        """
+
+        max_body_size = self.settings.get('MAX_BODY_SIZE')
+        if max_body_size is not None and self.content_length > max_body_size:
+            raise RequestEntityTooLarge
+        return LimitedStream(self.environ['wsgi.input'], self.content_length)
+
+    @cached_property
+    def body(self) -> bytes:
+        """
+        Тело запроса целиком. Для больших тел используйте stream.
+        """
+
+        return self.stream.read()
+
+    @cached_property
+    def cookies(self) -> dict:
+        """
+        Словарь куки запроса {имя: значение}, разобранный из HTTP_COOKIE при первом обращении.
+        """
+
+        cookie = SimpleCookie()
+        try:
+            cookie.load(self.environ.get('HTTP_COOKIE', ''))
+        except CookieError:
+            return {}
+        return {key: morsel.value for key, morsel in cookie.items()}
+
+    @cached_property
+    def headers(self) -> dict:
+        """
+        Словарь заголовков запроса с именами в виде 'Content-Type', собранный из environ при первом обращении.
+        """
+
+        headers = {}
+        for key, value in self.environ.items():
+            if key.startswith('HTTP_'):
+                headers[key[5:].replace('_', '-').title()] = value
+            elif key in ('CONTENT_TYPE', 'CONTENT_LENGTH') and value:
+                headers[key.replace('_', '-').title()] = value
+        return headers
+
     def build_get_params_dict(self, raw_params: str):
         """
         Этот метод разбирает строку запроса raw_params и создает словарь GET,
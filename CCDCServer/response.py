@@ -1,15 +1,19 @@
+import os
+from typing import BinaryIO, Iterable, Union
 from CCDCServer.request import Request
 
 
 class Response:
-    def __init__(self, request: Request, status_code: int = 200, headers: dict = None, body: str = ''):
+    streaming = False
+
+    def __init__(self, request: Request, status_code: int = 200, headers: dict = None, body: Union[str, bytes] = ''):
         """
         Конструктор класса Response.
 
         :param request: Объект класса Request, связанный с данным HTTP-ответом
         :param status_code: Целочисленный HTTP-статус-код ответа (по умолчанию 200 - "OK")
         :param headers: Словарь с HTTP-заголовками ответа (по умолчанию пустой словарь)
-        :param body: Строка, содержащая тело ответа (по умолчанию пустая строка)
+        :param body: Строка или байты, содержащие тело ответа (по умолчанию пустая строка)
         """
 
         self.status_code = status_code
@@ -44,16 +48,16 @@ class Response:
             'Content-Length': 0
         }
 
-    def _set_body(self, raw_body: str):
+    def _set_body(self, raw_body: Union[str, bytes]):
         """
-        Этот метод устанавливает тело ответа, преобразуя строку raw_body в байтовый формат, используя кодировку UTF-8.
-        Затем обновляется заголовок Content-Length, чтобы он соответствовал длине тела ответа.
+        Этот метод устанавливает тело ответа, преобразуя строку raw_body в байтовый формат, используя кодировку UTF-8
+        (байты используются как есть). Затем обновляется заголовок Content-Length, чтобы он соответствовал длине тела ответа.
 
-        :param raw_body: Строка, устанавливающая тело ответа
+        :param raw_body: Строка или байты, устанавливающие тело ответа
         :return: Ничего не возвращает
         """
 
-        self.body = raw_body.encode('utf-8')
+        self.body = raw_body.encode('utf-8') if isinstance(raw_body, str) else raw_body
         self.update_headers(
             {'Content-Length': str(len(self.body))}
         )
@@ -68,3 +72,102 @@ class Response:
         """
 
         self.headers.update(headers)
+
+
+class StreamingResponse(Response):
+    """
+    Ответ, тело которого - итератор (например, генератор Template.generate()), а не готовая строка.
+    Части тела отдаются клиенту по мере генерации: заголовок Content-Length не устанавливается,
+    поэтому сервер передает ответ с chunked transfer encoding.
+    """
+
+    streaming = True
+
+    def __init__(self, request: Request, status_code: int = 200, headers: dict = None,
+                 body: Iterable[Union[str, bytes]] = ()):
+        """
+        Конструктор класса StreamingResponse.
+
+        :param request: Объект класса Request, связанный с данным HTTP-ответом
+        :param status_code: Целочисленный HTTP-статус-код ответа (по умолчанию 200 - "OK")
+        :param headers: Словарь с HTTP-заголовками ответа (по умолчанию пустой словарь)
+        :param body: Итератор строк или байтов, составляющих тело ответа
+        """
+
+        super().__init__(request, status_code=status_code, headers=headers)
+        self.headers.pop('Content-Length', None)
+        self.body = self._encode_chunks(body)
+
+    @staticmethod
+    def _encode_chunks(chunks: Iterable[Union[str, bytes]]):
+        """
+        Этот метод кодирует строковые части тела в UTF-8 и пропускает пустые части,
+        чтобы сервер не отправлял пустые фрагменты.
+
+        :param chunks: Итератор строк или байтов
+        :return: Генератор байтов
+        """
+
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if chunk:
+                yield chunk
+
+
+class FileResponse(StreamingResponse):
+    """
+    Ответ с содержимым открытого файла (или его диапазона). Тело отдается частями, а если WSGI-сервер
+    предоставляет wsgi.file_wrapper (или ASGI-сервер - расширение http.response.zerocopysend),
+    файл передается без копирования через os.sendfile.
+    """
+
+    def __init__(self, request: Request, file: BinaryIO, offset: int = 0, length: int = None,
+                 status_code: int = 200, headers: dict = None, chunk_size: int = 64 * 1024):
+        """
+        Конструктор класса FileResponse.
+
+        :param request: Объект класса Request, связанный с данным HTTP-ответом
+        :param file: Файл, открытый в двоичном режиме. Закрывается после отправки ответа
+        :param offset: Смещение начала отдаваемого диапазона
+        :param length: Длина отдаваемого диапазона (по умолчанию до конца файла)
+        :param status_code: Целочисленный HTTP-статус-код ответа (по умолчанию 200 - "OK")
+        :param headers: Словарь с HTTP-заголовками ответа
+        :param chunk_size: Размер части при чтении файла
+        """
+
+        size = os.fstat(file.fileno()).st_size
+        if length is None:
+            length = size - offset
+
+        super().__init__(request, status_code=status_code, headers=headers,
+                         body=self._read_chunks(file, offset, length, chunk_size))
+        self.headers['Content-Length'] = str(length)
+        self.file = file
+        self.offset = offset
+        self.length = length
+        self.chunk_size = chunk_size
+        self.to_end = offset + length == size
+
+    @staticmethod
+    def _read_chunks(file: BinaryIO, offset: int, length: int, chunk_size: int):
+        """
+        Этот метод читает диапазон файла частями и закрывает файл по окончании.
+
+        :param file: Файл, открытый в двоичном режиме
+        :param offset: Смещение начала диапазона
+        :param length: Длина диапазона
+        :param chunk_size: Размер части
+        :return: Генератор байтов
+        """
+
+        try:
+            file.seek(offset)
+            while length > 0:
+                chunk = file.read(min(chunk_size, length))
+                if not chunk:
+                    break
+                length -= len(chunk)
+                yield chunk
+        finally:
+            file.close()
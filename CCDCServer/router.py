@@ -0,0 +1,100 @@
+import re
+from typing import Dict, List, Optional, Pattern, Tuple, Type
+from CCDCServer.urls import Url
+from CCDCServer.view import View
+from CCDCServer.exceptions import NotFound
+
+
+class Router:
+    """
+    Класс Router компилирует список маршрутов (Url) один раз при старте сервера.
+    Статические маршруты вида '^/login$' попадают в словарь и находятся за одно обращение,
+    параметризованные маршруты объединяются в одно регулярное выражение с альтернативами,
+    которое проверяется за один проход.
+
+    Маршруты с конструкциями, которые зависят от положения в общем выражении (нумерованные ссылки
+    на группы вида \\1, условия (?(1)...) и флаги вида (?i) на весь маршрут), компилируются отдельно.
+    Порядок проверки параметризованных маршрутов сохраняется: побеждает первый подходящий в списке.
+    """
+    __slots__ = ('static', 'patterns', 'routes')
+
+    _literal_re = re.compile(r'^\^((?:[^\\.^$*+?{}\[\]|()]|\\[^A-Za-z0-9])*)\$$')
+    _group_re = re.compile(r'\(\?P<([A-Za-z_][A-Za-z0-9_]*)>|\(\?P=([A-Za-z_][A-Za-z0-9_]*)\)')
+    # Неэкранированные \1-\99, (?(...) и (?флаги) без двоеточия
+    _standalone_re = re.compile(r'(?<!\\)(?:\\\\)*(?:\\[1-9]|\(\?\(|\(\?[aiLmsux-]+\))')
+
+    def __init__(self, urls: List[Url]):
+        """
+        Конструктор класса Router.
+
+        :param urls: Список URL, где каждый элемент должен быть типа Url.
+        """
+        self.static: Dict[str, Type[View]] = {}
+        self.routes: Dict[str, Tuple[Type[View], Dict[str, str]]] = {}
+        # (регулярное выражение, view) - view None у общего выражения, маршрут определяется по группе
+        self.patterns: List[Tuple[Pattern, Optional[Type[View]]]] = []
+        alternatives = []
+
+        for index, path in enumerate(urls):
+            literal = self._literal_re.match(path.url)
+            if literal is not None:
+                url = re.sub(r'\\(.)', r'\1', literal.group(1))
+                self.static.setdefault(url, path.view)
+                continue
+
+            if self._standalone_re.search(path.url):
+                if alternatives:
+                    self.patterns.append((re.compile('|'.join(alternatives)), None))
+                    alternatives = []
+                self.patterns.append((re.compile(path.url), path.view))
+                continue
+
+            route_name = f'_r{index}'
+            groups = {}
+            alternatives.append(f'(?P<{route_name}>{self._rename_groups(path.url, route_name, groups)})')
+            self.routes[route_name] = (path.view, groups)
+
+        if alternatives:
+            self.patterns.append((re.compile('|'.join(alternatives)), None))
+
+    def _rename_groups(self, url: str, route_name: str, groups: Dict[str, str]) -> str:
+        """
+        Переименовывает именованные группы маршрута так, чтобы они не пересекались
+        с группами других маршрутов внутри общего регулярного выражения.
+
+        :param url: Регулярное выражение маршрута.
+        :param route_name: Имя группы, охватывающей весь маршрут.
+        :param groups: Словарь, который заполняется парами {новое_имя: исходное_имя}.
+        :return: Регулярное выражение с переименованными группами.
+        """
+
+        def replace(m):
+            if m.group(1) is not None:
+                new_name = f'{route_name}_{m.group(1)}'
+                groups[new_name] = m.group(1)
+                return f'(?P<{new_name}>'
+            return f'(?P={route_name}_{m.group(2)})'
+
+        return self._group_re.sub(replace, url)
+
+    def resolve(self, url: str) -> Tuple[Type[View], Dict[str, str]]:
+        """
+        Ищет view для переданного URL.
+
+        :param url: Подготовленный URL (без завершающего слэша).
+        :return: Кортеж из класса View и словаря именованных параметров маршрута.
+        """
+        view = self.static.get(url)
+        if view is not None:
+            return view, {}
+
+        for pattern, view in self.patterns:
+            m = pattern.match(url)
+            if m is None:
+                continue
+            if view is not None:
+                return view, m.groupdict()
+            view, groups = self.routes[m.lastgroup]
+            return view, {name: m.group(group) for group, name in groups.items()}
+
+        raise NotFound
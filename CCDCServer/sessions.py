@@ -1,3 +1,15 @@
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from uuid import uuid4
+from CCDCSQLQueryBuilder.select import SelectQuery
+from CCDCSQLQueryBuilder.insert import InsertQuery
+from CCDCSQLQueryBuilder.delete import DeleteQuery
+from CCDCSQLQueryBuilder.execute import execute_query_sync
+
+
 class Session:
     def __init__(self, request, response):
         self.request = request
@@ -52,3 +64,363 @@ class Session:
         """
 
         return self.request.cookies.get(key)
+
+
+class SessionBackend:
+    """
+    Базовый класс постоянного хранилища сессий. Методы синхронные: хранилище вызывается
+    из SessionStore только при промахе кэша и при сохранении измененной сессии.
+    """
+
+    def load(self, session_id: str):
+        """
+        Загружает сессию.
+
+        :param session_id: Идентификатор сессии.
+        :return: Кортеж (user_id, data) или None, если сессия не найдена или истекла.
+        """
+
+        raise NotImplementedError
+
+    def save(self, session_id: str, user_id, data: dict, expires_at: float):
+        """
+        Сохраняет сессию.
+
+        :param session_id: Идентификатор сессии.
+        :param user_id: Идентификатор пользователя или None.
+        :param data: Словарь с данными сессии.
+        :param expires_at: Время истечения сессии в секундах с начала эпохи.
+        """
+
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        """
+        Удаляет сессию.
+
+        :param session_id: Идентификатор сессии.
+        """
+
+        raise NotImplementedError
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """
+    Хранилище сессий в локальном файле SQLite. Сохраняет идентификатор пользователя и данные сессии.
+    """
+
+    def __init__(self, path: str):
+        """
+        Конструктор класса SQLiteSessionBackend.
+
+        :param path: Путь к файлу базы данных SQLite.
+        """
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, user_id INTEGER, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def load(self, session_id: str):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT user_id, data FROM sessions WHERE session_id = ? AND expires_at > ?",
+                (session_id, time.time())
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def save(self, session_id: str, user_id, data: dict, expires_at: float):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, user_id, data, expires_at) VALUES (?, ?, ?, ?)",
+                (session_id, user_id, json.dumps(data), expires_at)
+            )
+
+    def delete(self, session_id: str):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+
+class MySQLSessionBackend(SessionBackend):
+    """
+    Хранилище сессий в таблице users_hash (hash - идентификатор сессии, users_iduser - пользователь).
+    В таблице нет колонки для данных, поэтому сохраняются только сессии вошедших пользователей
+    и только идентификатор пользователя; остальные данные сессии живут в кэше SessionStore.
+    """
+
+    def load(self, session_id: str):
+        select_session = SelectQuery("users_hash", "users_iduser")
+        select_session.conditions.append("hash = %s")
+        select_session.params.append(session_id)
+        query, params = select_session.build_query()
+        row = execute_query_sync(query, params, "fetchone")
+        if row is None:
+            return None
+        return row["users_iduser"], {}
+
+    def save(self, session_id: str, user_id, data: dict, expires_at: float):
+        self.delete(session_id)
+        if user_id is None:
+            return
+        query, params = InsertQuery("users_hash", {"users_iduser": user_id, "hash": session_id}).build_query()
+        execute_query_sync(query, params)
+
+    def delete(self, session_id: str):
+        query, params = DeleteQuery("users_hash", conditions=["hash = %s"], params=[session_id]).build_query()
+        execute_query_sync(query, params)
+
+
+class SessionStore:
+    """
+    Хранилище сессий по session_id: LRU-кэш с ограниченным временем жизни записей в памяти процесса
+    перед постоянным хранилищем (SessionBackend). Повторные обращения к сессии стоят обращения к словарю,
+    в хранилище идет только промах кэша и запись измененной сессии.
+    """
+
+    def __init__(self, backend: SessionBackend, **kwargs):
+        """
+        Конструктор класса SessionStore.
+
+        :param backend: Постоянное хранилище сессий.
+        :param kwargs: Дополнительные аргументы:
+            - max_entries: Максимальное число сессий в кэше (по умолчанию 10000).
+            - cache_ttl: Время жизни записи в кэше в секундах (по умолчанию 300).
+            - session_ttl: Время жизни сессии в секундах (по умолчанию 2_700_000, примерно месяц).
+        """
+
+        self.backend = backend
+        self.max_entries = kwargs.get("max_entries", 10_000)
+        self.cache_ttl = kwargs.get("cache_ttl", 300)
+        self.session_ttl = kwargs.get("session_ttl", 2_700_000)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_cached(self, session_id: str) -> bool:
+        """
+        Проверяет, есть ли актуальная запись сессии в кэше.
+
+        :param session_id: Идентификатор сессии.
+        :return: True, если сессия будет получена без обращения к хранилищу.
+        """
+
+        with self._lock:
+            entry = self._cache.get(session_id)
+            return entry is not None and entry[2] > time.monotonic()
+
+    def load(self, session_id: str):
+        """
+        Загружает сессию из кэша или, при промахе, из постоянного хранилища.
+
+        :param session_id: Идентификатор сессии.
+        :return: Кортеж (user_id, data) или None, если сессия не найдена.
+        """
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(session_id)
+            if entry is not None:
+                if entry[2] > now:
+                    self._cache.move_to_end(session_id)
+                    return entry[0], dict(entry[1])
+                del self._cache[session_id]
+
+        loaded = self.backend.load(session_id)
+        if loaded is not None:
+            self._remember(session_id, loaded[0], loaded[1])
+            return loaded[0], dict(loaded[1])
+        return None
+
+    def save(self, session: "SessionData"):
+        """
+        Записывает сессию в хранилище, если она была изменена.
+
+        :param session: Объект SessionData.
+        :return: Ничего не возвращает.
+        """
+
+        if not session.dirty:
+            return
+        if session.previous_id is not None:
+            self.delete(session.previous_id)
+        self.backend.save(session.session_id, session.user_id, session.data, time.time() + self.session_ttl)
+        self._remember(session.session_id, session.user_id, session.data)
+        session.dirty = False
+        session.previous_id = None
+
+    def delete(self, session_id: str):
+        """
+        Удаляет сессию из кэша и хранилища.
+
+        :param session_id: Идентификатор сессии.
+        :return: Ничего не возвращает.
+        """
+
+        with self._lock:
+            self._cache.pop(session_id, None)
+        self.backend.delete(session_id)
+
+    def _remember(self, session_id: str, user_id, data: dict):
+        """
+        Помещает сессию в кэш, вытесняя самые давно использованные записи.
+
+        :param session_id: Идентификатор сессии.
+        :param user_id: Идентификатор пользователя или None.
+        :param data: Словарь с данными сессии.
+        :return: Ничего не возвращает.
+        """
+
+        with self._lock:
+            self._cache[session_id] = (user_id, dict(data), time.monotonic() + self.cache_ttl)
+            self._cache.move_to_end(session_id)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+
+class SessionData:
+    """
+    Сессия текущего запроса. Данные загружаются из SessionStore при первом обращении,
+    любое изменение помечает сессию как измененную (dirty), и только такие сессии записываются обратно.
+    """
+    __slots__ = ("store", "session_id", "previous_id", "dirty", "_user_id", "_data", "_loaded")
+
+    def __init__(self, store: SessionStore, session_id: str = None):
+        """
+        Конструктор класса SessionData.
+
+        :param store: Хранилище сессий.
+        :param session_id: Идентификатор сессии из куки или None для новой сессии.
+        """
+
+        self.store = store
+        self.session_id = session_id
+        self.previous_id = None
+        self.dirty = False
+        self._user_id = None
+        self._data = {}
+        self._loaded = session_id is None
+
+    def load(self):
+        """
+        Загружает данные сессии при первом обращении. Неизвестный идентификатор заменяется пустой сессией.
+        """
+
+        if self._loaded:
+            return
+        self._loaded = True
+        loaded = self.store.load(self.session_id)
+        if loaded is None:
+            self.session_id = None
+        else:
+            self._user_id, self._data = loaded
+
+    @property
+    def user_id(self):
+        """
+        :return: Идентификатор вошедшего пользователя или None.
+        """
+
+        self.load()
+        return self._user_id
+
+    @property
+    def data(self) -> dict:
+        """
+        :return: Словарь с данными сессии (изменения через него нужно отмечать вызовом mark_dirty).
+        """
+
+        self.load()
+        return self._data
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self.mark_dirty()
+
+    def __delitem__(self, key):
+        del self.data[key]
+        self.mark_dirty()
+
+    def mark_dirty(self):
+        """
+        Помечает сессию как измененную и выдает идентификатор новой сессии.
+        """
+
+        self.load()
+        if self.session_id is None:
+            self.session_id = uuid4().hex
+        self.dirty = True
+
+    def login(self, user_id):
+        """
+        Привязывает сессию к пользователю. Идентификатор сессии при этом меняется,
+        чтобы идентификатор, известный до входа, нельзя было использовать после него.
+
+        :param user_id: Идентификатор пользователя.
+        """
+
+        self.load()
+        if self.session_id is not None:
+            self.previous_id = self.session_id
+        self.session_id = uuid4().hex
+        self._user_id = user_id
+        self.dirty = True
+
+    def logout(self):
+        """
+        Отвязывает сессию от пользователя и очищает ее данные.
+        """
+
+        self.load()
+        self._user_id = None
+        self._data = {}
+        self.mark_dirty()
+
+
+_store = None
+
+
+def configure_session_store(settings: dict) -> SessionStore:
+    """
+    Создает хранилище сессий по настройкам сервера и делает его хранилищем по умолчанию.
+
+    :param settings: Словарь с настройками сервера. Используются ключи SESSION_BACKEND ('sqlite' или 'mysql'),
+        SESSION_SQLITE_PATH, SESSION_CACHE_SIZE, SESSION_CACHE_TTL и SESSION_TTL.
+    :return: Созданное хранилище сессий.
+    """
+
+    global _store
+
+    if settings.get('SESSION_BACKEND', 'sqlite') == 'mysql':
+        backend = MySQLSessionBackend()
+    else:
+        backend = SQLiteSessionBackend(settings.get('SESSION_SQLITE_PATH', 'sessions.sqlite3'))
+
+    _store = SessionStore(
+        backend,
+        max_entries=settings.get('SESSION_CACHE_SIZE', 10_000),
+        cache_ttl=settings.get('SESSION_CACHE_TTL', 300),
+        session_ttl=settings.get('SESSION_TTL', 2_700_000),
+    )
+    return _store
+
+
+def get_session_store() -> SessionStore:
+    """
+    Возвращает хранилище сессий по умолчанию.
+
+    :return: Хранилище сессий, созданное configure_session_store.
+    """
+
+    if _store is None:
+        raise RuntimeError("Хранилище сессий не настроено, вызовите configure_session_store(settings)")
+    return _store
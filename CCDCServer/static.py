@@ -0,0 +1,345 @@
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple, Type
+from CCDCServer.exceptions import NotFound, NotAllowed
+from CCDCServer.view import View
+from CCDCServer.request import Request
+from CCDCServer.response import Response, FileResponse
+from CCDCServer.conditional import http_date, parse_http_date
+
+
+class FileCache:
+    """
+    Кэш содержимого небольших статических файлов в памяти с вытеснением давно неиспользуемых (LRU).
+    Ключ включает время изменения и размер файла, поэтому измененный файл не будет отдан из кэша.
+    """
+    __slots__ = ('max_size', 'max_file_size', 'size', '_entries', '_lock')
+
+    def __init__(self, max_size: int = 16 * 1024 * 1024, max_file_size: int = 256 * 1024):
+        """
+        Конструктор класса FileCache.
+
+        :param max_size: Суммарный размер файлов в кэше в байтах.
+        :param max_file_size: Максимальный размер файла, который кладется в кэш.
+        """
+        self.max_size = max_size
+        self.max_file_size = max_file_size
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        """
+        Возвращает содержимое файла из кэша и помечает его как недавно использованное.
+
+        :param key: Кортеж (путь, mtime_ns, размер).
+        :return: Содержимое файла или None.
+        """
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def put(self, key: tuple, data: bytes):
+        """
+        Кладет содержимое файла в кэш, вытесняя давно неиспользуемые файлы при превышении max_size.
+
+        :param key: Кортеж (путь, mtime_ns, размер).
+        :param data: Содержимое файла.
+        :return: Ничего не возвращает.
+        """
+        if len(data) > self.max_file_size or len(data) > self.max_size:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Разбирает заголовок Range (RFC 7233). Поддерживается один диапазон байтов.
+
+    :param header: Значение заголовка Range.
+    :param size: Размер файла.
+    :return: Кортеж (начало, длина); None, если заголовок нужно проигнорировать и отдать файл целиком.
+    :raises ValueError: Если диапазон не пересекается с файлом (ответ 416).
+    """
+    unit, _, ranges = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in ranges:
+        return None
+
+    first, sep, last = ranges.strip().partition('-')
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            if not last:
+                return None
+            start = max(size - int(last), 0)
+            end = size - 1
+    except ValueError:
+        return None
+
+    if start >= size:
+        raise ValueError('Range Not Satisfiable')
+    if end < start:
+        return None
+    end = min(end, size - 1)
+    return start, end - start + 1
+
+
+def accepted_encodings(header: str) -> set:
+    """
+    Возвращает кодировки из Accept-Encoding, которые клиент принимает (q > 0).
+
+    :param header: Значение заголовка Accept-Encoding.
+    :return: Множество названий кодировок в нижнем регистре.
+    """
+    encodings = set()
+    for item in header.split(','):
+        name, _, params = item.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            encodings.add(name)
+    return encodings
+
+
+class StaticFiles(View):
+    """
+    View для раздачи статических файлов из настроенных папок. Подключается через urlpatterns
+    с помощью static_files, путь к файлу передается именованной группой path:
+
+        Url('^/static/(?P<path>.+)$', static_files([os.path.join(BASE_DIR, 'static')]))
+
+    - файлы отдаются через FileResponse, поэтому сервер может передать их без копирования
+      (wsgi.file_wrapper / os.sendfile);
+    - небольшие файлы кэшируются в памяти (FileCache);
+    - ETag и Last-Modified берутся из времени изменения и размера файла, содержимое не хэшируется;
+    - поддерживаются запросы Range (один диапазон) и If-Range;
+    - если рядом с файлом лежат file.br или file.gz и клиент их принимает, отдается сжатый вариант;
+    - если задан index_file, для пути к папке отдается ее индексный файл (например, index.html).
+    """
+
+    directories: List[str] = []
+    max_age = 3600
+    chunk_size = 64 * 1024
+    cache: FileCache = None
+    encodings = (('br', '.br'), ('gzip', '.gz'))
+    index_file: Optional[str] = None
+
+    def get(self, request: Request, path: str = '', *args, **kwargs) -> Response:
+        """
+        Метод отдает файл (или его диапазон).
+
+        :param request: Объект класса Request, представляющий HTTP GET-запрос
+        :param path: Путь к файлу относительно папок со статикой
+        :return: Объект Response
+        """
+        return self._serve(request, path, with_body=True)
+
+    def head(self, request: Request, path: str = '', *args, **kwargs) -> Response:
+        """
+        Метод отдает заголовки файла без тела.
+
+        :param request: Объект класса Request, представляющий HTTP HEAD-запрос
+        :param path: Путь к файлу относительно папок со статикой
+        :return: Объект Response
+        """
+        return self._serve(request, path, with_body=False)
+
+    def post(self, request: Request, *args, **kwargs) -> Response:
+        raise NotAllowed
+
+    def get_etag(self, request: Request, path: str = '', *args, **kwargs) -> str:
+        return self._etag(self._lookup(request, path)[1])
+
+    def get_last_modified(self, request: Request, path: str = '', *args, **kwargs) -> float:
+        return self._lookup(request, path)[1].st_mtime
+
+    @staticmethod
+    def _etag(stat: os.stat_result) -> str:
+        """
+        Строит ETag из времени изменения и размера файла.
+
+        :param stat: Результат os.stat файла.
+        :return: ETag в кавычках.
+        """
+        return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+    def _find_file(self, path: str) -> str:
+        """
+        Ищет файл в папках со статикой. Пути, выходящие за пределы папки (например, через '..'
+        или символические ссылки), не отдаются.
+
+        :param path: Путь к файлу из URL.
+        :return: Абсолютный путь к файлу.
+        :raises NotFound: Если файл не найден.
+        """
+        if not path or '\x00' in path:
+            raise NotFound
+        for directory in self.directories:
+            root = os.path.realpath(directory)
+            full_path = os.path.realpath(os.path.join(root, path.lstrip('/')))
+            if not full_path.startswith(root + os.sep) and not (self.index_file and full_path == root):
+                continue
+            if self.index_file and os.path.isdir(full_path):
+                full_path = os.path.join(full_path, self.index_file)
+            if os.path.isfile(full_path):
+                return full_path
+        raise NotFound
+
+    def _lookup(self, request: Request, path: str) -> Tuple[str, os.stat_result, Optional[str], bool]:
+        """
+        Находит файл и выбирает сжатый вариант по Accept-Encoding. Результат сохраняется в request.extra,
+        чтобы get_etag, get_last_modified и get не обращались к диску повторно.
+
+        :param request: Объект запроса (Request).
+        :param path: Путь к файлу из URL.
+        :return: Кортеж (путь к отдаваемому файлу, os.stat файла, Content-Encoding или None,
+            есть ли у файла сжатые варианты).
+        """
+        found = request.extra.get('static_file')
+        if found is not None:
+            return found
+
+        full_path = self._find_file(path)
+        accepted = accepted_encodings(request.environ.get('HTTP_ACCEPT_ENCODING', ''))
+        found = None
+        has_variants = False
+        for encoding, suffix in self.encodings:
+            variant = full_path + suffix
+            if not os.path.isfile(variant):
+                continue
+            has_variants = True
+            if found is None and encoding in accepted:
+                found = (variant, os.stat(variant), encoding)
+        if found is None:
+            found = (full_path, os.stat(full_path), None)
+
+        found = found + (has_variants,)
+        request.extra['static_file'] = found
+        return found
+
+    def _serve(self, request: Request, path: str, with_body: bool) -> Response:
+        """
+        Метод формирует ответ с файлом: 200, 206 для запроса Range или 416, если диапазон вне файла.
+
+        :param request: Объект запроса (Request).
+        :param path: Путь к файлу из URL.
+        :param with_body: Отдавать ли тело (False для HEAD).
+        :return: Объект Response.
+        """
+        full_path, stat, encoding, has_variants = self._lookup(request, path)
+        size = stat.st_size
+        etag = self._etag(stat)
+
+        # Для file.js.gz и file.css.br mimetypes возвращает тип исходного файла
+        content_type, _ = mimetypes.guess_type(full_path)
+        headers = {
+            'Content-Type': content_type or 'application/octet-stream',
+            'Accept-Ranges': 'bytes',
+            'ETag': etag,
+            'Last-Modified': http_date(stat.st_mtime),
+            'Cache-Control': f'max-age={self.max_age}',
+        }
+        if encoding is not None:
+            headers['Content-Encoding'] = encoding
+        if has_variants:
+            headers['Vary'] = 'Accept-Encoding'
+
+        status_code, offset, length = 200, 0, size
+        range_header = request.environ.get('HTTP_RANGE')
+        if range_header and self._if_range(request.environ.get('HTTP_IF_RANGE'), etag, stat.st_mtime):
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                headers['Content-Range'] = f'bytes */{size}'
+                return Response(request, status_code=416, headers=headers)
+            if byte_range is not None:
+                offset, length = byte_range
+                status_code = 206
+                headers['Content-Range'] = f'bytes {offset}-{offset + length - 1}/{size}'
+
+        if not with_body:
+            response = Response(request, status_code=status_code, headers=headers)
+            response.headers['Content-Length'] = str(length)
+            return response
+
+        key = (full_path, stat.st_mtime_ns, size)
+        data = self.cache.get(key) if self.cache is not None else None
+        if data is None and self.cache is not None and size <= self.cache.max_file_size:
+            with open(full_path, 'rb') as file:
+                data = file.read()
+            if len(data) == size:
+                self.cache.put(key, data)
+        if data is not None:
+            return Response(request, status_code=status_code, headers=headers, body=data[offset:offset + length])
+
+        return FileResponse(request, open(full_path, 'rb'), offset=offset, length=length,
+                            status_code=status_code, headers=headers, chunk_size=self.chunk_size)
+
+    @staticmethod
+    def _if_range(if_range: Optional[str], etag: str, mtime: float) -> bool:
+        """
+        Проверяет заголовок If-Range: диапазон отдается, только если файл не изменился.
+
+        :param if_range: Значение заголовка If-Range или None.
+        :param etag: ETag файла.
+        :param mtime: Время изменения файла в секундах.
+        :return: True, если запрос Range нужно выполнить.
+        """
+        if if_range is None:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith('"') or if_range.startswith('W/'):
+            return if_range == etag
+        client_modified = parse_http_date(if_range)
+        return client_modified is not None and int(mtime) == int(client_modified)
+
+
+def static_files(directories: List[str], settings: dict = None, **options) -> Type[StaticFiles]:
+    """
+    Создает View для раздачи статических файлов из указанных папок со своим кэшем в памяти.
+
+    :param directories: Список папок со статикой; файл ищется в них по порядку.
+    :param settings: Словарь с настройками сервера. Используются ключи STATIC_MAX_AGE (по умолчанию 3600),
+        STATIC_CACHE_SIZE (по умолчанию 16 МБ, 0 - не кэшировать) и STATIC_CACHE_MAX_FILE_SIZE (по умолчанию 256 КБ).
+    :param options: Атрибуты StaticFiles, переопределяющие настройки (max_age, chunk_size, encodings, index_file).
+    :return: Подкласс StaticFiles.
+    """
+    settings = settings or {}
+    cache_size = settings.get('STATIC_CACHE_SIZE', 16 * 1024 * 1024)
+    attrs = {
+        'directories': [os.path.abspath(directory) for directory in directories],
+        'max_age': settings.get('STATIC_MAX_AGE', 3600),
+        'cache': FileCache(cache_size, settings.get('STATIC_CACHE_MAX_FILE_SIZE', 256 * 1024)) if cache_size else None,
+    }
+    attrs.update(options)
+    return type('StaticFiles', (StaticFiles,), attrs)
@@ -1,10 +1,15 @@
+from contextvars import ContextVar
+
+
 class EnvironStorage:
     """
     Класс для хранения данных окружения и функции start_response в контексте текущего запроса.
+    Значения хранятся в ContextVar, поэтому параллельные запросы (потоки WSGI-сервера
+    или задачи ASGI-сервера) не видят окружение друг друга.
     """
 
-    _environ = None
-    _start_response = None
+    _environ = ContextVar('environ', default=None)
+    _start_response = ContextVar('start_response', default=None)
 
     @classmethod
     def set_environ(cls, environ: dict):
@@ -14,7 +19,7 @@ class EnvironStorage:
         :param environ: Словарь с информацией о текущем запросе.
         :return: Ничего не возвращает.
         """
-        cls._environ = environ
+        cls._environ.set(environ)
 
     @classmethod
     def get_environ(cls):
@@ -23,7 +28,7 @@ class EnvironStorage:
 
         :return: Словарь с информацией о текущем запросе.
         """
-        return cls._environ
+        return cls._environ.get()
 
     @classmethod
     def set_start_response(cls, start_response):
@@ -33,7 +38,7 @@ class EnvironStorage:
         :param start_response: Функция обратного вызова для начала ответа сервера.
         :return: Ничего не возвращает.
         """
-        cls._start_response = start_response
+        cls._start_response.set(start_response)
 
     @classmethod
     def get_start_response(cls):
@@ -42,4 +47,4 @@ class EnvironStorage:
 
         :return: Функция обратного вызова для начала ответа сервера.
         """
-        return cls._start_response
+        return cls._start_response.get()
@@ -1,6 +1,129 @@
+import os
+import threading
 import jinja2
 
 
+class TemplateEngine:
+    """
+    Общий для всего процесса движок шаблонов. Хранит по одному jinja2.Environment на папку с шаблонами,
+    поэтому скомпилированные шаблоны переиспользуются между запросами, а не компилируются заново.
+    """
+
+    _environments = {}
+    _lock = threading.Lock()
+    _template_folder = None
+    _cache_size = 400
+    _auto_reload = True
+
+    @classmethod
+    def configure(cls, settings: dict):
+        """
+        Настраивает движок шаблонов по настройкам сервера.
+
+        :param settings: Словарь с настройками сервера. Используются ключи:
+            - BASE_DIR и TEMPLATE_DIR_NAME: папка с шаблонами по умолчанию.
+            - TEMPLATE_CACHE_SIZE: Число скомпилированных шаблонов в кэше (по умолчанию 400).
+            - TEMPLATE_AUTO_RELOAD: Проверять время изменения файла шаблона при каждом обращении
+              (по умолчанию True, в production можно отключить).
+            - TEMPLATE_PRECOMPILE: Скомпилировать все шаблоны при запуске (по умолчанию False).
+        :return: Ничего не возвращает.
+        """
+
+        with cls._lock:
+            cls._template_folder = os.path.join(settings.get('BASE_DIR', ''), settings['TEMPLATE_DIR_NAME'])
+            cls._cache_size = settings.get('TEMPLATE_CACHE_SIZE', 400)
+            cls._auto_reload = settings.get('TEMPLATE_AUTO_RELOAD', True)
+            cls._environments = {}
+
+        if settings.get('TEMPLATE_PRECOMPILE', False):
+            cls.precompile()
+
+    @classmethod
+    def get_environment(cls, template_folder: str = None) -> jinja2.Environment:
+        """
+        Возвращает jinja2.Environment для папки с шаблонами, создавая его при первом обращении.
+
+        :param template_folder: Путь к папке с шаблонами (по умолчанию папка из настроек).
+        :return: Объект jinja2.Environment.
+        """
+
+        folder = os.path.abspath(template_folder or cls._template_folder or 'templates')
+        env = cls._environments.get(folder)
+        if env is None:
+            with cls._lock:
+                env = cls._environments.get(folder)
+                if env is None:
+                    env = jinja2.Environment(
+                        loader=jinja2.FileSystemLoader(searchpath=folder),
+                        cache_size=cls._cache_size,
+                        auto_reload=cls._auto_reload,
+                    )
+                    cls._environments[folder] = env
+        return env
+
+    @classmethod
+    def get_template(cls, template_name: str, template_folder: str = None) -> jinja2.Template:
+        """
+        Возвращает скомпилированный шаблон из кэша.
+
+        :param template_name: Имя файла шаблона.
+        :param template_folder: Путь к папке с шаблонами (по умолчанию папка из настроек).
+        :return: Объект jinja2.Template.
+        """
+
+        return cls.get_environment(template_folder).get_template(template_name)
+
+    @classmethod
+    def precompile(cls, template_folder: str = None):
+        """
+        Компилирует все шаблоны папки заранее, чтобы первый запрос не тратил время на компиляцию.
+
+        :param template_folder: Путь к папке с шаблонами (по умолчанию папка из настроек).
+        :return: Ничего не возвращает.
+        """
+
+        env = cls.get_environment(template_folder)
+        for template_name in env.list_templates():
+            env.get_template(template_name)
+
+
+def render_template(template_name: str, context: dict = None) -> str:
+    """
+    Рендерит шаблон из папки с шаблонами по умолчанию.
+
+    :param template_name: Имя файла шаблона.
+    :param context: Словарь с переменными шаблона.
+    :return: Строка, содержащая результат рендеринга шаблона.
+    """
+
+    return TemplateEngine.get_template(template_name).render(context or {})
+
+
+def stream_template(template_name: str, context: dict = None, chunk_size: int = 8192):
+    """
+    Рендерит шаблон по частям через Template.generate(), не собирая весь результат в памяти.
+    Мелкие фрагменты, которые выдает Jinja2, объединяются в части размером не меньше chunk_size байт.
+
+    :param template_name: Имя файла шаблона.
+    :param context: Словарь с переменными шаблона.
+    :param chunk_size: Минимальный размер отдаваемой части в байтах.
+    :return: Генератор байтов для StreamingResponse.
+    """
+
+    buffer = []
+    size = 0
+    for fragment in TemplateEngine.get_template(template_name).generate(context or {}):
+        data = fragment.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= chunk_size:
+            yield b''.join(buffer)
+            buffer.clear()
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
 class LoadTemplate:
     def __init__(self, template_folder: str, template_name: str, **kwargs):
         """
@@ -24,13 +147,11 @@ class LoadTemplate:
 
     def load_template(self):
         """
-        Загружает и рендерит Jinja2 шаблон.
+        Загружает и рендерит Jinja2 шаблон. Скомпилированный шаблон берется из общего кэша TemplateEngine.
 
         :return: Строка, содержащая результат рендеринга шаблона.
         """
-        template_loader = jinja2.FileSystemLoader(searchpath=self.template_folder)
-        jinja_env = jinja2.Environment(loader=template_loader)
-        template = jinja_env.get_template(self.template_name)
+        template = TemplateEngine.get_template(self.template_name, self.template_folder)
         if self.context is not None:
             html_content = template.render(self.context)
         else:
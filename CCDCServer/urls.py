@@ -10,6 +10,10 @@ class Url:
     Это может использоваться, например, для маршрутизации веб-приложения, где URL связывается с конкретным
     обработчиком (View). Аннотация Type[View] указывает на ожидаемый тип данных для поля view, который должен
     быть классом, производным от View.
+
+    Именованные группы регулярного выражения url (например, '^/project/(?P<project_id>\\d+)$') передаются
+    в методы get/post view в виде именованных аргументов. Маршруты без регулярных конструкций
+    (например, '^/login$') ищутся по словарю и имеют приоритет над параметризованными.
     """
 
     url: str
@@ -38,3 +38,30 @@ class View:
         """
 
         pass
+
+    def get_etag(self, request: Request, *args, **kwargs):
+        """
+        Метод может быть переопределен в подклассах, чтобы вернуть дешевый валидатор страницы
+        (например, номер версии или updated_at записи) без рендеринга. Если валидатор совпадает
+        с If-None-Match клиента, сервер отвечает 304 и не вызывает get.
+
+        :param request: Объект класса Request, представляющий HTTP-запрос
+        :param args: Дополнительные позиционные аргументы (необязательно)
+        :param kwargs: Дополнительные именованные аргументы (необязательно)
+        :return: Валидатор (строка или число) либо None, если ETag нужно посчитать по телу ответа
+        """
+
+        return None
+
+    def get_last_modified(self, request: Request, *args, **kwargs):
+        """
+        Метод может быть переопределен в подклассах, чтобы вернуть время изменения страницы
+        (datetime или число секунд) для проверки If-Modified-Since без рендеринга.
+
+        :param request: Объект класса Request, представляющий HTTP-запрос
+        :param args: Дополнительные позиционные аргументы (необязательно)
+        :param kwargs: Дополнительные именованные аргументы (необязательно)
+        :return: Время изменения или None
+        """
+
+        return None
@@ -1,10 +1,36 @@
 from CCDCServer.main import CCDCServer
+from CCDCServer.asgi import CCDCASGIServer
 from CCDCServer.middleware import middlewares
+from CCDCServer.sessions import configure_session_store
+from CCDCServer.cache import configure_response_cache
+from CCDCServer.assets import configure_asset_store
+from CCDCServer.pages import configure_page_compiler
+from CCDCServer.patches import configure_site_patcher
+from CCDCServer.publisher import configure_publisher
+from CCDCServer.passwords import configure_password_hasher
+from CCDCSQLQueryBuilder.pool import configure_pool
+from CCDCSQLQueryBuilder.execute import configure_executor
 from setting import settings, urlpatterns
 
+configure_pool(settings['DATABASE'])
+configure_executor(settings['DATABASE'])
+configure_session_store(settings)
+configure_response_cache(settings)
+configure_asset_store(settings)
+configure_page_compiler(settings)
+configure_site_patcher(settings)
+configure_publisher(settings)
+configure_password_hasher(settings)
+
 
 app = CCDCServer(
     urls=urlpatterns,
     settings=settings,
     middlewares=middlewares
 )
+
+asgi_app = CCDCASGIServer(
+    urls=urlpatterns,
+    settings=settings,
+    middlewares=middlewares
+)
@@ -1,14 +1,68 @@
 import os
 from CCDCServer.urls import Url
+from CCDCServer.static import static_files
 from view import HomePage, LoginPage, RegistrationPage
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 settings = {
-    'BASE_DIR': os.path.dirname(os.path.abspath(__file__)),
-    'TEMPLATE_DIR_NAME': 'templates'
+    'BASE_DIR': BASE_DIR,
+    'TEMPLATE_DIR_NAME': 'templates',
+    'TEMPLATE_CACHE_SIZE': 400,
+    'TEMPLATE_AUTO_RELOAD': True,
+    'TEMPLATE_PRECOMPILE': False,
+    'CACHE_MAX_AGE': 3600,
+    'RESPONSE_CACHE_SIZE': 64 * 1024 * 1024,
+    'RESPONSE_CACHE_TTL': 60,
+    'STATIC_DIRS': [os.path.join(BASE_DIR, 'static'), os.path.join(BASE_DIR, 'image')],
+    'STATIC_MAX_AGE': 86400,
+    'STATIC_CACHE_SIZE': 16 * 1024 * 1024,
+    'STATIC_CACHE_MAX_FILE_SIZE': 256 * 1024,
+    'PAGE_CACHE_SITES': 256,
+    'ASSET_DIR': os.path.join(BASE_DIR, 'assets'),
+    'ASSET_MMAP_CACHE_SIZE': 256,
+    'ASSET_GC_GRACE': 3600,
+    'SITE_PATCH_DELAY': 0.05,
+    'SITE_PATCH_MAX_OPERATIONS': 200,
+    'SITE_PATCH_REBASE_WINDOW': 10,
+    'PUBLISH_DIR': os.path.join(BASE_DIR, 'published'),
+    'PUBLISH_WORKERS': None,
+    'PASSWORD_SCRYPT_N': 2 ** 14,
+    'PASSWORD_SCRYPT_R': 8,
+    'PASSWORD_SCRYPT_P': 1,
+    'PASSWORD_WORKERS': None,
+    'MAX_BODY_SIZE': 10 * 1024 * 1024,
+    'MULTIPART_CHUNK_SIZE': 64 * 1024,
+    'MULTIPART_SPOOL_SIZE': 1024 * 1024,
+    'MULTIPART_MAX_FIELD_SIZE': 1024 * 1024,
+    'SESSION_BACKEND': os.environ.get('SESSION_BACKEND', 'sqlite'),
+    'SESSION_SQLITE_PATH': os.path.join(BASE_DIR, 'sessions.sqlite3'),
+    'SESSION_CACHE_SIZE': 10_000,
+    'SESSION_CACHE_TTL': 300,
+    'SESSION_TTL': 2_700_000,
+    'DATABASE': {
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'USER': os.environ.get('DB_USER', 'root'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', '1234'),
+        'NAME': os.environ.get('DB_NAME', 'builder'),
+        'POOL_MIN_SIZE': 1,
+        'POOL_MAX_SIZE': 10,
+        'POOL_TIMEOUT': 10,
+        'POOL_IDLE_TIMEOUT': 300,
+        'POOL_MAX_LIFETIME': 3600,
+        'POOL_PING_INTERVAL': 1,
+        'EXECUTOR_MAX_WORKERS': 10,
+        'QUERY_TIMEOUT': 30,
+        'PREPARED_STATEMENTS': True,
+        'PREPARED_CACHE_SIZE': 64,
+    },
 }
 
 urlpatterns = [
     Url('^$', HomePage),
     Url('^/login$', LoginPage),
     Url('^/registration$', RegistrationPage),
+    Url('^/static/(?P<path>.+)$', static_files(settings['STATIC_DIRS'], settings)),
+    Url('^/sites/(?P<path>.+)$', static_files([settings['PUBLISH_DIR']], settings, index_file='index.html')),
+    Url(r'^/(?P<path>favicon\.ico)$', static_files([os.path.join(BASE_DIR, 'image')], settings)),
 ]
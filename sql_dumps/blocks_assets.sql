@@ -0,0 +1,9 @@
+-- Ссылки блоков на хранилище содержимого (CCDCServer/assets.py) для уже созданной базы builder.
+-- Новые блоки хранят содержимое в хранилище, BLOB-колонки остаются для старых блоков.
+
+ALTER TABLE `builder`.`blocks`
+  MODIFY `block_html` BLOB NULL,
+  MODIFY `block_css` BLOB NULL,
+  ADD COLUMN `asset_html` CHAR(64) NULL,
+  ADD COLUMN `asset_css` CHAR(64) NULL,
+  ADD COLUMN `asset_js` CHAR(64) NULL;
@@ -0,0 +1,5 @@
+-- Версия сайта для оптимистичной блокировки при частичном изменении site_json (CCDCServer/patches.py)
+-- для уже созданной базы builder.
+
+ALTER TABLE `builder`.`sites`
+  ADD COLUMN `version` INT NOT NULL DEFAULT 0;
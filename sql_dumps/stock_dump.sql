@@ -72,6 +72,7 @@ CREATE TABLE IF NOT EXISTS `builder`.`sites` (
   `site_name` VARCHAR(100) NOT NULL,
   `folder_name` VARCHAR(100) NOT NULL,
   `site_json` JSON NOT NULL,
+  `version` INT NOT NULL DEFAULT 0,
   PRIMARY KEY (`idsites`),
   INDEX `fk_sites_projects1_idx` (`projects_idproject` ASC) VISIBLE,
   CONSTRAINT `fk_sites_projects1`
@@ -88,9 +89,12 @@ ENGINE = InnoDB;
 CREATE TABLE IF NOT EXISTS `builder`.`blocks` (
   `idblocks` INT NOT NULL AUTO_INCREMENT,
   `users_iduser` INT NOT NULL,
-  `block_html` BLOB NOT NULL,
-  `block_css` BLOB NOT NULL,
+  `block_html` BLOB NULL,
+  `block_css` BLOB NULL,
   `block_js` BLOB NULL,
+  `asset_html` CHAR(64) NULL,
+  `asset_css` CHAR(64) NULL,
+  `asset_js` CHAR(64) NULL,
   PRIMARY KEY (`idblocks`),
   INDEX `fk_blocks_users1_idx` (`users_iduser` ASC) VISIBLE,
   CONSTRAINT `fk_blocks_users1`
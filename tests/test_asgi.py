@@ -0,0 +1,172 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from CCDCServer.asgi import ASGIInput, CCDCASGIServer
+from CCDCServer.request import Request
+from CCDCServer.response import Response, StreamingResponse, FileResponse
+from CCDCServer.urls import Url
+from CCDCServer.view import View
+
+events = []
+
+
+class AsyncView(View):
+
+    async def get(self, request: Request, *args, **kwargs) -> Response:
+        return Response(request, body='async')
+
+    async def post(self, request: Request, *args, **kwargs) -> Response:
+        events.append('view')
+        return Response(request, body=request.POST['name'][0])
+
+
+class SyncView(View):
+
+    def post(self, request: Request, *args, **kwargs) -> Response:
+        events.append(('view', threading.current_thread() is threading.main_thread()))
+        return Response(request, body=request.body)
+
+
+class StreamView(View):
+
+    def get(self, request: Request, *args, **kwargs) -> Response:
+        return StreamingResponse(request, body=(part for part in ('a', 'b', 'c')))
+
+
+class FileView(View):
+    file = None
+
+    def get(self, request: Request, *args, **kwargs) -> Response:
+        return FileResponse(request, self.file, offset=2, length=3)
+
+
+class ASGIServerTest(unittest.TestCase):
+
+    def setUp(self):
+        events.clear()
+        self.app = CCDCASGIServer(
+            urls=[Url('^/async$', AsyncView), Url('^/sync$', SyncView),
+                  Url('^/stream$', StreamView), Url('^/file$', FileView)],
+            settings={'BASE_DIR': os.path.dirname(os.path.dirname(__file__)), 'TEMPLATE_DIR_NAME': 'templates',
+                      'MAX_BODY_SIZE': 1024},
+            middlewares=[],
+        )
+
+    def call(self, path: str, method: str = 'GET', chunks=(b'',), headers=(), extensions=None):
+        scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'',
+                 'headers': list(headers), 'extensions': extensions or {}}
+        messages = [{'type': 'http.request', 'body': chunk, 'more_body': index < len(chunks) - 1}
+                    for index, chunk in enumerate(chunks)]
+        sent = []
+
+        async def receive():
+            if not messages:
+                await asyncio.sleep(3600)
+            events.append('chunk')
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(asyncio.wait_for(self.app(scope, receive, send), 5))
+        return sent
+
+    def test_lifespan(self):
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.app({'type': 'lifespan'}, receive, send))
+        self.assertEqual([message['type'] for message in sent],
+                         ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+
+    def test_async_view(self):
+        start, body = self.call('/async')
+        self.assertEqual(start['status'], 200)
+        self.assertEqual(body, {'type': 'http.response.body', 'body': b'async'})
+
+    def test_sync_view_runs_in_thread_and_streams_body(self):
+        sent = self.call('/sync', 'POST', chunks=[b'abc', b'def', b'ghi'], headers=[(b'content-length', b'9')])
+        self.assertEqual(sent[1]['body'], b'abcdefghi')
+        # Тело читается из receive, когда view его читает, а не до вызова view
+        self.assertEqual(events, [('view', False), 'chunk', 'chunk', 'chunk'])
+
+    def test_async_view_gets_preloaded_body(self):
+        body = 'name=Иван'.encode('utf-8')
+        sent = self.call('/async', 'POST', chunks=[body[:5], body[5:]],
+                         headers=[(b'content-type', b'application/x-www-form-urlencoded'),
+                                  (b'content-length', str(len(body)).encode('ascii'))])
+        self.assertEqual(sent[1]['body'].decode('utf-8'), 'Иван')
+        self.assertEqual(events, ['chunk', 'chunk', 'view'])
+
+    def test_body_without_content_length(self):
+        sent = self.call('/sync', 'POST', chunks=[b'abc', b'def'])
+        self.assertEqual(sent[1]['body'], b'abcdef')
+
+    def test_body_over_limit(self):
+        sent = self.call('/sync', 'POST', chunks=[b'x' * 2048], headers=[(b'content-length', b'2048')])
+        self.assertEqual(sent[0]['status'], 413)
+
+    def test_streaming_response(self):
+        sent = self.call('/stream')
+        self.assertEqual([(message['body'], message['more_body']) for message in sent[1:]],
+                         [(b'a', True), (b'b', True), (b'c', True), (b'', False)])
+
+    def test_zero_copy_file(self):
+        with tempfile.TemporaryFile() as file:
+            file.write(b'0123456789')
+            FileView.file = file
+            sent = self.call('/file', extensions={'http.response.zerocopysend': {}})
+            self.assertTrue(file.closed)
+        self.assertEqual(sent[1]['type'], 'http.response.zerocopysend')
+        self.assertEqual((sent[1]['offset'], sent[1]['count']), (2, 3))
+
+    def test_not_found(self):
+        self.assertEqual(self.call('/missing')[0]['status'], 404)
+
+
+class ASGIInputTest(unittest.TestCase):
+
+    def read_in_thread(self, chunks, read):
+        async def scenario():
+            messages = [{'type': 'http.request', 'body': chunk, 'more_body': True} for chunk in chunks]
+            messages.append({'type': 'http.disconnect'})
+
+            async def receive():
+                return messages.pop(0)
+
+            stream = ASGIInput(receive, asyncio.get_running_loop(), spool_size=1024)
+            return await asyncio.to_thread(read, stream)
+
+        return asyncio.run(asyncio.wait_for(scenario(), 5))
+
+    def test_read_and_readline(self):
+        def read(stream):
+            return [stream.readline(), stream.read(2), stream.readline(3), stream.read(), stream.read()]
+
+        self.assertEqual(self.read_in_thread([b'ab', b'c\nde', b'fgh', b'ij'], read),
+                         [b'abc\n', b'de', b'fgh', b'ij', b''])
+
+    def test_sync_read_in_event_loop_requires_preload(self):
+        async def scenario():
+            async def receive():
+                return {'type': 'http.request', 'body': b'abc'}
+
+            stream = ASGIInput(receive, asyncio.get_running_loop(), spool_size=1024)
+            with self.assertRaises(RuntimeError):
+                stream.read()
+            self.assertEqual(await stream.preload(), 3)
+            return stream.read()
+
+        self.assertEqual(asyncio.run(scenario()), b'abc')
+
+
+if __name__ == "__main__":
+    unittest.main()
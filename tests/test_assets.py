@@ -0,0 +1,84 @@
+import asyncio
+import tempfile
+import unittest
+from unittest import mock
+import mysql.connector
+from CCDCServer import assets
+from CCDCServer.assets import AssetStore, collect_assets
+
+
+class CollectAssetsTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = AssetStore(directory.name)
+        self.kept = self.store.put(b"kept")
+        self.unread = self.store.put(b"referenced by a row the stream did not reach")
+        self.garbage = self.store.put(b"garbage")
+        self.batches = []
+        self.error = None
+        self.count = 0
+        patcher = mock.patch.object(assets, "stream_query", self.stream_query)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(assets, "execute_query", self.execute_query)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def stream_query(self, query, params=None, **kwargs):
+        for batch in self.batches:
+            yield batch
+        if self.error is not None:
+            raise self.error
+
+    async def execute_query(self, query, params=None, *args, **kwargs):
+        return None if self.count is None else {"count": self.count}
+
+    def batch(self, *digests):
+        return {column: list(digests) if column == "asset_html" else [None] * len(digests)
+                for column in assets.BLOCK_ASSET_COLUMNS}
+
+    def collect(self) -> int:
+        with mock.patch("builtins.print"):
+            return asyncio.run(collect_assets(self.store, grace=0))
+
+    def test_sweeps_unreferenced(self):
+        self.batches = [self.batch(self.kept), self.batch(self.unread)]
+        self.assertEqual(self.collect(), 1)
+        self.assertTrue(self.store.exists(self.kept))
+        self.assertTrue(self.store.exists(self.unread))
+        self.assertFalse(self.store.exists(self.garbage))
+
+    def test_stream_failure_after_first_batch_aborts(self):
+        # Строки, вставленные во время чтения, не скрывают обрыв: сравнения с COUNT(*) больше нет
+        self.count = 100
+        self.batches = [self.batch(self.kept)]
+        self.error = mysql.connector.Error("Lost connection to MySQL server during query")
+        self.assertEqual(self.collect(), 0)
+        self.assertTrue(all(self.store.exists(digest) for digest in (self.kept, self.unread, self.garbage)))
+
+    def test_stream_timeout_aborts(self):
+        self.batches = [self.batch(self.kept)]
+        self.error = asyncio.TimeoutError()
+        self.assertEqual(self.collect(), 0)
+        self.assertTrue(self.store.exists(self.unread))
+
+    def test_empty_stream_with_rows_aborts(self):
+        self.count = 5
+        self.assertEqual(self.collect(), 0)
+        self.assertTrue(self.store.exists(self.unread))
+
+    def test_empty_stream_with_failed_count_aborts(self):
+        self.count = None
+        self.assertEqual(self.collect(), 0)
+        self.assertTrue(self.store.exists(self.unread))
+
+    def test_empty_table_sweeps_everything(self):
+        self.count = 0
+        self.assertEqual(self.collect(), 3)
+        self.assertEqual(list(self.store.digests()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
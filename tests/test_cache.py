@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+import unittest
+from CCDCServer.cache import ResponseCache
+
+
+class AsyncSingleFlightTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ResponseCache()
+        self.renders = 0
+        self.started = threading.Event()
+
+    async def render(self):
+        self.renders += 1
+        self.started.set()
+        await asyncio.sleep(0.1)
+        return 'value'
+
+    def run_in_thread(self, results: list) -> threading.Thread:
+        # Как в WSGI-сервере: каждый запрос выполняется в своем цикле событий asyncio.run
+        def target():
+            try:
+                results.append(asyncio.run(self.cache.get_or_render_async('key', self.render)))
+            except BaseException as err:
+                results.append(err)
+        thread = threading.Thread(target=target)
+        thread.start()
+        return thread
+
+    def test_waits_across_event_loops(self):
+        results = []
+        first = self.run_in_thread(results)
+        self.assertTrue(self.started.wait(5))
+        second = self.run_in_thread(results)
+        first.join(5)
+        second.join(5)
+        self.assertEqual(results, ['value', 'value'])
+        self.assertEqual(self.renders, 1)
+        self.assertEqual(self.cache._async_flights, {})
+
+    def test_cancelled_waiter_does_not_break_flight(self):
+        async def wait_and_cancel():
+            waiter = asyncio.ensure_future(self.cache.get_or_render_async('key', self.render))
+            await asyncio.sleep(0.02)
+            waiter.cancel()
+
+        results = []
+        first = self.run_in_thread(results)
+        self.assertTrue(self.started.wait(5))
+        asyncio.run(wait_and_cancel())
+        first.join(5)
+        self.assertEqual(results, ['value'])
+        self.assertEqual(self.cache.get('key'), 'value')
+
+    def test_invalidation_during_render_is_not_cached(self):
+        async def render():
+            self.cache.invalidate_tags('page:1')
+            return 'stale'
+
+        value = asyncio.run(self.cache.get_or_render_async('key', render, tags=['page:1']))
+        self.assertEqual(value, 'stale')
+        self.assertIsNone(self.cache.get('key'))
+
+
+class SyncSingleFlightTest(unittest.TestCase):
+
+    def test_renders_once(self):
+        cache = ResponseCache()
+        renders = []
+
+        def render():
+            renders.append(1)
+            time.sleep(0.05)
+            return 'value'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_render('key', render)))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(results, ['value'] * 4)
+        self.assertEqual(len(renders), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import gzip
+import unittest
+from CCDCServer.middleware import Compression
+from CCDCServer.request import Request
+from CCDCServer.response import Response
+
+
+class CompressionCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.compression = Compression(min_size=0)
+
+    def get(self, path: str, body: bytes, etag: str = '"5f00-400"', query: str = '') -> bytes:
+        request = Request({'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query,
+                           'HTTP_ACCEPT_ENCODING': 'gzip'}, {})
+        headers = {'Content-Type': 'text/css', 'ETag': etag}
+        response = self.compression.process(request, lambda _: Response(request, headers=headers, body=body))
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        return gzip.decompress(response.body)
+
+    def test_same_etag_on_different_paths(self):
+        # StaticFiles строит ETag из времени изменения и размера: у разных файлов он может совпасть
+        self.assertEqual(self.get('/static/a.css', b'a' * 1024), b'a' * 1024)
+        self.assertEqual(self.get('/static/b.css', b'b' * 1024), b'b' * 1024)
+        self.assertEqual(self.get('/static/a.css', b'a' * 1024), b'a' * 1024)
+
+    def test_same_etag_with_different_query(self):
+        self.assertEqual(self.get('/page', b'1' * 1024, query='page=1'), b'1' * 1024)
+        self.assertEqual(self.get('/page', b'2' * 1024, query='page=2'), b'2' * 1024)
+
+    def test_cached_body_is_reused(self):
+        self.get('/static/a.css', b'a' * 1024)
+        # Тело из кэша отдается по ETag, даже если view вернул другие байты
+        self.assertEqual(self.get('/static/a.css', b'x' * 1024), b'a' * 1024)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import unittest
+from CCDCServer.conditional import ConditionalHandler, etag_matches, http_date, parse_http_date
+from CCDCServer.main import CCDCServer
+from CCDCServer.request import Request
+from CCDCServer.response import Response
+from CCDCServer.urls import Url
+from CCDCServer.view import View
+
+MODIFIED = 1700000000
+
+
+class ConditionalHandlerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.handler = ConditionalHandler({'CACHE_MAX_AGE': 60})
+
+    def check(self, etag=None, last_modified=None, method='GET', **headers) -> bool:
+        return self.handler.is_not_modified(dict(REQUEST_METHOD=method, **headers), etag, last_modified)
+
+    def test_etag_weak_comparison(self):
+        self.assertTrue(etag_matches('"v1"', 'W/"v1"'))
+        self.assertTrue(etag_matches('W/"v1"', '"v0", "v1"'))
+        self.assertTrue(etag_matches('"v1"', '*'))
+        self.assertFalse(etag_matches('"v1"', '"v2"'))
+
+    def test_if_none_match_takes_precedence(self):
+        since = http_date(MODIFIED)
+        self.assertFalse(self.check('"v2"', MODIFIED, HTTP_IF_NONE_MATCH='"v1"', HTTP_IF_MODIFIED_SINCE=since))
+        self.assertTrue(self.check('"v1"', MODIFIED + 100, HTTP_IF_NONE_MATCH='"v1"',
+                                   HTTP_IF_MODIFIED_SINCE=since))
+        self.assertFalse(self.check(None, MODIFIED, HTTP_IF_NONE_MATCH='"v1"', HTTP_IF_MODIFIED_SINCE=since))
+
+    def test_if_modified_since(self):
+        since = http_date(MODIFIED)
+        self.assertTrue(self.check(last_modified=MODIFIED + 0.5, HTTP_IF_MODIFIED_SINCE=since))
+        self.assertFalse(self.check(last_modified=MODIFIED + 1, HTTP_IF_MODIFIED_SINCE=since))
+        self.assertFalse(self.check(last_modified=MODIFIED, HTTP_IF_MODIFIED_SINCE='not a date'))
+        self.assertFalse(self.check(HTTP_IF_MODIFIED_SINCE=since))
+
+    def test_only_safe_methods(self):
+        self.assertFalse(self.check('"v1"', method='POST', HTTP_IF_NONE_MATCH='"v1"'))
+
+    def test_http_date_round_trip(self):
+        self.assertEqual(http_date(MODIFIED), 'Tue, 14 Nov 2023 22:13:20 GMT')
+        self.assertEqual(parse_http_date(http_date(MODIFIED)), MODIFIED)
+        self.assertIsNone(parse_http_date('yesterday'))
+
+    def test_finalize_hashes_body_and_answers_304(self):
+        request = Request({'REQUEST_METHOD': 'GET'}, {})
+        response = self.handler.finalize({'REQUEST_METHOD': 'GET'}, Response(request, body='page'))
+        etag = response.headers['ETag']
+        self.assertEqual(etag, ConditionalHandler.hash_body(b'page'))
+        self.assertEqual(response.headers['Cache-Control'], 'max-age=60')
+
+        environ = {'REQUEST_METHOD': 'GET', 'HTTP_IF_NONE_MATCH': etag}
+        response = self.handler.finalize(environ, Response(request, body='page'))
+        self.assertEqual((response.status_code, response.body), (304, b''))
+        self.assertNotIn('Content-Length', response.headers)
+        self.assertEqual(response.headers['ETag'], etag)
+
+    def test_finalize_skips_errors(self):
+        request = Request({'REQUEST_METHOD': 'GET'}, {})
+        response = self.handler.finalize({'REQUEST_METHOD': 'GET'}, Response(request, status_code=404))
+        self.assertNotIn('ETag', response.headers)
+
+
+class Versioned(View):
+    rendered = 0
+
+    def get_etag(self, request, *args, **kwargs):
+        return 7
+
+    def get_last_modified(self, request, *args, **kwargs):
+        return MODIFIED
+
+    def get(self, request, *args, **kwargs):
+        Versioned.rendered += 1
+        return Response(request, body='versioned')
+
+
+class ServerConditionalTest(unittest.TestCase):
+
+    def setUp(self):
+        Versioned.rendered = 0
+        self.app = CCDCServer(
+            urls=[Url('^/page$', Versioned)],
+            settings={'BASE_DIR': os.path.dirname(os.path.dirname(__file__)), 'TEMPLATE_DIR_NAME': 'templates'},
+            middlewares=[],
+        )
+
+    def call(self, **headers):
+        start = []
+        environ = dict(REQUEST_METHOD='GET', PATH_INFO='/page', QUERY_STRING='', **headers)
+        body = b''.join(self.app(environ, lambda code, response_headers: start.append((code, response_headers))))
+        code, response_headers = start[0]
+        return code, dict(response_headers), body
+
+    def test_view_validators_skip_rendering(self):
+        code, headers, body = self.call(HTTP_IF_NONE_MATCH='"7"')
+        self.assertEqual((code, body, Versioned.rendered), ('304', b'', 0))
+        self.assertEqual(headers['ETag'], '"7"')
+        self.assertEqual(headers['Last-Modified'], http_date(MODIFIED))
+
+    def test_stale_copy_is_rendered(self):
+        code, headers, body = self.call(HTTP_IF_NONE_MATCH='"6"', HTTP_IF_MODIFIED_SINCE=http_date(MODIFIED))
+        self.assertEqual((code, body, Versioned.rendered), ('200', b'versioned', 1))
+        self.assertEqual(headers['ETag'], '"7"')
+
+
+if __name__ == "__main__":
+    unittest.main()
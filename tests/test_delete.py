@@ -0,0 +1,34 @@
+import unittest
+from CCDCSQLQueryBuilder.delete import BatchDeleteQuery, DeleteQuery
+
+
+class DeleteQueryTest(unittest.TestCase):
+
+    def test_conditions(self):
+        query = DeleteQuery("blocks", conditions=["idblocks = %s", "users_iduser = %s"], params=[3, 7])
+        self.assertEqual(query.build_query(),
+                         ("DELETE FROM blocks WHERE idblocks = %s AND users_iduser = %s", [3, 7]))
+
+
+class BatchDeleteQueryTest(unittest.TestCase):
+
+    def test_chunks(self):
+        batches = list(BatchDeleteQuery("blocks", "idblocks", iter(range(5)), chunk_size=2).batches())
+        self.assertEqual(batches, [
+            ("DELETE FROM blocks WHERE idblocks IN (%s, %s)", [0, 1]),
+            ("DELETE FROM blocks WHERE idblocks IN (%s, %s)", [2, 3]),
+            ("DELETE FROM blocks WHERE idblocks IN (%s)", [4]),
+        ])
+        self.assertIs(batches[0][0], batches[1][0])
+
+    def test_extra_conditions_follow_in_list(self):
+        query = BatchDeleteQuery("blocks", "idblocks", [1, 2], conditions=["users_iduser = %s"], params=[7])
+        self.assertEqual(list(query.batches()), [
+            ("DELETE FROM blocks WHERE idblocks IN (%s, %s) AND users_iduser = %s", [1, 2, 7])])
+
+    def test_no_values(self):
+        self.assertEqual(list(BatchDeleteQuery("blocks", "idblocks", []).batches()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,216 @@
+import asyncio
+import itertools
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+import mysql.connector
+from CCDCSQLQueryBuilder import execute
+from CCDCSQLQueryBuilder.pool import ConnectionPool
+
+
+class FakeCursor:
+    """
+    Курсор, выполнение которого можно задержать событием.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.db.started.set()
+        self.db.proceed.wait(5)
+
+    def fetchall(self):
+        return [{"value": 1}]
+
+
+class FakeStreamCursor:
+    """
+    Небуферизованный курсор: отдает строки rows порциями, на порции с номером fail_at выбрасывает ошибку.
+    """
+
+    def __init__(self, link, rows, fail_at):
+        self.link = link
+        self.rows = list(rows)
+        self.fail_at = fail_at
+        self.fetches = 0
+        self.column_names = ("value",)
+
+    def execute(self, query, params=None):
+        self.link.unread_result = bool(self.rows)
+
+    def fetchmany(self, size):
+        self.fetches += 1
+        if self.fetches == self.fail_at:
+            raise mysql.connector.Error("Lost connection to MySQL server during query")
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        self.link.unread_result = bool(self.rows)
+        return batch
+
+    def close(self):
+        pass
+
+
+class FakeLink:
+    _ids = itertools.count(1)
+
+    def __init__(self, db):
+        self.db = db
+        self.connection_id = next(self._ids)
+        self.closed = False
+        self.unread_result = False
+
+    def cursor(self, dictionary=False, buffered=False):
+        return FakeStreamCursor(self, self.db.rows, self.db.fail_at)
+
+
+class FakeDB:
+    """
+    Заменитель DB: запросы ждут события proceed.
+    """
+
+    def __init__(self):
+        self.link = None
+        self.created_at = self.last_used = None
+        self.started = threading.Event()
+        self.proceed = threading.Event()
+        self.rows = []
+        self.fail_at = None
+
+    def connect(self):
+        self.link = FakeLink(self)
+        self.created_at = self.last_used = time.monotonic()
+        return object()
+
+    def disconnect(self):
+        if self.link is not None:
+            self.link.closed = True
+        self.link = None
+
+    def is_alive(self) -> bool:
+        return self.link is not None
+
+    def new_cursor(self):
+        return FakeCursor(self)
+
+
+class ExecuteKillTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = ConnectionPool("localhost", "user", "password", "database",
+                                   min_size=0, max_size=1, connection_factory=FakeDB)
+        self.killed = []
+        executor = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(executor.shutdown, wait=False)
+        for name, value in (("get_pool", lambda: self.pool), ("_kill_query", self.killed.append),
+                            ("_executor", executor), ("_prepared_statements", False)):
+            patcher = mock.patch.object(execute, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def wait_for(self, condition):
+        for _ in range(200):
+            if condition():
+                return
+            time.sleep(0.01)
+
+    def test_state_kill_after_detach_is_noop(self):
+        db = FakeDB()
+        db.connect()
+        state = execute._QueryState()
+        state.attach(db)
+        self.assertFalse(state.detach())
+        state.kill()
+        self.assertEqual(self.killed, [])
+        self.assertFalse(state.killed)
+
+    def test_state_kill_before_detach_discards(self):
+        db = FakeDB()
+        db.connect()
+        state = execute._QueryState()
+        state.attach(db)
+        state.kill()
+        self.wait_for(lambda: self.killed)
+        self.assertEqual(self.killed, [db.link.connection_id])
+        self.assertTrue(state.detach())
+
+    def test_completed_query_returns_connection(self):
+        db = FakeDB()
+        db.proceed.set()
+        self.pool.connection_factory = lambda: db
+
+        result = asyncio.run(execute.execute_query("SELECT 1", None, "fetchall", timeout=5))
+        self.assertEqual(result, [{"value": 1}])
+        self.assertEqual(self.killed, [])
+        self.assertEqual(self.pool.stats()["idle"], 1)
+        self.assertFalse(db.link.closed)
+
+    def test_timeout_kills_and_discards_connection(self):
+        db = FakeDB()
+        self.pool.connection_factory = lambda: db
+
+        with mock.patch("builtins.print"):
+            result = asyncio.run(execute.execute_query("SELECT SLEEP(10)", None, "fetchall", timeout=0.05))
+        self.assertIsNone(result)
+        self.assertTrue(db.started.is_set())
+        link = db.link
+        self.wait_for(lambda: self.killed)
+        self.assertEqual(self.killed, [link.connection_id])
+
+        # Запрос завершается уже после KILL: соединение не должно вернуться в пул
+        db.proceed.set()
+        self.wait_for(lambda: self.pool.stats()["in_use"] == 0)
+        stats = self.pool.stats()
+        self.assertEqual((stats["size"], stats["idle"], stats["in_use"]), (0, 0, 0))
+        self.assertTrue(link.closed)
+
+
+class StreamQueryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.db = FakeDB()
+        self.db.rows = [(value,) for value in range(10)]
+        self.pool = ConnectionPool("localhost", "user", "password", "database",
+                                   min_size=0, max_size=1, connection_factory=lambda: self.db)
+        executor = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(executor.shutdown, wait=False)
+        for name, value in (("get_pool", lambda: self.pool), ("_executor", executor)):
+            patcher = mock.patch.object(execute, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def collect(self):
+        async def run():
+            rows = []
+            async for batch in execute.stream_query("SELECT value FROM t", batch_size=4, row_format="tuple",
+                                                    timeout=5):
+                rows.extend(batch)
+            return rows
+        return asyncio.run(run())
+
+    def test_complete(self):
+        self.assertEqual(self.collect(), [(value,) for value in range(10)])
+
+    def test_error_before_first_batch_is_printed(self):
+        self.db.fail_at = 1
+        with mock.patch("builtins.print") as printed:
+            self.assertEqual(self.collect(), [])
+        printed.assert_called_once()
+
+    def test_error_after_first_batch_is_raised(self):
+        self.db.fail_at = 2
+        with self.assertRaises(mysql.connector.Error):
+            self.collect()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+from CCDCSQLQueryBuilder.insert import BulkInsertQuery, InsertQuery, InsertSelectQuery
+from CCDCSQLQueryBuilder.select import SelectQuery
+
+
+def bind(query: str, params: list) -> str:
+    """
+    Подставляет параметры в плейсхолдеры %s по порядку, чтобы проверить, что значения
+    попадают в нужные места запроса.
+    """
+    parts = query.split("%s")
+    assert len(parts) == len(params) + 1, (query, params)
+    return "".join(part + (repr(param) if index < len(params) else "")
+                   for index, (part, param) in enumerate(zip(parts, params + [None])))
+
+
+class InsertSelectQueryTest(unittest.TestCase):
+
+    def test_condition_params_follow_select_params(self):
+        select = SelectQuery("blocks", "%s", "block_html", conditions=["users_iduser = %s", "idblocks > %s"],
+                             order_by="idblocks", limit=10)
+        select.params.append(7)
+        query = InsertSelectQuery("blocks", ("users_iduser", "block_html"), select,
+                                  column_params=[42], params=[100])
+        self.assertEqual(
+            bind(*query.build_query()),
+            "INSERT INTO blocks (users_iduser, block_html) SELECT 42, block_html FROM blocks "
+            "WHERE users_iduser = 7 AND idblocks > 100 ORDER BY idblocks LIMIT 10",
+        )
+
+    def test_condition_params_with_like_and_keyset(self):
+        select = SelectQuery("blocks", "%s", "idblocks", conditions=["users_iduser = %s"],
+                             like_column="block_name", like_value="шапка", like_mode="prefix",
+                             keyset="idblocks", limit=5)
+        query = InsertSelectQuery("blocks", ("users_iduser", "idblocks"), select, column_params=[42], params=[7])
+        self.assertEqual(
+            bind(*query.build_query()),
+            "INSERT INTO blocks (users_iduser, idblocks) SELECT 42, idblocks FROM blocks "
+            "WHERE users_iduser = 7 AND block_name LIKE 'шапка%' ORDER BY idblocks LIMIT 5",
+        )
+
+
+class InsertQueryTest(unittest.TestCase):
+
+    def test_insert_with_conditions(self):
+        query = InsertQuery("users", {"login": "admin", "password": "hash"}, conditions={"login": "admin"})
+        self.assertEqual(
+            bind(*query.build_query()),
+            "INSERT INTO users (login, password) SELECT 'admin', 'hash' FROM DUAL "
+            "WHERE NOT EXISTS (SELECT 1 FROM users WHERE login = 'admin')",
+        )
+
+
+class BulkInsertQueryTest(unittest.TestCase):
+
+    def test_batches_by_row_count(self):
+        rows = ({"a": index, "b": str(index)} for index in range(5))
+        batches = list(BulkInsertQuery("t", rows, max_rows=2).batches())
+        self.assertEqual([len(params) // 2 for _, params in batches], [2, 2, 1])
+        self.assertEqual(batches[0][0], "INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)")
+        self.assertEqual(batches[2][1], [4, "4"])
+
+    def test_batches_by_packet_size(self):
+        rows = [{"data": b"x" * 1000} for _ in range(4)]
+        batches = list(BulkInsertQuery("t", rows, max_packet_size=4500).batches())
+        self.assertEqual([len(params) for _, params in batches], [2, 2])
+
+    def test_missing_column(self):
+        with self.assertRaises(ValueError):
+            list(BulkInsertQuery("t", [{"a": 1}, {"b": 2}]).batches())
+
+
+if __name__ == "__main__":
+    unittest.main()
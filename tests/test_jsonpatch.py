@@ -0,0 +1,91 @@
+import unittest
+from CCDCSQLQueryBuilder.jsonpatch import JsonPatch, json_path, json_pointer_tokens
+from CCDCSQLQueryBuilder.update import UpdateQuery
+
+
+class JsonPointerTest(unittest.TestCase):
+
+    def test_tokens_and_path(self):
+        tokens = json_pointer_tokens('/pages/0/a~1b~0c/"q"')
+        self.assertEqual(tokens, ['pages', '0', 'a/b~c', '"q"'])
+        self.assertEqual(json_path(tokens), '$."pages"[0]."a/b~c"."\\"q\\""')
+        self.assertEqual(json_path(json_pointer_tokens('/pages/01')), '$."pages"."01"')
+
+    def test_invalid_pointer(self):
+        with self.assertRaises(ValueError):
+            json_pointer_tokens('pages/0')
+
+
+class JsonPatchTest(unittest.TestCase):
+
+    def test_consecutive_operations_are_nested(self):
+        patch = JsonPatch('site_json', [
+            {'op': 'add', 'path': '/pages/-', 'value': {'path': 'new.html'}},
+            {'op': 'replace', 'path': '/title', 'value': 'Сайт'},
+            {'op': 'remove', 'path': '/draft'},
+        ])
+        self.assertEqual(patch.expressions(), [(
+            'site_json',
+            'JSON_REMOVE(JSON_REPLACE(JSON_ARRAY_APPEND(site_json, %s, CAST(%s AS JSON)), %s, CAST(%s AS JSON)), %s)',
+            ['$."pages"', '{"path": "new.html"}', '$."title"', '"Сайт"', '$."draft"'],
+        )])
+
+    def test_move_starts_new_assignment(self):
+        patch = JsonPatch('site_json', [
+            {'op': 'add', 'path': '/pages/0/title', 'value': 'a'},
+            {'op': 'move', 'from': '/pages/1', 'path': '/pages/0'},
+        ])
+        first, second = patch.expressions()
+        self.assertEqual(first[1], 'JSON_SET(site_json, %s, CAST(%s AS JSON))')
+        self.assertEqual(second, ('site_json', 'JSON_ARRAY_INSERT(JSON_REMOVE(site_json, %s), %s, '
+                                               'JSON_EXTRACT(site_json, %s))',
+                                  ['$."pages"[1]', '$."pages"[0]', '$."pages"[1]']))
+
+    def test_add_requires_existing_parent(self):
+        patch = JsonPatch('site_json', [
+            {'op': 'test', 'path': '/version', 'value': 3},
+            {'op': 'add', 'path': '/pages/0/settings/color', 'value': 'red'},
+            {'op': 'copy', 'from': '/pages/0/title', 'path': '/pages/1/title'},
+        ])
+        self.assertEqual(patch.tests(), (
+            ["JSON_EXTRACT(site_json, %s) = CAST(%s AS JSON)",
+             "JSON_CONTAINS_PATH(site_json, 'one', %s)",
+             "JSON_CONTAINS_PATH(site_json, 'one', %s)",
+             "JSON_CONTAINS_PATH(site_json, 'one', %s)"],
+            ['$."version"', '3', '$."pages"[0]."settings"', '$."pages"[1]', '$."pages"[0]."title"'],
+        ))
+
+    def test_parent_written_by_earlier_operation_is_not_checked(self):
+        patch = JsonPatch('site_json', [
+            {'op': 'add', 'path': '/pages/0/settings', 'value': {}},
+            {'op': 'add', 'path': '/pages/0/settings/color', 'value': 'red'},
+            {'op': 'add', 'path': '/title', 'value': 'Сайт'},
+        ])
+        self.assertEqual(patch.tests(), (["JSON_CONTAINS_PATH(site_json, 'one', %s)"], ['$."pages"[0]']))
+
+    def test_invalid_operations(self):
+        for operations in ([{'op': 'append', 'path': '/a'}],
+                           [{'op': 'add', 'path': '/a'}],
+                           [{'op': 'move', 'path': '/a'}],
+                           [{'op': 'remove', 'path': '/a'}, {'op': 'test', 'path': '/a', 'value': 1}]):
+            with self.subTest(operations=operations):
+                with self.assertRaises(ValueError):
+                    JsonPatch('site_json', operations)
+        with self.assertRaises(ValueError):
+            JsonPatch('site_json', [{'op': 'remove', 'path': ''}]).expressions()
+
+    def test_update_query(self):
+        query, params = UpdateQuery(
+            'sites', {},
+            json_patch={'site_json': [{'op': 'add', 'path': '/pages/0/settings/color', 'value': 'red'}]},
+            expressions=[('version', 'version + 1', [])],
+            conditions=['idsites = %s', 'version = %s'], params=[5, 2],
+        ).build_query()
+        self.assertEqual(query, "UPDATE sites SET site_json = JSON_SET(site_json, %s, CAST(%s AS JSON)), "
+                                "version = version + 1 WHERE idsites = %s AND version = %s "
+                                "AND JSON_CONTAINS_PATH(site_json, 'one', %s)")
+        self.assertEqual(params, ['$."pages"[0]."settings"."color"', '"red"', 5, 2, '$."pages"[0]."settings"'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import unittest
+from CCDCServer.asgi import CCDCASGIServer
+from CCDCServer.main import CCDCServer
+from CCDCServer.middleware import BaseMiddleware
+from CCDCServer.response import Response
+from CCDCServer.urls import Url
+from CCDCServer.view import View
+
+events = []
+SETTINGS = {'BASE_DIR': os.path.dirname(os.path.dirname(__file__)), 'TEMPLATE_DIR_NAME': 'templates'}
+
+
+class Page(View):
+
+    def get(self, request, *args, **kwargs):
+        events.append('view')
+        return Response(request, body='page')
+
+
+class Hooks(BaseMiddleware):
+    """
+    Простой слой: только to_request и to_response.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def to_request(self, request):
+        events.append(f'{self.name}:request')
+
+    def to_response(self, response):
+        events.append(f'{self.name}:response')
+
+
+class Wrapper(BaseMiddleware):
+    """
+    Слой, который оборачивает следующий и помечает ответ заголовком.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def process(self, request, call_next):
+        events.append(f'{self.name}:before')
+        response = call_next(request)
+        events.append(f'{self.name}:after')
+        response.headers['X-Layers'] = response.headers.get('X-Layers', '') + self.name
+        return response
+
+    async def process_async(self, request, call_next):
+        events.append(f'{self.name}:before')
+        response = await call_next(request)
+        events.append(f'{self.name}:after')
+        response.headers['X-Layers'] = response.headers.get('X-Layers', '') + self.name
+        return response
+
+
+class Deny(BaseMiddleware):
+    """
+    Слой, который отвечает сам и не вызывает следующие слои.
+    """
+
+    def process(self, request, call_next):
+        events.append('deny')
+        return Response(request, status_code=403)
+
+    async def process_async(self, request, call_next):
+        return self.process(request, call_next)
+
+
+class MiddlewareChainTest(unittest.TestCase):
+
+    def setUp(self):
+        events.clear()
+
+    def call(self, middlewares):
+        app = CCDCServer(urls=[Url('^/page$', Page)], settings=SETTINGS, middlewares=middlewares)
+        start = []
+        b''.join(app({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/page', 'QUERY_STRING': ''},
+                     lambda code, headers: start.append((code, dict(headers)))))
+        return start[0]
+
+    def call_async(self, middlewares):
+        app = CCDCASGIServer(urls=[Url('^/page$', Page)], settings=SETTINGS, middlewares=middlewares)
+        scope = {'type': 'http', 'method': 'GET', 'path': '/page', 'query_string': b'', 'headers': []}
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(asyncio.wait_for(app(scope, receive, send), 5))
+        return sent[0]['status'], {key.decode('latin-1'): value.decode('latin-1') for key, value in sent[0]['headers']}
+
+    def test_onion_order(self):
+        code, headers = self.call([Wrapper('a'), Hooks('b'), Wrapper('c')])
+        self.assertEqual(code, '200')
+        self.assertEqual(events, ['a:before', 'b:request', 'c:before', 'view', 'c:after', 'b:response', 'a:after'])
+        # Внутренний слой получает ответ первым
+        self.assertEqual(headers['X-Layers'], 'ca')
+
+    def test_short_circuit(self):
+        code, headers = self.call([Wrapper('a'), Deny(), Wrapper('c')])
+        self.assertEqual(code, '403')
+        self.assertEqual(events, ['a:before', 'deny', 'a:after'])
+
+    def test_classes_are_instantiated_once(self):
+        app = CCDCServer(urls=[Url('^/page$', Page)], settings=SETTINGS, middlewares=[BaseMiddleware])
+        self.assertIsInstance(app.middlewares[0], BaseMiddleware)
+
+    def test_async_chain_order(self):
+        status, headers = self.call_async([Wrapper('a'), Hooks('b'), Wrapper('c')])
+        self.assertEqual(status, 200)
+        self.assertEqual(events, ['a:before', 'b:request', 'c:before', 'view', 'c:after', 'b:response', 'a:after'])
+        self.assertEqual(headers['x-layers'], 'ca')
+
+    def test_async_short_circuit(self):
+        self.assertEqual(self.call_async([Deny(), Wrapper('c')])[0], 403)
+        self.assertEqual(events, ['deny'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import asyncio
+import unittest
+from unittest import mock
+from CCDCServer import cache, models
+from CCDCServer.cache import ResponseCache
+from CCDCServer.models import ManagingBlocks, ManagingPages
+
+
+class FakeStore:
+
+    def put(self, content: bytes) -> str:
+        return f'hash-{len(content)}'
+
+
+class FakePatcher:
+
+    def __init__(self, version):
+        self.version = version
+
+    async def patch(self, site_id, version, operations, client=None):
+        return self.version
+
+
+class FakePublisher:
+
+    def __init__(self):
+        self.published = []
+
+    def is_published(self, site_id) -> bool:
+        return False
+
+    async def publish_blocks(self, block_ids):
+        self.published.extend(block_ids)
+
+
+class CacheInvalidationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ResponseCache()
+        self.queries = []
+        self.publisher = FakePublisher()
+        self.patcher = FakePatcher(2)
+        for module, name, value in ((cache, '_cache', self.cache),
+                                    (models, 'execute_query', self.execute_query),
+                                    (models, 'get_asset_store', FakeStore),
+                                    (models, 'get_publisher', lambda: self.publisher),
+                                    (models, 'get_site_patcher', lambda: self.patcher)):
+            patcher = mock.patch.object(module, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        for key, tags in (('blocks-7', ['user:7']), ('blocks-8', ['user:8']),
+                          ('page-3', ['block:3']), ('site-5', ['site:5'])):
+            self.cache.set(key, key, tags=tags)
+
+    async def execute_query(self, query, params=None, fetch=None):
+        self.queries.append(query)
+        if fetch == "fetchone":
+            return {"users_iduser": 7}
+
+    def cached(self):
+        return sorted(key for key in ('blocks-7', 'blocks-8', 'page-3', 'site-5') if self.cache.get(key))
+
+    def test_create_block(self):
+        asyncio.run(ManagingBlocks().create_block(7, b'<p></p>', b''))
+        self.assertEqual(self.cached(), ['blocks-8', 'page-3', 'site-5'])
+
+    def test_copy_block(self):
+        asyncio.run(ManagingBlocks().copy_block(3, 8))
+        self.assertEqual(self.cached(), ['blocks-7', 'page-3', 'site-5'])
+
+    def test_delete_block_drops_block_and_owner_entries(self):
+        asyncio.run(ManagingBlocks().delete_block(3))
+        self.assertEqual(self.cached(), ['blocks-8', 'site-5'])
+        self.assertEqual(self.publisher.published, [3])
+
+    def test_settings_page(self):
+        self.assertEqual(asyncio.run(ManagingPages('site').settings_page(5, 1, 0, {'title': 'x'})), 2)
+        self.assertEqual(self.cached(), ['blocks-7', 'blocks-8', 'page-3'])
+
+    def test_failed_settings_page_keeps_cache(self):
+        self.patcher.version = None
+        asyncio.run(ManagingPages('site').settings_page(5, 1, 0, {'title': 'x'}))
+        self.assertEqual(self.cached(), ['blocks-7', 'blocks-8', 'page-3', 'site-5'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import io
+import unittest
+from unittest import mock
+from CCDCServer import multipart
+from CCDCServer.exceptions import BadRequest
+from CCDCServer.multipart import MultipartParser, UploadedFile
+from CCDCServer.request import Request
+
+BOUNDARY = '----boundary42'
+
+
+def build_body(*parts, boundary: str = BOUNDARY, close: bool = True) -> bytes:
+    """
+    Собирает тело multipart/form-data из кортежей (заголовки, содержимое).
+    """
+    body = b'preamble\r\n'
+    for headers, content in parts:
+        body += f'--{boundary}\r\n'.encode('latin-1') + headers.encode('utf-8') + b'\r\n\r\n' + content + b'\r\n'
+    if close:
+        body += f'--{boundary}--\r\nepilogue'.encode('latin-1')
+    return body
+
+
+def field(name: str, value: bytes):
+    return f'Content-Disposition: form-data; name="{name}"', value
+
+
+def upload(name: str, filename: str, content: bytes):
+    return f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\n' \
+           f'Content-Type: text/plain', content
+
+
+class TrackedUploadedFile(UploadedFile):
+    """
+    UploadedFile, который запоминает созданные объекты.
+    """
+    created = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.created.append(self)
+
+
+class MultipartParserTest(unittest.TestCase):
+
+    def parse(self, body: bytes, **kwargs):
+        return MultipartParser(io.BytesIO(body), BOUNDARY, **kwargs).parse()
+
+    def test_boundary_split_across_chunks(self):
+        content = b'line\r\n--not-boundary\r\n' * 10
+        body = build_body(field('title', 'Заголовок'.encode('utf-8')), upload('file', 'a.txt', content),
+                          field('title', b'second'))
+        for chunk_size in (1, 2, 3, 7, 16, 64 * 1024):
+            with self.subTest(chunk_size=chunk_size):
+                fields, files = self.parse(body, chunk_size=chunk_size)
+                self.assertEqual(fields, {'title': ['Заголовок', 'second']})
+                uploaded, = files['file']
+                self.assertEqual((uploaded.filename, uploaded.content_type, uploaded.size),
+                                 ('a.txt', 'text/plain', len(content)))
+                self.assertEqual(uploaded.read(), content)
+
+    def test_large_file_is_spooled_to_disk(self):
+        _, files = self.parse(build_body(upload('file', 'big.bin', b'x' * 5000)), spool_size=1024)
+        self.assertTrue(files['file'][0].file._rolled)
+
+    def test_field_size_limit(self):
+        with self.assertRaises(BadRequest):
+            self.parse(build_body(field('text', b'x' * 100)), max_field_size=50)
+
+    def test_headers_size_limit(self):
+        headers = 'Content-Disposition: form-data; name="a"\r\nX-Padding: ' + 'x' * (32 * 1024)
+        with self.assertRaises(BadRequest):
+            self.parse(build_body((headers, b'value')))
+
+    def test_part_without_name(self):
+        with self.assertRaises(BadRequest):
+            self.parse(build_body(('Content-Disposition: form-data', b'value')))
+
+    def test_truncated_body(self):
+        with self.assertRaises(BadRequest):
+            self.parse(build_body(field('a', b'value'), close=False))
+
+    def test_invalid_boundary(self):
+        with self.assertRaises(BadRequest):
+            MultipartParser(io.BytesIO(b''), '')
+
+    def test_files_are_closed_on_error(self):
+        TrackedUploadedFile.created = []
+        body = build_body(upload('first', 'a.txt', b'a' * 100), upload('second', 'b.txt', b'b' * 100), close=False)
+        with mock.patch.object(multipart, 'UploadedFile', TrackedUploadedFile):
+            with self.assertRaises(BadRequest):
+                self.parse(body, chunk_size=16)
+        self.assertEqual(len(TrackedUploadedFile.created), 2)
+        self.assertTrue(all(uploaded.file.closed for uploaded in TrackedUploadedFile.created))
+
+
+class RequestMultipartTest(unittest.TestCase):
+
+    def test_post_and_files(self):
+        body = build_body(field('login', b'admin'), upload('avatar', 'me.png', b'png'))
+        request = Request({
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': f'multipart/form-data; boundary={BOUNDARY}',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': io.BytesIO(body + b'data after the body'),
+        }, {})
+        self.assertEqual(request.POST, {'login': ['admin']})
+        self.assertEqual(request.FILES['avatar'][0].read(), b'png')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import unittest
+from unittest import mock
+from CCDCServer import pages
+from CCDCServer.pages import PageCompiler
+
+
+class PageCompilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.compiler = PageCompiler()
+        self.title = 'Главная'
+        self.loads = 0
+        self.loading = threading.Event()
+        self.proceed = threading.Event()
+        self.proceed.set()
+        for name, value in (('load_sites', self.load_sites), ('load_blocks', self.load_blocks)):
+            patcher = mock.patch.object(pages, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def load_sites(self, site_ids):
+        self.loads += 1
+        title = self.title
+        self.loading.set()
+        while not self.proceed.is_set():
+            await asyncio.sleep(0.01)
+        return {site_id: {'folder_name': 'site', 'version': title,
+                          'pages': [{'path': 'index.html', 'title': title, 'body': [{'block': 1}]}]}
+                for site_id in site_ids}
+
+    async def load_blocks(self, block_ids):
+        return {1: ('<p>block</p>', '', '')}
+
+    def render_in_thread(self, results: list) -> threading.Thread:
+        # Как в WSGI-сервере: каждый запрос выполняется в своем цикле событий asyncio.run
+        def target():
+            try:
+                results.append(asyncio.run(self.compiler.render(5, 'index.html')))
+            except BaseException as err:
+                results.append(err)
+        thread = threading.Thread(target=target)
+        thread.start()
+        return thread
+
+    def test_single_load_across_event_loops(self):
+        self.proceed.clear()
+        results = []
+        first = self.render_in_thread(results)
+        self.assertTrue(self.loading.wait(5))
+        second = self.render_in_thread(results)
+        self.proceed.set()
+        first.join(5)
+        second.join(5)
+        self.assertEqual(len(results), 2)
+        self.assertTrue(all(isinstance(result, bytes) and b'<p>block</p>' in result for result in results))
+        self.assertEqual(self.loads, 1)
+        self.assertEqual(self.compiler._loading, {})
+
+    def test_invalidate_site_during_load_drops_result(self):
+        self.proceed.clear()
+        results = []
+        thread = self.render_in_thread(results)
+        self.assertTrue(self.loading.wait(5))
+        self.compiler.invalidate_site(5)
+        self.title = 'Новая'
+        self.proceed.set()
+        thread.join(5)
+
+        self.assertIn('Главная'.encode('utf-8'), results[0])
+        self.assertIsNone(self.compiler.get_compiled(5))
+        page = asyncio.run(self.compiler.render(5, 'index.html'))
+        self.assertIn('Новая'.encode('utf-8'), page)
+        self.assertEqual(self.loads, 2)
+
+    def test_invalidate_blocks_during_load_drops_result(self):
+        self.proceed.clear()
+        results = []
+        thread = self.render_in_thread(results)
+        self.assertTrue(self.loading.wait(5))
+        # Сайт еще не в кэше, поэтому зависимость от блока 1 пока не записана
+        self.compiler.invalidate_blocks([1])
+        self.proceed.set()
+        thread.join(5)
+        self.assertIsNone(self.compiler.get_compiled(5))
+
+    def test_cached_after_load(self):
+        asyncio.run(self.compiler.render(5, 'index.html'))
+        asyncio.run(self.compiler.render(5, 'index.html'))
+        self.assertEqual(self.loads, 1)
+        self.compiler.invalidate_blocks([1])
+        self.assertIsNone(self.compiler.get_compiled(5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+from CCDCServer.passwords import PasswordHasher
+
+
+class PasswordHasherTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # Малая стоимость scrypt, чтобы тесты выполнялись быстро
+        cls.hasher = PasswordHasher(n=2 ** 4, max_workers=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.hasher.shutdown()
+
+    def verify(self, password, encoded) -> bool:
+        return asyncio.run(self.hasher.verify(password, encoded))
+
+    def test_hash_and_verify(self):
+        encoded = asyncio.run(self.hasher.hash('секрет'))
+        algorithm, n, r, p, salt, derived = encoded.split('$')
+        self.assertEqual((algorithm, n, r, p), ('scrypt', '16', '8', '1'))
+        self.assertTrue(self.verify('секрет', encoded))
+        self.assertFalse(self.verify('секрет!', encoded))
+        self.assertNotEqual(asyncio.run(self.hasher.hash('секрет')), encoded)
+
+    def test_legacy_plaintext(self):
+        self.assertTrue(self.verify('password', 'password'))
+        self.assertFalse(self.verify('password', 'Password'))
+        self.assertTrue(self.hasher.needs_rehash('password'))
+
+    def test_empty_hash(self):
+        self.assertFalse(self.verify('password', None))
+        self.assertFalse(self.verify('password', ''))
+        self.assertTrue(self.hasher.needs_rehash(None))
+
+    def test_malformed_hash_fails_verify(self):
+        encoded = asyncio.run(self.hasher.hash('секрет'))
+        parts = encoded.split('$')
+        for broken in (
+            parts[:4],                                  # нет соли и хэша
+            parts[:1] + ['x'] + parts[2:],              # n не число
+            parts[:1] + ['15'] + parts[2:],             # n не степень двойки
+            parts[:1] + ['16', '0'] + parts[3:],        # r = 0
+            parts[:4] + ['!!!'] + parts[5:],            # некорректный base64
+            parts[:5] + [''],                           # пустой хэш
+        ):
+            with self.subTest(broken=broken):
+                self.assertFalse(self.verify('секрет', '$'.join(broken)))
+
+    def test_needs_rehash(self):
+        encoded = asyncio.run(self.hasher.hash('секрет'))
+        self.assertFalse(self.hasher.needs_rehash(encoded))
+        self.assertTrue(PasswordHasher(n=2 ** 5, max_workers=1).needs_rehash(encoded))
+        self.assertTrue(PasswordHasher(n=2 ** 4, dklen=32, max_workers=1).needs_rehash(encoded))
+        self.assertTrue(self.hasher.needs_rehash('scrypt$16$8$1$salt'))
+
+    def test_dummy_verify(self):
+        asyncio.run(self.hasher.dummy_verify('секрет'))
+        self.assertFalse(self.verify('', self.hasher._dummy))
+        self.assertFalse(self.hasher.needs_rehash(self.hasher._dummy))
+
+    def test_reused_after_shutdown(self):
+        hasher = PasswordHasher(n=2 ** 4, max_workers=1)
+        hasher.shutdown()
+        self.addCleanup(hasher.shutdown)
+        self.assertTrue(asyncio.run(hasher.verify('a', asyncio.run(hasher.hash('a')))))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest import mock
+from CCDCServer import patches
+from CCDCServer.exceptions import Conflict
+from CCDCServer.patches import SitePatcher
+
+
+class FakeSites:
+    """
+    Заменитель execute_batch_sync для UPDATE sites ... WHERE idsites = %s AND version = %s:
+    хранит версию сайта и записанные операции.
+    """
+
+    def __init__(self, version: int, latency: float = 0):
+        self.version = version
+        self.latency = latency
+        self.updates = []
+        self.lock = threading.Lock()
+
+    def __call__(self, statements):
+        (query, params), = statements
+        time.sleep(self.latency)
+        with self.lock:
+            expected = params[-1]
+            self.updates.append((expected, params))
+            if expected != self.version:
+                return 0
+            self.version += 1
+            return 1
+
+    def bump(self):
+        """
+        Изменение сайта другим клиентом.
+        """
+        with self.lock:
+            self.version += 1
+
+
+def replace(title: str) -> list:
+    return [{"op": "replace", "path": "/pages/0/title", "value": title}]
+
+
+class SitePatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sites = FakeSites(version=5)
+        patcher = mock.patch.object(patches, "execute_batch_sync", self.sites)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.patcher = SitePatcher(delay=0.05)
+
+    def run_async(self, coroutine):
+        return asyncio.run(asyncio.wait_for(coroutine, 5))
+
+    def test_coalesces_within_window(self):
+        async def scenario():
+            return await asyncio.gather(*[self.patcher.patch(1, 5, replace(str(index)), client="a")
+                                          for index in range(3)])
+
+        self.assertEqual(self.run_async(scenario()), [6, 6, 6])
+        self.assertEqual(len(self.sites.updates), 1)
+
+    def test_rebases_patch_sent_without_waiting(self):
+        # Запись первого патча еще выполняется, когда приходит второй патч к той же версии
+        self.sites.latency = 0.2
+
+        async def scenario():
+            first = asyncio.ensure_future(self.patcher.patch(1, 5, replace("a"), client="editor"))
+            await asyncio.sleep(0.1)
+            second = asyncio.ensure_future(self.patcher.patch(1, 5, replace("ab"), client="editor"))
+            return await first, await second
+
+        self.assertEqual(self.run_async(scenario()), (6, 7))
+        self.assertEqual([expected for expected, _ in self.sites.updates], [5, 6])
+        self.assertEqual(self.sites.version, 7)
+
+    def test_rebases_patch_sent_after_write_finished(self):
+        async def scenario():
+            first = asyncio.ensure_future(self.patcher.patch(1, 5, replace("a"), client="editor"))
+            await asyncio.sleep(0.15)
+            self.assertTrue(first.done())
+            # Клиент еще не получил ответ и отправляет патч к прежней версии
+            second = await self.patcher.patch(1, 5, replace("ab"), client="editor")
+            third = await self.patcher.patch(1, 6, replace("abc"), client="editor")
+            return await first, second, third
+
+        self.assertEqual(self.run_async(scenario()), (6, 7, 8))
+
+    def test_other_client_is_not_rebased(self):
+        async def scenario():
+            self.assertEqual(await self.patcher.patch(1, 5, replace("a"), client="a"), 6)
+            await self.patcher.patch(1, 5, replace("b"), client="b")
+
+        with self.assertRaises(Conflict):
+            self.run_async(scenario())
+        self.assertEqual(self.sites.version, 6)
+
+    def test_conflict_fails_chained_patches_and_resets_chain(self):
+        self.sites.latency = 0.1
+        self.sites.bump()
+
+        async def scenario():
+            first = asyncio.ensure_future(self.patcher.patch(1, 5, replace("a"), client="editor"))
+            await asyncio.sleep(0.08)
+            second = asyncio.ensure_future(self.patcher.patch(1, 5, replace("ab"), client="editor"))
+            results = await asyncio.gather(first, second, return_exceptions=True)
+            # Клиент перечитал сайт (версия 6) и повторяет изменение: версия 6 была бы версией
+            # неудавшейся записи, но цепочка сброшена, и патч не ждет несуществующих записей
+            retry = await self.patcher.patch(1, 6, replace("ab"), client="editor")
+            return results, retry
+
+        (first, second), retry = self.run_async(scenario())
+        self.assertIsInstance(first, Conflict)
+        self.assertIsInstance(second, Conflict)
+        self.assertEqual(retry, 7)
+        # Второй патч не записывался: он составлен поверх неудавшейся записи
+        self.assertEqual([expected for expected, _ in self.sites.updates], [5, 6])
+
+    def test_separate_event_loops(self):
+        # Как в WSGI-сервере: каждый запрос выполняется в своем цикле событий asyncio.run
+        results = []
+
+        def request(title):
+            results.append(asyncio.run(self.patcher.patch(1, 5, replace(title), client="editor")))
+
+        threads = [threading.Thread(target=request, args=(str(index),)) for index in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(results, [6, 6, 6])
+        self.assertEqual(len(self.sites.updates), 1)
+
+    def test_flush(self):
+        patcher = SitePatcher(delay=60)
+
+        async def scenario():
+            pending = asyncio.ensure_future(patcher.patch(1, 5, replace("a"), client="editor"))
+            await asyncio.sleep(0)
+            await patcher.flush()
+            return await pending
+
+        self.assertEqual(self.run_async(scenario()), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
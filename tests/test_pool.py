@@ -0,0 +1,245 @@
+import itertools
+import threading
+import time
+import unittest
+from unittest import mock
+from CCDCSQLQueryBuilder import pool as pool_module
+from CCDCSQLQueryBuilder.pool import ConnectionPool
+from CCDCSQLQueryBuilder.exceptions import PoolError, PoolTimeout
+
+
+class FakeClock:
+    """
+    Часы для pool.time.monotonic, которые двигаются только вручную.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+class FakeLink:
+    """
+    Соединение драйвера: номер соединения и признак закрытия.
+    """
+    _ids = itertools.count(1)
+
+    def __init__(self):
+        self.connection_id = next(self._ids)
+        self.closed = False
+
+
+class FakeDB:
+    """
+    Заменитель DB для пула: не подключается к серверу, ответ на ping задается флагом alive.
+    """
+
+    def __init__(self, clock, fail: bool = False):
+        self.clock = clock
+        self.fail = fail
+        self.alive = True
+        self.pings = 0
+        self.link = None
+        self.created_at = None
+        self.last_used = None
+
+    def connect(self):
+        if self.fail:
+            return None
+        self.link = FakeLink()
+        self.created_at = self.last_used = self.clock.monotonic()
+        return object()
+
+    def disconnect(self):
+        if self.link is not None:
+            self.link.closed = True
+        self.link = None
+
+    def is_alive(self) -> bool:
+        self.pings += 1
+        return self.link is not None and self.alive
+
+
+class ConnectionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.opened = []
+        self.fail = False
+        patcher = mock.patch.object(pool_module, "time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def factory(self) -> FakeDB:
+        db = FakeDB(self.clock, fail=self.fail)
+        self.opened.append(db)
+        return db
+
+    def make_pool(self, **kwargs) -> ConnectionPool:
+        kwargs.setdefault("connection_factory", self.factory)
+        return ConnectionPool("localhost", "user", "password", "database", **kwargs)
+
+    def test_invalid_sizes(self):
+        with self.assertRaises(ValueError):
+            self.make_pool(min_size=0, max_size=0)
+        with self.assertRaises(ValueError):
+            self.make_pool(min_size=3, max_size=2)
+
+    def test_fill_opens_min_size(self):
+        pool = self.make_pool(min_size=3, max_size=5)
+        pool.fill()
+        self.assertEqual(pool.stats(), {"size": 3, "idle": 3, "in_use": 0, "waiting": 0, "created": 3, "recycled": 0})
+        pool.fill()
+        self.assertEqual(len(self.opened), 3)
+
+    def test_fill_failure_releases_slot(self):
+        self.fail = True
+        pool = self.make_pool(min_size=2, max_size=2)
+        with self.assertRaises(PoolError):
+            pool.fill()
+        self.assertEqual(pool.stats()["size"], 0)
+
+    def test_reuses_released_connection(self):
+        pool = self.make_pool(min_size=0, max_size=2)
+        db = pool.acquire()
+        self.assertEqual(pool.stats()["in_use"], 1)
+        pool.release(db)
+        self.assertIs(pool.acquire(), db)
+        self.assertEqual(pool.stats()["created"], 1)
+
+    def test_max_size(self):
+        pool = self.make_pool(min_size=0, max_size=2)
+        first, second = pool.acquire(), pool.acquire()
+        self.assertIsNot(first, second)
+        stats = pool.stats()
+        self.assertEqual((stats["size"], stats["in_use"], stats["idle"]), (2, 2, 0))
+
+    def test_checkout_timeout(self):
+        pool = self.make_pool(min_size=0, max_size=1, timeout=0.05)
+        pool.acquire()
+        # Ожидание свободного соединения идет по настоящим часам
+        with mock.patch.object(pool_module, "time", time):
+            started = time.monotonic()
+            with self.assertRaises(PoolTimeout):
+                pool.acquire()
+            self.assertGreaterEqual(time.monotonic() - started, 0.05)
+        stats = pool.stats()
+        self.assertEqual((stats["size"], stats["in_use"], stats["waiting"]), (1, 1, 0))
+
+    def test_waiting_checkout_gets_released_connection(self):
+        pool = self.make_pool(min_size=0, max_size=1, timeout=5)
+        db = pool.acquire()
+        result = []
+        with mock.patch.object(pool_module, "time", time):
+            waiter = threading.Thread(target=lambda: result.append(pool.acquire()))
+            waiter.start()
+            for _ in range(100):
+                if pool.stats()["waiting"]:
+                    break
+                time.sleep(0.01)
+            self.assertEqual(pool.stats()["waiting"], 1)
+            pool.release(db)
+            waiter.join(5)
+        self.assertEqual(result, [db])
+
+    def test_discard_closes_connection(self):
+        pool = self.make_pool(min_size=0, max_size=2)
+        db = pool.acquire()
+        link = db.link
+        pool.release(db, discard=True)
+        self.assertTrue(link.closed)
+        self.assertEqual(pool.stats()["size"], 0)
+        self.assertIsNot(pool.acquire(), db)
+
+    def test_connection_context_discards_on_error(self):
+        pool = self.make_pool(min_size=0, max_size=1)
+        with self.assertRaises(RuntimeError):
+            with pool.connection() as db:
+                raise RuntimeError
+        self.assertIsNone(db.link)
+        self.assertEqual(pool.stats()["size"], 0)
+
+    def test_ping_failure_recycles(self):
+        pool = self.make_pool(min_size=0, max_size=1, ping_interval=1)
+        db = pool.acquire()
+        pool.release(db)
+
+        # Соединение использовалось только что: ping не нужен
+        self.assertIs(pool.acquire(), db)
+        self.assertEqual(db.pings, 0)
+        pool.release(db)
+
+        self.clock.advance(2)
+        db.alive = False
+        fresh = pool.acquire()
+        self.assertIsNot(fresh, db)
+        self.assertEqual(db.pings, 1)
+        self.assertIsNone(db.link)
+        stats = pool.stats()
+        self.assertEqual((stats["size"], stats["created"], stats["recycled"]), (1, 2, 1))
+
+    def test_ping_success_keeps_connection(self):
+        pool = self.make_pool(min_size=0, max_size=1, ping_interval=1)
+        db = pool.acquire()
+        pool.release(db)
+        self.clock.advance(2)
+        self.assertIs(pool.acquire(), db)
+        self.assertEqual(db.pings, 1)
+        self.assertEqual(pool.stats()["recycled"], 0)
+
+    def test_idle_eviction_keeps_min_size(self):
+        pool = self.make_pool(min_size=1, max_size=3, idle_timeout=10)
+        connections = [pool.acquire() for _ in range(3)]
+        for db in connections:
+            pool.release(db)
+        self.assertEqual(pool.stats()["idle"], 3)
+
+        self.clock.advance(11)
+        db = pool.acquire()
+        stats = pool.stats()
+        # Вытесняются лишние соединения сверх min_size, одно выдано
+        self.assertEqual((stats["size"], stats["in_use"], stats["idle"], stats["recycled"]), (1, 1, 0, 2))
+        self.assertEqual(sum(1 for old in connections if old.link is None), 2)
+        self.assertIn(db, connections)
+
+    def test_max_lifetime_on_release(self):
+        pool = self.make_pool(min_size=0, max_size=1, max_lifetime=60)
+        db = pool.acquire()
+        self.clock.advance(61)
+        pool.release(db)
+        self.assertIsNone(db.link)
+        stats = pool.stats()
+        self.assertEqual((stats["size"], stats["idle"], stats["recycled"]), (0, 0, 1))
+
+    def test_max_lifetime_on_checkout(self):
+        pool = self.make_pool(min_size=0, max_size=1, max_lifetime=60, ping_interval=1000)
+        db = pool.acquire()
+        pool.release(db)
+        self.clock.advance(61)
+        fresh = pool.acquire()
+        self.assertIsNot(fresh, db)
+        self.assertIsNone(db.link)
+        self.assertEqual(db.pings, 0)
+        stats = pool.stats()
+        self.assertEqual((stats["size"], stats["created"], stats["recycled"]), (1, 2, 1))
+
+    def test_close(self):
+        pool = self.make_pool(min_size=2, max_size=2)
+        pool.fill()
+        busy = pool.acquire()
+        pool.close()
+        self.assertEqual(pool.stats()["size"], 1)
+        with self.assertRaises(PoolError):
+            pool.acquire()
+        pool.release(busy)
+        self.assertIsNone(busy.link)
+        self.assertEqual(pool.stats()["size"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
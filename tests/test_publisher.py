@@ -0,0 +1,149 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from CCDCServer import publisher
+from CCDCServer.publisher import SitePublisher
+
+
+class SitePublisherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.output_dir = os.path.join(self.root, 'published')
+        self.sites = {5: {'folder_name': 'site', 'pages': [
+            {'path': 'index.html', 'title': 'Главная', 'body': [{'block': 1}]},
+            {'path': 'about.html', 'title': 'О нас', 'body': [{'block': 2}]},
+        ]}}
+        self.blocks = {1: ('<p>one</p>', '', ''), 2: ('<p>two</p>', '', '')}
+        self.load_delay = 0
+        self.active = self.max_active = 0
+        for name, value in (('load_sites', self.load_sites), ('load_blocks', self.load_blocks)):
+            patcher = mock.patch.object(publisher, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.publisher = self.create_publisher()
+
+    def create_publisher(self) -> SitePublisher:
+        site_publisher = SitePublisher(self.output_dir)
+        # Рендеринг в потоках: пул процессов проверяется отдельным тестом
+        site_publisher._executor = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(site_publisher.shutdown)
+        return site_publisher
+
+    async def load_sites(self, site_ids):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(self.load_delay)
+        self.active -= 1
+        return {site_id: json.loads(json.dumps(self.sites[site_id])) for site_id in site_ids if site_id in self.sites}
+
+    async def load_blocks(self, block_ids):
+        return {block_id: self.blocks[block_id] for block_id in block_ids if block_id in self.blocks}
+
+    def path(self, page_path: str) -> str:
+        return os.path.join(self.output_dir, 'site', page_path)
+
+    def read(self, page_path: str) -> bytes:
+        with open(self.path(page_path), 'rb') as file:
+            return file.read()
+
+    def test_publish_site_writes_pages_and_manifest(self):
+        published = asyncio.run(self.publisher.publish_site(5))
+        self.assertEqual(sorted(published), [self.path('about.html'), self.path('index.html')])
+        self.assertIn(b'<p>one</p>', self.read('index.html'))
+        self.assertTrue(self.publisher.is_published(5))
+        self.assertFalse(self.publisher.is_published(6))
+        with open(self.publisher.manifest_path, encoding='utf-8') as file:
+            self.assertEqual(set(json.load(file)['pages']), {'5/index.html', '5/about.html'})
+
+    def test_unchanged_pages_are_skipped(self):
+        asyncio.run(self.publisher.publish_site(5))
+        self.assertEqual(asyncio.run(self.publisher.publish_site(5)), [])
+        self.sites[5]['pages'][1]['title'] = 'Контакты'
+        self.assertEqual(asyncio.run(self.publisher.publish_site(5)), [self.path('about.html')])
+        self.assertEqual(len(asyncio.run(self.publisher.publish_site(5, force=True))), 2)
+
+    def test_deleted_file_is_rendered_again(self):
+        asyncio.run(self.publisher.publish_site(5))
+        os.unlink(self.path('index.html'))
+        self.assertEqual(asyncio.run(self.publisher.publish_site(5)), [self.path('index.html')])
+
+    def test_removed_page_is_deleted(self):
+        asyncio.run(self.publisher.publish_site(5))
+        del self.sites[5]['pages'][1]
+        self.assertEqual(asyncio.run(self.publisher.publish_site(5)), [])
+        self.assertFalse(os.path.exists(self.path('about.html')))
+        self.assertTrue(os.path.exists(self.path('index.html')))
+        self.assertEqual(self.publisher.pages_for_blocks([2]), set())
+
+    def test_publish_blocks_renders_dependent_pages_only(self):
+        asyncio.run(self.publisher.publish_site(5))
+        self.blocks[1] = ('<p>changed</p>', '', '')
+        self.assertEqual(asyncio.run(self.publisher.publish_blocks([1])), [self.path('index.html')])
+        self.assertIn(b'<p>changed</p>', self.read('index.html'))
+        self.assertEqual(asyncio.run(self.publisher.publish_blocks([3])), [])
+
+    def test_manifest_is_loaded_by_new_publisher(self):
+        asyncio.run(self.publisher.publish_site(5))
+        restored = self.create_publisher()
+        self.assertEqual(restored.pages_for_blocks([1, 2]), {'5/index.html', '5/about.html'})
+        self.assertEqual(asyncio.run(restored.publish_site(5)), [])
+
+    def test_path_outside_publish_dir_is_rejected(self):
+        self.sites[5]['folder_name'] = '..'
+        with self.assertRaises(ValueError):
+            asyncio.run(self.publisher.publish_site(5))
+
+    def test_publishes_from_separate_event_loops(self):
+        # Как в WSGI-сервере: каждый запрос выполняется в своем цикле событий asyncio.run
+        self.load_delay = 0.05
+        results = []
+
+        def request():
+            try:
+                results.append(asyncio.run(self.publisher.publish_site(5, force=True)))
+            except BaseException as err:
+                results.append(err)
+
+        threads = [threading.Thread(target=request) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual([len(result) for result in results], [2, 2, 2])
+        self.assertEqual(self.max_active, 1)
+
+    def test_cancelled_wait_keeps_order(self):
+        self.load_delay = 0.1
+
+        async def scenario():
+            first = asyncio.ensure_future(self.publisher.publish_site(5))
+            await asyncio.sleep(0.02)
+            waiter = asyncio.ensure_future(self.publisher.publish_site(5, force=True))
+            await asyncio.sleep(0.02)
+            waiter.cancel()
+            third = await self.publisher.publish_site(5, force=True)
+            return await first, third
+
+        first, third = asyncio.run(scenario())
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(third), 2)
+        # Отмена ожидающего вызова не пропускает третью публикацию раньше первой
+        self.assertEqual(self.max_active, 1)
+
+    def test_renders_in_process_pool(self):
+        site_publisher = SitePublisher(self.output_dir, max_workers=1)
+        self.addCleanup(site_publisher.shutdown)
+        self.assertEqual(len(asyncio.run(site_publisher.publish_site(5))), 2)
+        self.assertIn(b'<p>two</p>', self.read('about.html'))
+
+
+if __name__ == "__main__":
+    unittest.main()
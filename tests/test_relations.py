@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+from unittest import mock
+from CCDCSQLQueryBuilder import relations
+from CCDCSQLQueryBuilder.relations import RelationCountQuery, RelationQuery, count_related, load_related
+
+PROJECTS = [
+    {"idprojects": 1, "users_iduser": 7, "project_name": "a"},
+    {"idprojects": 2, "users_iduser": 8, "project_name": "b"},
+    {"idprojects": 3, "users_iduser": 7, "project_name": "c"},
+]
+
+
+class RelationQueryTest(unittest.TestCase):
+
+    def test_batches(self):
+        relation = RelationQuery("projects", "users_iduser", [7, 8, 7, 9], "idprojects",
+                                 conditions=["deleted = %s"], params=[0], order_by="idprojects", chunk_size=2)
+        self.assertEqual(list(relation.batches()), [
+            ("SELECT users_iduser, idprojects FROM projects WHERE users_iduser IN (%s, %s) AND deleted = %s "
+             "ORDER BY idprojects", [7, 8, 0]),
+            ("SELECT users_iduser, idprojects FROM projects WHERE users_iduser IN (%s) AND deleted = %s "
+             "ORDER BY idprojects", [9, 0]),
+        ])
+
+    def test_no_ids(self):
+        self.assertEqual(list(RelationQuery("projects", "users_iduser", []).batches()), [])
+
+    def test_group_keeps_parents_without_children(self):
+        relation = RelationQuery("projects", "users_iduser", [7, 8, 9])
+        grouped = relation.group(PROJECTS)
+        self.assertEqual({key: [row["idprojects"] for row in rows] for key, rows in grouped.items()},
+                         {7: [1, 3], 8: [2], 9: []})
+
+    def test_count_query(self):
+        relation = RelationCountQuery("projects", "users_iduser", [7, 8])
+        (query, params), = relation.batches()
+        self.assertEqual(query, "SELECT users_iduser, COUNT(*) AS count FROM projects "
+                                "WHERE users_iduser IN (%s, %s) GROUP BY users_iduser")
+        self.assertEqual(relation.group([{"users_iduser": 7, "count": 2}]), {7: 2, 8: 0})
+
+
+class FetchRelationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.queries = []
+        patcher = mock.patch.object(relations, "execute_query", self.execute_query)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def execute_query(self, query, params, *args, timeout=None):
+        self.queries.append((query, list(params)))
+        rows = [row for row in PROJECTS if row["users_iduser"] in params]
+        if "COUNT(*)" in query:
+            counts = {}
+            for row in rows:
+                counts[row["users_iduser"]] = counts.get(row["users_iduser"], 0) + 1
+            return [{"users_iduser": key, "count": count} for key, count in counts.items()]
+        return rows
+
+    def test_load_related_one_query_per_chunk(self):
+        grouped = asyncio.run(load_related("projects", "users_iduser", [7, 8, 9], chunk_size=2))
+        self.assertEqual([params for _, params in self.queries], [[7, 8], [9]])
+        self.assertEqual({key: len(rows) for key, rows in grouped.items()}, {7: 2, 8: 1, 9: 0})
+
+    def test_count_related(self):
+        self.assertEqual(asyncio.run(count_related("projects", "users_iduser", [7, 8, 9])), {7: 2, 8: 1, 9: 0})
+        self.assertEqual(len(self.queries), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
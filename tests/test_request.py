@@ -0,0 +1,99 @@
+import io
+import unittest
+from CCDCServer.exceptions import RequestEntityTooLarge
+from CCDCServer.request import LimitedStream, Request
+
+
+class CountingInput(io.BytesIO):
+    """
+    wsgi.input, который считает вызовы read/readline.
+    """
+
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+    def readline(self, size=-1):
+        self.reads += 1
+        return super().readline(size)
+
+
+class LimitedStreamTest(unittest.TestCase):
+
+    def test_read_stops_at_limit(self):
+        stream = LimitedStream(io.BytesIO(b'0123456789'), 6)
+        self.assertEqual(stream.read(4), b'0123')
+        self.assertEqual(stream.read(), b'45')
+        self.assertEqual(stream.read(), b'')
+        self.assertEqual(stream.remaining, 0)
+
+    def test_readline_and_iteration(self):
+        stream = LimitedStream(io.BytesIO(b'a\nbb\ncc\ntail'), 7)
+        self.assertEqual(stream.readline(), b'a\n')
+        self.assertEqual(list(stream), [b'bb\n', b'cc'])
+
+    def test_exhausted_stream_does_not_read_input(self):
+        source = CountingInput(b'abc')
+        stream = LimitedStream(source, 3)
+        stream.read()
+        reads = source.reads
+        self.assertEqual((stream.read(), stream.readline()), (b'', b''))
+        self.assertEqual(source.reads, reads)
+
+
+class RequestTest(unittest.TestCase):
+
+    def request(self, body: bytes = b'', settings: dict = None, **environ) -> Request:
+        environ.setdefault('wsgi.input', CountingInput(body))
+        environ.setdefault('CONTENT_LENGTH', str(len(body)))
+        return Request(environ, settings or {})
+
+    def test_body_is_read_lazily_once(self):
+        request = self.request(b'name=value')
+        source = request.environ['wsgi.input']
+        self.assertEqual(source.reads, 0)
+        self.assertEqual(request.body, b'name=value')
+        self.assertEqual(request.body, b'name=value')
+        self.assertEqual(source.reads, 1)
+
+    def test_get_does_not_touch_body(self):
+        request = self.request(b'x=1', QUERY_STRING='a=1&a=2&b=3')
+        self.assertEqual(request.GET, {'a': ['1', '2'], 'b': ['3']})
+        self.assertEqual(request.environ['wsgi.input'].reads, 0)
+
+    def test_body_limited_by_content_length(self):
+        request = self.request(b'a=1', **{'wsgi.input': io.BytesIO(b'a=1&b=2')})
+        self.assertEqual(request.POST, {'a': ['1']})
+
+    def test_post_ignores_other_content_types(self):
+        request = self.request(b'{"a": 1}', CONTENT_TYPE='application/json')
+        self.assertEqual(request.POST, {})
+        self.assertEqual(request.environ['wsgi.input'].reads, 0)
+
+    def test_body_over_limit(self):
+        request = self.request(b'x' * 100, settings={'MAX_BODY_SIZE': 10})
+        with self.assertRaises(RequestEntityTooLarge):
+            request.body
+
+    def test_invalid_content_length(self):
+        for value in ('abc', '-5', ''):
+            with self.subTest(value=value):
+                self.assertEqual(self.request(b'data', CONTENT_LENGTH=value).body, b'')
+
+    def test_cookies(self):
+        self.assertEqual(self.request(HTTP_COOKIE='session=abc; theme=dark').cookies,
+                         {'session': 'abc', 'theme': 'dark'})
+        self.assertEqual(self.request(HTTP_COOKIE='bad"cookie=;').cookies, {})
+
+    def test_headers(self):
+        request = self.request(b'x', HTTP_IF_NONE_MATCH='"v1"', CONTENT_TYPE='text/plain')
+        self.assertEqual(request.headers,
+                         {'If-None-Match': '"v1"', 'Content-Type': 'text/plain', 'Content-Length': '1'})
+
+
+if __name__ == "__main__":
+    unittest.main()
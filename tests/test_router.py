@@ -0,0 +1,101 @@
+import os
+import unittest
+from CCDCServer.exceptions import NotFound
+from CCDCServer.main import CCDCServer
+from CCDCServer.response import Response
+from CCDCServer.router import Router
+from CCDCServer.urls import Url
+from CCDCServer.view import View
+
+
+class Static(View):
+    pass
+
+
+class Project(View):
+    pass
+
+
+class Page(View):
+    pass
+
+
+class Other(View):
+    pass
+
+
+class RouterTest(unittest.TestCase):
+
+    def test_static_route_beats_earlier_regex(self):
+        router = Router([Url('^/project/(?P<project_id>\\w+)$', Project), Url('^/project/new$', Static)])
+        self.assertEqual(router.resolve('/project/new'), (Static, {}))
+        self.assertEqual(router.resolve('/project/5'), (Project, {'project_id': '5'}))
+
+    def test_first_matching_regex_wins(self):
+        router = Router([Url('^/p/(?P<a>\\d+)$', Project), Url('^/p/(?P<b>\\w+)$', Page)])
+        self.assertEqual(router.resolve('/p/5'), (Project, {'a': '5'}))
+        self.assertEqual(router.resolve('/p/x'), (Page, {'b': 'x'}))
+
+    def test_same_group_names_in_different_routes(self):
+        router = Router([Url('^/project/(?P<id>\\d+)$', Project), Url('^/page/(?P<id>\\d+)$', Page),
+                         Url('^/(?P<id>\\d+)/(?P=id)$', Other)])
+        self.assertEqual(router.resolve('/page/7'), (Page, {'id': '7'}))
+        self.assertEqual(router.resolve('/3/3'), (Other, {'id': '3'}))
+        with self.assertRaises(NotFound):
+            router.resolve('/3/4')
+
+    def test_numbered_backreference(self):
+        router = Router([Url('^/p/(?P<a>\\d+)$', Project), Url('^/(\\w+)/\\1$', Other),
+                         Url('^/q/(?P<b>\\d+)$', Page)])
+        self.assertEqual(router.resolve('/ab/ab'), (Other, {}))
+        self.assertEqual(router.resolve('/q/1'), (Page, {'b': '1'}))
+        with self.assertRaises(NotFound):
+            router.resolve('/ab/cd')
+
+    def test_inline_flags(self):
+        router = Router([Url('(?i)^/Page/(?P<name>\\w+)$', Page)])
+        self.assertEqual(router.resolve('/PAGE/x'), (Page, {'name': 'x'}))
+
+    def test_order_kept_around_standalone_route(self):
+        router = Router([Url('^/(?P<a>\\w)/(\\w)\\2$', Other), Url('^/(?P<b>\\w)/(?P<c>\\w+)$', Page)])
+        self.assertEqual(router.resolve('/a/bb'), (Other, {'a': 'a'}))
+        self.assertEqual(router.resolve('/a/bc'), (Page, {'b': 'a', 'c': 'bc'}))
+
+    def test_not_found(self):
+        with self.assertRaises(NotFound):
+            Router([Url('^/login$', Static)]).resolve('/logout')
+
+
+class Hello(View):
+
+    def get(self, request, *args, **kwargs):
+        return Response(request, body=f"hello {kwargs.get('name')}")
+
+
+class DispatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = CCDCServer(
+            urls=[Url('^/hello/(?P<name>\\w+)$', Hello)],
+            settings={'BASE_DIR': os.path.dirname(os.path.dirname(__file__)), 'TEMPLATE_DIR_NAME': 'templates'},
+            middlewares=[],
+        )
+
+    def call(self, method: str, path: str):
+        status = []
+        body = b''.join(self.app({'REQUEST_METHOD': method, 'PATH_INFO': path, 'QUERY_STRING': ''},
+                                 lambda code, headers: status.append(code)))
+        return status[0], body.decode('utf-8')
+
+    def test_named_groups_passed_to_view(self):
+        self.assertEqual(self.call('GET', '/hello/world/'), ('200', 'hello world'))
+
+    def test_not_found(self):
+        self.assertEqual(self.call('GET', '/bye')[0], '404')
+
+    def test_method_not_allowed(self):
+        self.assertEqual(self.call('PUT', '/hello/world')[0], '405')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+from CCDCSQLQueryBuilder.select import SelectQuery, decode_cursor, encode_cursor, escape_like
+
+
+class SelectQueryTest(unittest.TestCase):
+
+    def test_conditions_and_order(self):
+        query = SelectQuery("users", "idusers", "login", conditions=["login = %s"], order_by="idusers")
+        query.params.append("admin")
+        self.assertEqual(query.build_query(),
+                         ("SELECT idusers, login FROM users WHERE login = %s ORDER BY idusers", ["admin"]))
+
+    def test_limit_and_offset(self):
+        self.assertEqual(SelectQuery("blocks", limit=10, offset=20).build_query(),
+                         ("SELECT * FROM blocks LIMIT %s OFFSET %s", [10, 20]))
+        self.assertEqual(SelectQuery("blocks", offset=20).build_query()[0],
+                         "SELECT * FROM blocks LIMIT 18446744073709551615 OFFSET %s")
+
+    def test_keyset_first_page(self):
+        query = SelectQuery("blocks", "idblocks", conditions=["users_iduser = %s"], keyset="idblocks", limit=2)
+        query.params.append(7)
+        self.assertEqual(query.build_query(), (
+            "SELECT idblocks FROM blocks WHERE users_iduser = %s ORDER BY idblocks LIMIT %s", [7, 2]))
+
+    def test_keyset_next_page(self):
+        token = encode_cursor([5])
+        query = SelectQuery("blocks", "idblocks", keyset="idblocks", descending=True, limit=2, after=token)
+        self.assertEqual(query.build_query(), (
+            "SELECT idblocks FROM blocks WHERE idblocks < %s ORDER BY idblocks DESC LIMIT %s", [5, 2]))
+
+    def test_composite_keyset(self):
+        token = encode_cursor(["2024-01-01", 5])
+        query = SelectQuery("blocks", "created", "idblocks", keyset=("created", "idblocks"), after=token)
+        self.assertEqual(query.build_query(), (
+            "SELECT created, idblocks FROM blocks WHERE (created, idblocks) > (%s, %s) "
+            "ORDER BY created, idblocks", ["2024-01-01", 5]))
+
+    def test_next_token_round_trip(self):
+        query = SelectQuery("blocks", "idblocks", "block_name", keyset="idblocks", limit=2)
+        token = query.next_token([(3, "a"), (8, "b")])
+        self.assertEqual(decode_cursor(token, 1), [8])
+        following = SelectQuery("blocks", "idblocks", "block_name", keyset="idblocks", limit=2, after=token)
+        self.assertEqual(following.build_query()[1], [8, 2])
+
+    def test_next_token_from_dict_rows(self):
+        query = SelectQuery("blocks b", "b.idblocks", keyset="b.idblocks", limit=1)
+        self.assertEqual(decode_cursor(query.next_token([{"idblocks": 4}]), 1), [4])
+
+    def test_next_token_on_last_page(self):
+        query = SelectQuery("blocks", "idblocks", keyset="idblocks", limit=2)
+        self.assertIsNone(query.next_token([(3,)]))
+        self.assertIsNone(query.next_token([]))
+
+    def test_invalid_token(self):
+        with self.assertRaises(ValueError):
+            decode_cursor("not a token", 1)
+        with self.assertRaises(ValueError):
+            decode_cursor(encode_cursor([1, 2]), 1)
+
+    def test_keyset_column_must_be_selected(self):
+        with self.assertRaises(ValueError):
+            SelectQuery("blocks", "block_name", keyset="idblocks").build_query()
+
+    def test_keyset_and_order_by_conflict(self):
+        with self.assertRaises(ValueError):
+            SelectQuery("blocks", keyset="idblocks", order_by="block_name")
+
+    def test_prefix_like_is_escaped(self):
+        query = SelectQuery("blocks", like_column="block_name", like_value="50%_off\\", like_mode="prefix")
+        self.assertEqual(query.build_query(),
+                         ("SELECT * FROM blocks WHERE block_name LIKE %s", ["50\\%\\_off\\\\%"]))
+
+    def test_contains_like(self):
+        query = SelectQuery("blocks", like_column="block_name", like_value="a_b")
+        self.assertEqual(query.build_query()[1], ["%a\\_b%"])
+        self.assertEqual(escape_like("100%"), "100\\%")
+
+    def test_shape_does_not_depend_on_values(self):
+        first = SelectQuery("blocks", like_column="block_name", like_value="a", limit=1)
+        second = SelectQuery("blocks", like_column="block_name", like_value="b", limit=5)
+        self.assertEqual(first.shape(), second.shape())
+        self.assertNotEqual(first.shape(), SelectQuery("blocks", limit=1).shape())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+import io
+import time
+import unittest
+from unittest import mock
+from CCDCServer import sessions
+from CCDCServer.middleware import Session
+from CCDCServer.request import Request
+from CCDCServer.response import Response
+from CCDCServer.sessions import SessionBackend, SessionData, SessionStore, SQLiteSessionBackend
+
+
+class MemoryBackend(SessionBackend):
+    """
+    Хранилище сессий в словаре, которое считает обращения.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.loads = 0
+        self.saves = 0
+
+    def load(self, session_id):
+        self.loads += 1
+        row = self.rows.get(session_id)
+        return None if row is None else (row[0], dict(row[1]))
+
+    def save(self, session_id, user_id, data, expires_at):
+        self.saves += 1
+        self.rows[session_id] = (user_id, dict(data))
+
+    def delete(self, session_id):
+        self.rows.pop(session_id, None)
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+class SessionStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch.object(sessions, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.backend = MemoryBackend()
+        self.store = SessionStore(self.backend, max_entries=2, cache_ttl=60)
+
+    def test_clean_session_is_not_saved(self):
+        self.backend.rows['s1'] = (7, {'theme': 'dark'})
+        session = SessionData(self.store, 's1')
+        self.assertEqual(session.get('theme'), 'dark')
+        self.store.save(session)
+        self.assertEqual(self.backend.saves, 0)
+
+    def test_dirty_session_is_saved_once(self):
+        session = SessionData(self.store)
+        session['cart'] = [1]
+        self.assertTrue(session.dirty)
+        self.store.save(session)
+        self.store.save(session)
+        self.assertEqual(self.backend.saves, 1)
+        self.assertEqual(self.backend.rows[session.session_id], (None, {'cart': [1]}))
+
+    def test_in_place_change_needs_mark_dirty(self):
+        self.backend.rows['s1'] = (None, {'cart': []})
+        session = SessionData(self.store, 's1')
+        session.data['cart'].append(1)
+        self.store.save(session)
+        self.assertEqual(self.backend.saves, 0)
+        session.mark_dirty()
+        self.store.save(session)
+        self.assertEqual(self.backend.rows['s1'], (None, {'cart': [1]}))
+
+    def test_cache_hit_and_ttl(self):
+        self.backend.rows['s1'] = (7, {})
+        self.store.load('s1')
+        self.store.load('s1')
+        self.assertEqual(self.backend.loads, 1)
+        self.assertTrue(self.store.is_cached('s1'))
+        self.clock.now += 61
+        self.assertFalse(self.store.is_cached('s1'))
+        self.store.load('s1')
+        self.assertEqual(self.backend.loads, 2)
+
+    def test_lru_eviction(self):
+        for session_id in ('s1', 's2', 's3'):
+            self.backend.rows[session_id] = (None, {})
+        self.store.load('s1')
+        self.store.load('s2')
+        self.store.load('s1')
+        self.store.load('s3')
+        self.assertTrue(self.store.is_cached('s1'))
+        self.assertFalse(self.store.is_cached('s2'))
+        self.assertTrue(self.store.is_cached('s3'))
+
+    def test_cached_data_is_copied(self):
+        self.backend.rows['s1'] = (None, {'a': 1})
+        SessionData(self.store, 's1').data['a'] = 2
+        self.assertEqual(SessionData(self.store, 's1')['a'], 1)
+
+    def test_unknown_session_becomes_new(self):
+        session = SessionData(self.store, 'missing')
+        self.assertIsNone(session.user_id)
+        self.assertIsNone(session.session_id)
+
+    def test_login_rotates_session_id(self):
+        self.backend.rows['s1'] = (None, {'cart': [1]})
+        session = SessionData(self.store, 's1')
+        session.login(7)
+        self.store.save(session)
+        self.assertNotEqual(session.session_id, 's1')
+        self.assertEqual(self.backend.rows, {session.session_id: (7, {'cart': [1]})})
+        self.assertFalse(self.store.is_cached('s1'))
+
+
+class SQLiteSessionBackendTest(unittest.TestCase):
+
+    def test_round_trip_and_expiry(self):
+        backend = SQLiteSessionBackend(':memory:')
+        backend.save('s1', 7, {'a': [1]}, time.time() + 60)
+        backend.save('s2', None, {}, time.time() - 1)
+        self.assertEqual(backend.load('s1'), (7, {'a': [1]}))
+        self.assertIsNone(backend.load('s2'))
+        backend.delete('s1')
+        self.assertIsNone(backend.load('s1'))
+
+
+class SessionMiddlewareTest(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = MemoryBackend()
+        self.middleware = Session(store=SessionStore(self.backend))
+
+    def call(self, view, cookie: str = ''):
+        request = Request({'REQUEST_METHOD': 'GET', 'HTTP_COOKIE': cookie, 'wsgi.input': io.BytesIO()}, {})
+        return self.middleware.process(request, lambda req: view(req) or Response(req))
+
+    def test_untouched_session_sets_no_cookie(self):
+        response = self.call(lambda request: None)
+        self.assertNotIn('Set-Cookie', response.headers)
+        self.assertEqual(self.backend.saves, 0)
+
+    def test_new_session_sets_cookie(self):
+        response = self.call(lambda request: request.session.__setitem__('a', 1))
+        session_id, = self.backend.rows
+        self.assertTrue(response.headers['Set-Cookie'].startswith(f'session_id={session_id};'))
+
+    def test_existing_session_is_reused(self):
+        self.backend.rows['s1'] = (7, {})
+        seen = []
+        response = self.call(lambda request: seen.append(request.session.user_id), cookie='session_id=s1')
+        self.assertEqual(seen, [7])
+        self.assertNotIn('Set-Cookie', response.headers)
+        self.assertEqual(self.backend.saves, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
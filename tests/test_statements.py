@@ -0,0 +1,159 @@
+import time
+import unittest
+from unittest import mock
+from CCDCSQLQueryBuilder import execute
+from CCDCSQLQueryBuilder.connect import DB
+from CCDCSQLQueryBuilder.delete import DeleteQuery
+from CCDCSQLQueryBuilder.insert import InsertQuery
+from CCDCSQLQueryBuilder.pool import ConnectionPool
+from CCDCSQLQueryBuilder.select import SelectQuery
+from CCDCSQLQueryBuilder.statements import render_statement, statement_cache_info
+from CCDCSQLQueryBuilder.update import UpdateQuery
+
+
+class PreparedCursor:
+    """
+    Подготовленный курсор: запоминает выполненные запросы.
+    """
+
+    def __init__(self, link):
+        self.link = link
+        self.executed = []
+        self.closed = False
+
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+        self.link.unread_result = True
+
+    def fetchone(self):
+        return {"value": len(self.executed)}
+
+    def fetchall(self):
+        self.link.unread_result = False
+        return []
+
+    def close(self):
+        self.closed = True
+
+
+class PreparedLink:
+
+    def __init__(self):
+        self.connection_id = 1
+        self.cursors = []
+        self.unread_result = False
+
+    def cursor(self, prepared=False, dictionary=False):
+        assert prepared and dictionary
+        cursor = PreparedCursor(self)
+        self.cursors.append(cursor)
+        return cursor
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        pass
+
+
+class PreparedDB(DB):
+
+    def __init__(self, max_statements: int = 64):
+        super().__init__("localhost", "user", "password", "database", max_statements=max_statements)
+
+    def connect(self):
+        self.link = PreparedLink()
+        self.created_at = self.last_used = time.monotonic()
+        return object()
+
+
+class RenderStatementTest(unittest.TestCase):
+
+    def test_same_shape_gives_same_string(self):
+        builders = (
+            lambda value: InsertQuery("users", {"login": value, "password": "hash"}),
+            lambda value: UpdateQuery("users", {"login": value}, conditions=["idusers = %s"], params=[value]),
+            lambda value: DeleteQuery("blocks", conditions=["idblocks = %s"], params=[value]),
+            lambda value: SelectQuery("blocks", "idblocks", conditions=["users_iduser = %s"], limit=value),
+        )
+        for build in builders:
+            with self.subTest(query=build(1).build_query()[0]):
+                first, first_params = build(1).build_query()
+                second, second_params = build(2).build_query()
+                self.assertIs(first, second)
+                self.assertNotEqual(first_params, second_params)
+
+    def test_different_shapes(self):
+        first = DeleteQuery("blocks", conditions=["idblocks = %s"], params=[1]).build_query()[0]
+        second = DeleteQuery("blocks", conditions=["users_iduser = %s"], params=[1]).build_query()[0]
+        self.assertNotEqual(first, second)
+
+    def test_cache_hits(self):
+        shape = DeleteQuery("statement_cache_test", conditions=["id = %s"], params=[1]).shape()
+        render_statement(shape)
+        hits = statement_cache_info().hits
+        render_statement(shape)
+        self.assertEqual(statement_cache_info().hits, hits + 1)
+
+
+class PreparedCursorTest(unittest.TestCase):
+
+    def test_cursor_reused_by_query(self):
+        db = PreparedDB()
+        db.connect()
+        query = "SELECT 1"
+        cursor, prepared_query = db.prepared_cursor(query)
+        self.assertIs(db.prepared_cursor("SELECT " + "1")[0], cursor)
+        self.assertIs(db.prepared_cursor("SELECT " + "1")[1], prepared_query)
+        self.assertEqual(len(db.link.cursors), 1)
+
+    def test_least_recently_used_cursor_is_closed(self):
+        db = PreparedDB(max_statements=2)
+        db.connect()
+        first = db.prepared_cursor("SELECT 1")[0]
+        second = db.prepared_cursor("SELECT 2")[0]
+        db.prepared_cursor("SELECT 1")
+        db.prepared_cursor("SELECT 3")
+        self.assertEqual((first.closed, second.closed), (False, True))
+        self.assertEqual(list(db.statements), ["SELECT 1", "SELECT 3"])
+
+    def test_disconnect_forgets_statements(self):
+        db = PreparedDB()
+        db.connect()
+        db.prepared_cursor("SELECT 1")
+        db.disconnect()
+        self.assertEqual(len(db.statements), 0)
+
+
+class ExecutePreparedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.db = PreparedDB()
+        self.pool = ConnectionPool("localhost", "user", "password", "database",
+                                   min_size=0, max_size=1, connection_factory=lambda: self.db)
+        patcher = mock.patch.object(execute, "get_pool", lambda: self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeated_query_uses_one_prepared_cursor(self):
+        query, params = DeleteQuery("blocks", conditions=["idblocks = %s"], params=[1]).build_query()
+        execute.execute_query_sync(query, params)
+        query, params = DeleteQuery("blocks", conditions=["idblocks = %s"], params=[2]).build_query()
+        result = execute.execute_query_sync(query, params, "fetchone")
+        cursor, = self.db.link.cursors
+        self.assertEqual(cursor.executed, [(query, [1]), (query, [2])])
+        self.assertEqual(result, {"value": 2})
+        # Непрочитанные после fetchone строки дочитываются, соединение готово к следующему запросу
+        self.assertFalse(self.db.link.unread_result)
+        self.assertEqual(self.pool.stats()["idle"], 1)
+
+    def test_prepared_statements_can_be_disabled(self):
+        self.db.new_cursor = mock.MagicMock()
+        with mock.patch.object(execute, "_prepared_statements", False):
+            execute.execute_query_sync("SELECT 1")
+        self.assertEqual(self.db.link.cursors, [])
+        self.db.new_cursor.assert_called_once_with()
+
+
+if __name__ == "__main__":
+    unittest.main()
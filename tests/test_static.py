@@ -0,0 +1,130 @@
+import os
+import shutil
+import tempfile
+import unittest
+from CCDCServer.conditional import http_date
+from CCDCServer.exceptions import NotFound
+from CCDCServer.request import Request
+from CCDCServer.response import FileResponse
+from CCDCServer.static import FileCache, parse_range, static_files
+
+CONTENT = b'0123456789' * 10
+
+
+class ParseRangeTest(unittest.TestCase):
+
+    def test_ranges(self):
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 10))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 10))
+        self.assertEqual(parse_range('bytes=-5', 100), (95, 5))
+        self.assertEqual(parse_range('bytes=95-200', 100), (95, 5))
+        self.assertEqual(parse_range('bytes=-500', 100), (0, 100))
+
+    def test_ignored_ranges(self):
+        for header in ('items=0-9', 'bytes=0-1,5-6', 'bytes=5-2', 'bytes=a-b', 'bytes=-', 'bytes=5'):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range(header, 100))
+
+    def test_unsatisfiable(self):
+        with self.assertRaises(ValueError):
+            parse_range('bytes=100-', 100)
+
+
+class FileCacheTest(unittest.TestCase):
+
+    def test_lru_eviction_by_size(self):
+        cache = FileCache(max_size=10, max_file_size=6)
+        cache.put('a', b'aaaa')
+        cache.put('b', b'bbbb')
+        cache.get('a')
+        cache.put('c', b'cccc')
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), (b'aaaa', None, b'cccc'))
+        cache.put('big', b'x' * 7)
+        self.assertIsNone(cache.get('big'))
+        self.assertEqual(cache.size, 8)
+
+
+class StaticFilesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.static = os.path.join(self.root, 'static')
+        os.makedirs(os.path.join(self.static, 'docs'))
+        for name, content in (('data.txt', CONTENT), ('docs/index.html', b'<h1>docs</h1>'),
+                              ('app.js', b'plain'), ('app.js.gz', b'gzipped'), ('../secret.txt', b'secret')):
+            with open(os.path.join(self.static, name), 'wb') as file:
+                file.write(content)
+
+    def serve(self, path: str, view_options: dict = None, settings: dict = None, **environ):
+        view = static_files([self.static], settings, **(view_options or {}))()
+        request = Request(dict(REQUEST_METHOD='GET', **environ), {})
+        response = view.get(request, path=path)
+        if isinstance(response, FileResponse):
+            self.addCleanup(response.file.close)
+            response.file.seek(response.offset)
+            return response, response.file.read(response.length)
+        return response, response.body
+
+    def test_whole_file(self):
+        response, body = self.serve('data.txt')
+        self.assertEqual((response.status_code, body), (200, CONTENT))
+        self.assertEqual(response.headers['Content-Type'], 'text/plain')
+        self.assertEqual(response.headers['Accept-Ranges'], 'bytes')
+
+    def test_range(self):
+        for settings in (None, {'STATIC_CACHE_SIZE': 0}):
+            with self.subTest(settings=settings):
+                response, body = self.serve('data.txt', settings=settings, HTTP_RANGE='bytes=10-14')
+                self.assertEqual((response.status_code, body), (206, b'01234'))
+                self.assertEqual(response.headers['Content-Range'], 'bytes 10-14/100')
+
+    def test_large_file_is_not_read_into_memory(self):
+        response, body = self.serve('data.txt', settings={'STATIC_CACHE_MAX_FILE_SIZE': 10}, HTTP_RANGE='bytes=-3')
+        self.assertIsInstance(response, FileResponse)
+        self.assertEqual(body, b'789')
+
+    def test_range_not_satisfiable(self):
+        response, _ = self.serve('data.txt', HTTP_RANGE='bytes=200-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response.headers['Content-Range'], 'bytes */100')
+
+    def test_if_range(self):
+        etag = self.serve('data.txt')[0].headers['ETag']
+        response, _ = self.serve('data.txt', HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        response, body = self.serve('data.txt', HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"stale"')
+        self.assertEqual((response.status_code, body), (200, CONTENT))
+        mtime = os.stat(os.path.join(self.static, 'data.txt')).st_mtime
+        response, _ = self.serve('data.txt', HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE=http_date(mtime))
+        self.assertEqual(response.status_code, 206)
+
+    def test_index_file(self):
+        options = {'index_file': 'index.html'}
+        for path in ('docs', 'docs/'):
+            with self.subTest(path=path):
+                response, body = self.serve(path, options)
+                self.assertEqual((response.status_code, body), (200, b'<h1>docs</h1>'))
+        # В корне нет index.html, а без index_file папки не отдаются
+        with self.assertRaises(NotFound):
+            self.serve('/', options)
+        with self.assertRaises(NotFound):
+            self.serve('docs')
+
+    def test_path_outside_directory(self):
+        for path in ('../secret.txt', 'docs/../../secret.txt', 'missing.txt', ''):
+            with self.subTest(path=path):
+                with self.assertRaises(NotFound):
+                    self.serve(path)
+
+    def test_precompressed_variant(self):
+        response, body = self.serve('app.js', HTTP_ACCEPT_ENCODING='br;q=0, gzip')
+        self.assertEqual((body, response.headers['Content-Encoding']), (b'gzipped', 'gzip'))
+        self.assertEqual(response.headers['Vary'], 'Accept-Encoding')
+        response, body = self.serve('app.js', HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertEqual(body, b'plain')
+        self.assertNotIn('Content-Encoding', response.headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from CCDCSQLQueryBuilder.update import BatchUpdateQuery, UpdateQuery
+
+
+class UpdateQueryTest(unittest.TestCase):
+
+    def test_data_expressions_and_conditions(self):
+        query = UpdateQuery("sites", {"site_name": "new"}, conditions=["idsites = %s"], params=[5],
+                            expressions=[("version", "version + %s", [1])])
+        self.assertEqual(query.build_query(), (
+            "UPDATE sites SET site_name = %s, version = version + %s WHERE idsites = %s", ["new", 1, 5]))
+
+    def test_nothing_to_update(self):
+        with self.assertRaises(ValueError):
+            UpdateQuery("sites", {}).build_query()
+
+
+class BatchUpdateQueryTest(unittest.TestCase):
+
+    def test_case_query(self):
+        rows = [{"idblocks": 1, "block_name": "a", "position": 10},
+                {"idblocks": 2, "block_name": "b", "position": 20}]
+        (query, params), = BatchUpdateQuery("blocks", "idblocks", rows).batches()
+        self.assertEqual(query, (
+            "UPDATE blocks SET "
+            "block_name = CASE idblocks WHEN %s THEN %s WHEN %s THEN %s ELSE block_name END, "
+            "position = CASE idblocks WHEN %s THEN %s WHEN %s THEN %s ELSE position END "
+            "WHERE idblocks IN (%s, %s)"))
+        self.assertEqual(params, [1, "a", 2, "b", 1, 10, 2, 20, 1, 2])
+
+    def test_chunks(self):
+        rows = ({"idblocks": key, "position": key * 10} for key in range(5))
+        batches = list(BatchUpdateQuery("blocks", "idblocks", rows, chunk_size=2).batches())
+        self.assertEqual([params for _, params in batches],
+                         [[0, 0, 1, 10, 0, 1], [2, 20, 3, 30, 2, 3], [4, 40, 4]])
+        self.assertIs(batches[0][0], batches[1][0])
+        self.assertTrue(batches[2][0].endswith("WHERE idblocks IN (%s)"))
+
+    def test_rows_must_have_same_columns(self):
+        rows = [{"idblocks": 1, "position": 1}, {"idblocks": 2, "block_name": "b"}]
+        with self.assertRaises(ValueError):
+            list(BatchUpdateQuery("blocks", "idblocks", rows).batches())
+        with self.assertRaises(ValueError):
+            list(BatchUpdateQuery("blocks", "idblocks", [{"position": 1}]).batches())
+        with self.assertRaises(ValueError):
+            list(BatchUpdateQuery("blocks", "idblocks", [{"idblocks": 1}]).batches())
+
+    def test_executemany_args(self):
+        rows = [{"idblocks": 1, "position": 10}, {"idblocks": 2, "position": 20}]
+        query, params = BatchUpdateQuery("blocks", "idblocks", rows).executemany_args()
+        self.assertEqual(query, "UPDATE blocks SET position = %s WHERE idblocks = %s")
+        self.assertEqual(list(params), [(10, 1), (20, 2)])
+
+    def test_empty_rows(self):
+        self.assertEqual(list(BatchUpdateQuery("blocks", "idblocks", []).batches()), [])
+        with self.assertRaises(ValueError):
+            BatchUpdateQuery("blocks", "idblocks", []).executemany_args()
+
+
+if __name__ == "__main__":
+    unittest.main()
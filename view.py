@@ -4,59 +4,55 @@ from CCDCServer.request import Request
 from CCDCServer.response import Response
 from CCDCServer.redirect import Redirect
 from CCDCServer.models import Authentication
-from CCDCServer.template import LoadTemplate
-from CCDCServer.middleware import Session
-import jinja2
+from CCDCServer.template import render_template
+from CCDCServer.cache import cache_page
 
 
 class HomePage(View):
     def get(self, request, *args, **kwargs):
-        if not request.session_id:
+        if request.session.user_id is None:
             return Redirect(request, location="/login")
 
-        template_loader = jinja2.FileSystemLoader(searchpath="templates")
-        jinja_env = jinja2.Environment(loader=template_loader)
-        template = jinja_env.get_template("home.html")
-        context = {'time': str(datetime.now()), 'lst': [1, 2, 3], 'test': request.session_id}
-        html_content = template.render(context)
+        context = {'time': str(datetime.now()), 'lst': [1, 2, 3], 'test': request.session.session_id}
+        html_content = render_template("home.html", context)
         return Response(request, body=html_content)
 
 
 class LoginPage(View):
+    @cache_page(ttl=300)
     def get(self, request: Request, *args, **kwargs) -> Response:
-        html_content = LoadTemplate(template_folder="templates", template_name="login.html").load_template()
+        html_content = render_template("login.html")
 
         return Response(request, body=str(html_content))
 
-    def post(self, request: Request, *args, **kwargs) -> Response:
+    async def post(self, request: Request, *args, **kwargs) -> Response:
         login = request.POST.get('login', '')[0]
         password = request.POST.get('password', '')[0]
-        model_auth = Authentication(login, password).auth()
-        if model_auth:
-            response = Redirect(request, location="/")
-            session_middleware = Session()
-            session_middleware.to_response(response)
-            return response
+        authentication = Authentication(login, password)
+        if await authentication.auth():
+            request.session.login(authentication.user['idusers'])
+            return Redirect(request, location="/")
         else:
-            html_content = LoadTemplate(template_folder="templates", template_name="login.html").load_template()
+            html_content = render_template("login.html")
 
             return Response(request, body=html_content)
 
 
 class RegistrationPage(View):
+    @cache_page(ttl=300)
     def get(self, request: Request, *args, **kwargs) -> Response:
-        html_content = LoadTemplate(template_folder="templates", template_name="registration.html").load_template()
+        html_content = render_template("registration.html")
 
         return Response(request, body=html_content)
 
-    def post(self, request: Request, *args, **kwargs) -> Response:
+    async def post(self, request: Request, *args, **kwargs) -> Response:
         login = request.POST.get('login', '')[0]
         password = request.POST.get('password', '')[0]
-        model_auth = Authentication(login, password).reg()
+        model_auth = await Authentication(login, password).reg()
         if model_auth:
             return Redirect(request, location="/login")
         else:
-            html_content = LoadTemplate(template_folder="templates", template_name="registration.html").load_template()
+            html_content = render_template("registration.html")
 
             return Response(request, body=html_content)
 
@@ -76,10 +72,8 @@ class EpicMath(View):
 
 
 class Hello(View):
+    @cache_page(ttl=300)
     def get(self, request: Request, *args, **kwargs) -> Response:
-        template_loader = jinja2.FileSystemLoader(searchpath="templates")
-        jinja_env = jinja2.Environment(loader=template_loader)
-        template = jinja_env.get_template("hello.html")
-        html_content = template.render()
+        html_content = render_template("hello.html")
 
         return Response(request, body=html_content)